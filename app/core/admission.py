@@ -0,0 +1,97 @@
+import math
+from typing import Optional
+
+from pymongo import monitoring
+
+from core.config import settings
+
+# Команды, длительность которых не говорит о загрузке базы: ожидание
+# новых данных (change stream, tailable-курсоры) и служебные
+IGNORED_COMMANDS = {"getMore", "hello", "isMaster", "ismaster", "ping", "endSessions", "killCursors"}
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    Предел одновременных запросов по задержке MongoDB (градиент, как Gradient2
+    в Netflix concurrency-limits). Короткая и долгая скользящие средние задержки:
+    пока короткая не выше долгой * tolerance, предел растет на sqrt(limit),
+    когда база начинает отвечать медленнее — снижается пропорционально
+    (не более чем вдвое за шаг). Предел не растет, пока занято меньше его половины.
+
+    observe() вызывается из потоков драйвера: обновления — простые присваивания
+    под GIL, гонка между ними теряет один замер, не больше.
+    """
+
+    SHORT_ALPHA = 0.1
+    LONG_ALPHA = 0.01
+
+    def __init__(
+        self,
+        initial: int = settings.admission_initial_limit,
+        min_limit: int = settings.admission_min_limit,
+        max_limit: int = settings.admission_max_limit,
+        tolerance: float = settings.admission_latency_tolerance,
+        smoothing: float = 0.2,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.estimate = float(min(max(initial, min_limit), max_limit))
+        self.in_flight = 0
+        self.short_latency: Optional[float] = None
+        self.long_latency: Optional[float] = None
+        self.stats = {"admitted": 0, "rejected": 0, "samples": 0}
+
+    @property
+    def limit(self) -> int:
+        return int(self.estimate)
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= self.limit:
+            self.stats["rejected"] += 1
+            return False
+        self.in_flight += 1
+        self.stats["admitted"] += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    def observe(self, seconds: float) -> None:
+        self.stats["samples"] += 1
+        if self.short_latency is None:
+            self.short_latency = self.long_latency = seconds
+            return
+        short = self.short_latency + self.SHORT_ALPHA * (seconds - self.short_latency)
+        long = self.long_latency + self.LONG_ALPHA * (seconds - self.long_latency)
+        self.short_latency, self.long_latency = short, long
+
+        gradient = max(0.5, min(1.0, self.tolerance * long / short)) if short > 0 else 1.0
+        if gradient == 1.0 and self.in_flight * 2 < self.estimate:
+            return  # нагрузки мало: по задержке нельзя судить, выдержим ли больше
+        target = self.estimate * gradient + math.sqrt(self.estimate)
+        estimate = self.estimate * (1 - self.smoothing) + target * self.smoothing
+        self.estimate = min(max(estimate, self.min_limit), self.max_limit)
+
+
+class MongoLatencyListener(monitoring.CommandListener):
+    """Передает длительность команд MongoDB в AdaptiveConcurrencyLimit"""
+
+    def __init__(self, limit: AdaptiveConcurrencyLimit):
+        self.limit = limit
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        if event.command_name not in IGNORED_COMMANDS:
+            self.limit.observe(event.duration_micros / 1e6)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        if event.command_name not in IGNORED_COMMANDS:
+            self.limit.observe(event.duration_micros / 1e6)
+
+
+# Один предел на процесс: его читает AdmissionMiddleware, пополняет драйвер MongoDB
+concurrency_limit = AdaptiveConcurrencyLimit()
@@ -1,16 +1,131 @@
 import os
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
+    # Storage backend: mongo | memory (в памяти процесса — для тестов и профилирования)
+    storage_backend: str = "mongo"
+    
     # Database
     mongo_url: str = "mongodb://localhost:27017/helpdesk"
+    # Пул соединений: один клиент на процесс; min_pool_size соединений
+    # открываются до готовности (/ready), а не на первых запросах
+    mongo_max_pool_size: int = 100
+    mongo_min_pool_size: int = 10
+    mongo_max_idle_time_ms: int = 300000
+    mongo_wait_queue_timeout_ms: int = 2000  # ожидание свободного соединения из пула
+    mongo_connect_timeout_ms: int = 5000
+    mongo_server_selection_timeout_ms: int = 5000
+    mongo_socket_timeout_ms: int = 30000
+    # Сжатие протокола: zlib | snappy | zstd через запятую (snappy/zstd — нужны пакеты), "" — без сжатия
+    mongo_compressors: str = "zlib"
+    mongo_zlib_compression_level: int = 1
+    # Проверка горячих запросов через explain() при старте: off | warn | fail
+    index_check: str = "warn"
+    
+    # Task history writer: batched insert_many
+    # durability: sync — запрос ждет сохранения своей записи, async — не ждет
+    history_durability: str = "sync"
+    history_batch_size: int = 100
+    history_flush_interval_ms: int = 50
+    history_queue_size: int = 10000
+    
+    # Redis (общий уровень кэша); в k8s приходит как REDIS_URL
+    redis_url: Optional[str] = None
+    # Redis необязателен: короткий таймаут, после ошибки — пауза без обращений к нему
+    redis_timeout_seconds: float = 0.1
+    redis_cooldown_seconds: float = 5
+    
+    # Task cache: локальный LRU (короткий TTL) + общий уровень в Redis
+    task_cache_enabled: bool = True
+    task_cache_max_size: int = 10000
+    task_cache_ttl_seconds: float = 5
+    task_cache_shared_ttl_seconds: int = 60
+    # Сколько после записи задачи кэш не заполняется чтениями, начатыми до нее
+    task_cache_fence_seconds: float = 2
+    
+    # Prometheus: /metrics и замер команд MongoDB (CommandListener)
+    metrics_enabled: bool = True
+    
+    # Семплирующий профайлер (выключен по умолчанию): профиль каждого N-го запроса
+    # и любого запроса дольше profiling_slow_ms (0 — условие отключено)
+    profiling_enabled: bool = False
+    profiling_sample_every: int = 100
+    profiling_slow_ms: float = 500
+    profiling_interval_ms: float = 5
+    profiling_output_dir: Optional[str] = None
     
     # API
     api_v1_prefix: str = "/api/v1"
     title: str = "Task Service"
     version: str = "0.1.0"
     
+    # Pagination
+    default_page_size: int = 50
+    max_page_size: int = 500
+    
+    # Search (GET /tasks/search): mongo — текстовый индекс title + description,
+    # index — инвертированный индекс в памяти пода: строится при старте и обновляется
+    # записями TaskService этого пода (для одного экземпляра; при storage_backend=memory — всегда)
+    search_backend: str = "mongo"
+    search_max_offset: int = 1000  # глубже по релевантности не листаем
+    
+    # Statistics: счетчики в task_stats, разложенные по N документам (меньше конфликтов записи)
+    stats_shards: int = 8
+    
+    # Bulk endpoints: максимум элементов в одном запросе
+    bulk_max_items: int = 500
+    
+    # SLA (UC007): контроль сроков due_date в фоне
+    sla_enabled: bool = True
+    sla_escalation_minutes: int = 60  # эскалация через столько минут после нарушения срока
+    sla_horizon_hours: float = 24  # окно сроков, загружаемое в память одним запросом
+    
+    # Live events (SSE): service — публикует TaskService этого пода,
+    # change_stream — один change stream коллекции tasks (нужен replica set), off
+    events_source: str = "service"
+    events_subscriber_buffer: int = 256  # кадров на подписчика; переполнение закрывает поток
+    events_max_subscribers: int = 10000
+    events_replay_size: int = 1000  # последние события для Last-Event-ID
+    events_heartbeat_seconds: float = 15
+    
+    # Notification Service (UC015): outbox notification_outbox + фоновая отправка пачками.
+    # Без notifications_url уведомления не пишутся и не отправляются
+    notifications_url: Optional[str] = None
+    notifications_channel: str = "telegram"
+    notifications_batch_size: int = 100
+    notifications_poll_interval_ms: int = 500
+    notifications_lease_seconds: float = 30  # пачка закреплена за подом, пока идет отправка
+    notifications_max_attempts: int = 10
+    notifications_backoff_base_ms: int = 500
+    notifications_backoff_max_seconds: float = 300
+    notifications_timeout_seconds: float = 5
+    notifications_max_connections: int = 10
+    
+    # Rate limiting (/api/v1): token bucket на пользователя (sub); с REDIS_URL — общий
+    # для всех подов, без него или при ошибках Redis — в каждом поде свой. Сверх — 429.
+    # Выключено по умолчанию: бот ходит с одним токеном на всех — это одна корзина
+    rate_limit_enabled: bool = False
+    rate_limit_per_second: float = 20
+    rate_limit_burst: int = 40
+    
+    # Admission control (/api/v1): предел одновременных запросов подстраивается
+    # под задержку команд MongoDB; сверх предела — сразу 503, без очереди (выключено по умолчанию)
+    admission_enabled: bool = False
+    admission_initial_limit: int = 50
+    admission_min_limit: int = 5
+    admission_max_limit: int = 400
+    admission_latency_tolerance: float = 1.5  # во сколько раз задержка может вырасти без снижения предела
+    
+    # Idempotency-Key (POST /tasks, PATCH status/assign, POST rating): ответы хранятся
+    # в idempotency_keys (TTL-индекс) и в локальном кэше пода
+    idempotency_ttl_seconds: int = 86400
+    idempotency_cache_size: int = 10000
+    idempotency_wait_seconds: float = 5  # повтор ждет параллельный запрос с тем же ключом, затем 409
+    idempotency_lock_seconds: float = 30  # резерв упавшего запроса (pod убит) занимает ключ не дольше
+    
     # Task settings
     priority_hours: dict = {
         "low": 72,
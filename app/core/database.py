@@ -1,27 +1,95 @@
+import asyncio
+import logging
+
 from motor.motor_asyncio import AsyncIOMotorClient
 from core.config import settings
+from core.admission import MongoLatencyListener, concurrency_limit
+from core.metrics import MongoCommandListener
+from infrastructure.history_writer import HistoryWriter
+from infrastructure.indexes import ensure_indexes, check_hot_queries
+
+logger = logging.getLogger(__name__)
 
 
 class DatabaseManager:
     client: AsyncIOMotorClient = None
     database = None
+    history_writer: HistoryWriter = None
 
 
 db_manager = DatabaseManager()
 
 
+def client_options() -> dict:
+    """Параметры пула соединений, таймаутов и сжатия из Settings"""
+    options = {
+        "maxPoolSize": settings.mongo_max_pool_size,
+        "minPoolSize": settings.mongo_min_pool_size,
+        "maxIdleTimeMS": settings.mongo_max_idle_time_ms,
+        "waitQueueTimeoutMS": settings.mongo_wait_queue_timeout_ms,
+        "connectTimeoutMS": settings.mongo_connect_timeout_ms,
+        "serverSelectionTimeoutMS": settings.mongo_server_selection_timeout_ms,
+        "socketTimeoutMS": settings.mongo_socket_timeout_ms,
+    }
+    if settings.mongo_compressors:
+        options["compressors"] = settings.mongo_compressors
+        options["zlibCompressionLevel"] = settings.mongo_zlib_compression_level
+    return options
+
+
+async def warm_up_pool(database, connections: int) -> None:
+    """
+    Открывает connections соединений заранее: одновременные ping занимают
+    каждый свое соединение, и первые запросы не платят за TCP и handshake.
+    """
+    if connections > 0:
+        await asyncio.gather(*(database.command("ping") for _ in range(connections)))
+
+
 async def connect_to_mongo():
     """Создает соединение с MongoDB"""
-    db_manager.client = AsyncIOMotorClient(settings.mongo_url)
+    listeners = [MongoCommandListener()] if settings.metrics_enabled else []
+    if settings.admission_enabled:
+        listeners.append(MongoLatencyListener(concurrency_limit))
+    db_manager.client = AsyncIOMotorClient(settings.mongo_url, event_listeners=listeners, **client_options())
     db_manager.database = db_manager.client.get_database()
+    
+    # Индексы из реестра + проверка, что горячие запросы не сканируют коллекцию
+    await ensure_indexes(db_manager.database)
+    await check_hot_queries(db_manager.database, settings.index_check)
+    await warm_up_pool(db_manager.database, settings.mongo_min_pool_size)
+    
+    # Запись истории пачками в фоне
+    db_manager.history_writer = HistoryWriter(db_manager.database["task_history"])
+    db_manager.history_writer.start()
 
 
 async def close_mongo_connection():
     """Закрывает соединение с MongoDB"""
+    # Сначала дописываем историю, пока соединение еще открыто
+    if db_manager.history_writer:
+        await db_manager.history_writer.close()
+        db_manager.history_writer = None
     if db_manager.client:
         db_manager.client.close()
+        db_manager.client = None
+
+
+async def ping_database() -> bool:
+    """Проверка соединения для /ready"""
+    try:
+        await db_manager.database.command("ping")
+        return True
+    except Exception as e:
+        logger.warning("MongoDB ping failed: %s", e)
+        return False
 
 
 def get_database():
     """Получает экземпляр базы данных"""
-    return db_manager.database
\ No newline at end of file
+    return db_manager.database
+
+
+def get_history_writer():
+    """Получает фоновый писатель истории (None, если соединение не открыто)"""
+    return db_manager.history_writer
@@ -0,0 +1,118 @@
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from pymongo import monitoring
+
+# Бакеты в секундах: от долей миллисекунды (Mongo по индексу) до секунд
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REQUEST_LATENCY = Histogram(
+    "task_service_request_duration_seconds",
+    "Время обработки запроса (зависимости, обработчик, сериализация)",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    "task_service_requests_total",
+    "Ответы по маршрутам и кодам",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "task_service_requests_in_flight",
+    "Запросы, которые сейчас обрабатываются",
+    ["method", "route"],
+)
+MONGO_COMMAND_LATENCY = Histogram(
+    "task_service_mongo_command_duration_seconds",
+    "Время выполнения команд MongoDB",
+    ["command", "collection"],
+    buckets=LATENCY_BUCKETS,
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "task_service_mongo_command_failures_total",
+    "Команды MongoDB, завершившиеся ошибкой",
+    ["command", "collection"],
+)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Замеряет команды MongoDB по имени команды и коллекции. Длительность берется
+    из события драйвера, поэтому на каждую команду — только запись в гистограмму.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple, str] = {}
+
+    @staticmethod
+    def _key(event) -> Tuple:
+        return event.connection_id, event.request_id
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        collection = event.command.get(event.command_name)
+        self._pending[self._key(event)] = collection if isinstance(collection, str) else ""
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        collection = self._pending.pop(self._key(event), "")
+        MONGO_COMMAND_LATENCY.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection = self._pending.pop(self._key(event), "")
+        MONGO_COMMAND_LATENCY.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(event.command_name, collection).inc()
+
+
+class StatsCollector:
+    """
+    Отдает счетчики компонентов (JWKS, кэш токенов, кэш задач, писатель истории)
+    в момент сбора метрик. Компоненты продолжают вести свои словари stats,
+    горячий путь ничего не знает о Prometheus.
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, Tuple[Callable[[], Optional[dict]], Iterable[str]]] = {}
+
+    def register(self, name: str, source: Callable[[], Optional[dict]], gauges: Iterable[str] = ()) -> None:
+        self._sources[name] = (source, tuple(gauges))
+
+    def collect(self):
+        for name, (source, gauges) in self._sources.items():
+            stats = source()
+            if not stats:
+                continue
+            for key, value in stats.items():
+                metric_name = f"task_service_{name}_{key}"
+                if key in gauges:
+                    yield GaugeMetricFamily(metric_name, f"{name} {key}", value=value)
+                else:
+                    yield CounterMetricFamily(metric_name, f"{name} {key}", value=value)
+
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+
+def register_stats(name: str, source: Callable[[], Optional[dict]], gauges: Iterable[str] = ()) -> None:
+    """Подключает словарь stats компонента к /metrics (повторная регистрация заменяет источник)"""
+    stats_collector.register(name, source, gauges)
+
+
+class RouteTimer:
+    """Метрики одного маршрута: дочерние серии создаются один раз, а не на каждый запрос"""
+
+    def __init__(self, method: str, route: str):
+        self.method = method
+        self.route = route
+        self.latency = REQUEST_LATENCY.labels(method, route)
+        self.in_flight = REQUESTS_IN_FLIGHT.labels(method, route)
+
+    def start(self) -> float:
+        self.in_flight.inc()
+        return time.perf_counter()
+
+    def stop(self, started: float, status: int) -> None:
+        self.latency.observe(time.perf_counter() - started)
+        self.in_flight.dec()
+        REQUESTS.labels(self.method, self.route, str(status)).inc()
@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, Optional, Tuple
+
+
+def fold_stack(frame) -> str:
+    """Стек в формате folded (root;...;leaf) — вход для flamegraph.pl и speedscope"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Семплирующий профайлер потока event loop. Фоновый поток раз в interval
+    секунд снимает стек (sys._current_frames), но только пока есть хотя бы
+    один профилируемый запрос. Профиль запроса — семплы за время его жизни;
+    под конкурентной нагрузкой в них попадает и работа соседних запросов.
+    """
+
+    def __init__(self, interval: float = 0.005, max_samples: int = 100_000, max_profiles: int = 100):
+        self.interval = interval
+        self._samples: Deque[Tuple[float, str]] = deque(maxlen=max_samples)
+        self._active = 0
+        self._target: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self.profiles: Deque[dict] = deque(maxlen=max_profiles)
+
+    def start(self) -> None:
+        """Запускает семплирование потока, из которого вызван (поток event loop)"""
+        if self._thread is not None:
+            return
+        self._target = threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            if not self._active:
+                continue
+            frame = sys._current_frames().get(self._target)
+            if frame is not None:
+                self._samples.append((time.perf_counter(), fold_stack(frame)))
+
+    def begin(self) -> float:
+        # Поток event loop может смениться (например, TestClient без with)
+        self._target = threading.get_ident()
+        self.start()
+        self._active += 1
+        return time.perf_counter()
+
+    def end(self) -> float:
+        self._active -= 1
+        return time.perf_counter()
+
+    def collect(self, started: float, ended: float) -> Dict[str, int]:
+        """Свернутые стеки (стек -> число семплов) за интервал [started, ended]"""
+        return dict(Counter(stack for at, stack in list(self._samples) if started <= at <= ended))
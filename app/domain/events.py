@@ -0,0 +1,199 @@
+import asyncio
+import json
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from core.config import settings
+from domain.models import Task
+
+EVENT_TYPES = (
+    "task_created", "task_status_changed", "task_assigned", "task_rated",
+    "sla_breached", "sla_escalated",
+)
+
+# Поля задачи, по которым подписчик может фильтровать события
+FILTER_FIELDS = ("status", "category", "priority", "location_id", "assigned_to", "created_by")
+
+HEARTBEAT = b": ping\n\n"
+
+
+class SubscriberLimitError(Exception):
+    """Достигнут предел числа подписчиков"""
+
+
+class Subscription:
+    """
+    Один подписчик: ограниченная очередь готовых SSE-кадров. Если подписчик
+    не успевает и очередь переполнилась, вместо новых событий он получает
+    None — поток закрывается, клиент переподключается и досинхронизируется.
+    """
+
+    def __init__(self, key: Tuple, buffer: int):
+        self.key = key
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, buffer))
+        self.overflowed = False
+
+    def offer(self, frame: bytes) -> bool:
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            self.end()
+            return False
+
+    def end(self) -> None:
+        """Закрывает поток подписчика: недоставленное выбрасывается, в очереди — только None"""
+        self.overflowed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+def _filter_key(filters: Dict[str, Optional[str]], types: Optional[List[str]]) -> Tuple:
+    return (
+        tuple((field, filters[field]) for field in FILTER_FIELDS if filters.get(field) is not None),
+        frozenset(types) if types else None,
+    )
+
+
+def _matches(key: Tuple, event_type: str, task: dict) -> bool:
+    conditions, types = key
+    if types is not None and event_type not in types:
+        return False
+    return all(task.get(field) == value for field, value in conditions)
+
+
+class EventBus:
+    """
+    Шина событий задач внутри процесса: один источник (TaskService или change
+    stream), много подписчиков. Событие сериализуется в SSE-кадр один раз;
+    подписчики сгруппированы по фильтру, и каждый фильтр проверяется один раз
+    на событие, сколько бы подписчиков его ни разделяли. Последние события
+    хранятся для досылки по Last-Event-ID после переподключения.
+    """
+
+    def __init__(
+        self,
+        buffer: int = settings.events_subscriber_buffer,
+        max_subscribers: int = settings.events_max_subscribers,
+        replay_size: int = settings.events_replay_size,
+        heartbeat: float = settings.events_heartbeat_seconds,
+    ):
+        self.buffer = buffer
+        self.max_subscribers = max_subscribers
+        self.heartbeat = heartbeat
+        self._groups: Dict[Tuple, Set[Subscription]] = {}
+        self._count = 0
+        self._seq = 0
+        self._replay: Deque[Tuple[int, str, dict, bytes]] = deque(maxlen=max(0, replay_size))
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.stats = {"published": 0, "delivered": 0, "overflows": 0}
+
+    @property
+    def subscribers(self) -> int:
+        return self._count
+
+    def subscribe(
+        self,
+        filters: Dict[str, Optional[str]],
+        types: Optional[List[str]] = None,
+        last_event_id: Optional[int] = None,
+    ) -> Subscription:
+        if self._count >= self.max_subscribers:
+            raise SubscriberLimitError("Too many event subscribers")
+        key = _filter_key(filters, types)
+        subscription = Subscription(key, self.buffer)
+        # Досылаем пропущенное, если запрошенный id еще есть в буфере
+        if last_event_id is not None and self._replay and last_event_id >= self._replay[0][0] - 1:
+            for seq, event_type, task, frame in self._replay:
+                if seq > last_event_id and _matches(key, event_type, task):
+                    subscription.offer(frame)
+        self._groups.setdefault(key, set()).add(subscription)
+        self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        group = self._groups.get(subscription.key)
+        if group is None or subscription not in group:
+            return
+        group.discard(subscription)
+        self._count -= 1
+        if not group:
+            del self._groups[subscription.key]
+
+    def publish(self, event_type: str, task: Task, **extra) -> None:
+        """Рассылает событие подписчикам (без await — не задерживает запрос)"""
+        self._seq += 1
+        task_data = task.model_dump(mode="json")
+        payload = {
+            "id": self._seq,
+            "type": event_type,
+            "timestamp": datetime.now().isoformat(),
+            "task": task_data,
+            **extra,
+        }
+        frame = f"id: {self._seq}\nevent: {event_type}\ndata: {json.dumps(payload, default=str)}\n\n".encode()
+        self._replay.append((self._seq, event_type, task_data, frame))
+        self.stats["published"] += 1
+
+        for key, group in list(self._groups.items()):
+            if not _matches(key, event_type, task_data):
+                continue
+            for subscription in group:
+                lagging = subscription.overflowed
+                if subscription.offer(frame):
+                    self.stats["delivered"] += 1
+                elif not lagging:
+                    self.stats["overflows"] += 1
+
+    async def publish_sla(self, event: dict) -> None:
+        """Слушатель SLAMonitor: события SLA идут в ту же шину"""
+        extra = {k: v for k, v in event.items() if k not in ("type", "task", "task_id", "status")}
+        self.publish(event["type"], event["task"], **extra)
+
+    def start(self) -> None:
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.ensure_future(self._send_heartbeats())
+
+    async def _send_heartbeats(self) -> None:
+        # Один таймер на все подписки вместо таймаута ожидания в каждом потоке
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            for group in list(self._groups.values()):
+                for subscription in group:
+                    if not subscription.overflowed and not subscription.queue.full():
+                        subscription.queue.put_nowait(HEARTBEAT)
+
+    async def close(self) -> None:
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        for group in list(self._groups.values()):
+            for subscription in group:
+                subscription.end()
+
+
+async def event_stream(bus: EventBus, subscription: Subscription, retry_ms: int = 3000):
+    """Тело SSE-ответа: кадры из очереди подписчика до отключения клиента"""
+    try:
+        yield f"retry: {retry_ms}\n\n".encode()
+        while True:
+            frame = await subscription.queue.get()
+            if frame is None:
+                # Подписчик отстал (или сервис останавливается) — клиент переподключится
+                yield b"event: overflow\ndata: {}\n\n"
+                return
+            yield frame
+    finally:
+        bus.unsubscribe(subscription)
+
+
+# Одна шина на процесс: все SSE-подписчики пода читают из нее
+event_bus = EventBus()
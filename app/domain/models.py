@@ -1,7 +1,9 @@
 import uuid
 from datetime import datetime, timedelta
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel, Field, SerializeAsAny, create_model
+from pydantic.fields import FieldInfo
 
 from core.config import settings
 
@@ -29,6 +31,83 @@ class Task(BaseModel):
     attachments: List[str] = []
     rating: Optional[int] = None
     rating_comment: Optional[str] = None
+    sla_level: int = 0  # 0 — в срок, 1 — срок нарушен, 2 — эскалирована
+    version: int = 0  # растет на 1 при каждом изменении, из него ETag
+
+
+def parse_task_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """'title,status' -> ('id', 'status', 'title'); id отдается всегда, None — все поля"""
+    if not fields:
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = names - Task.model_fields.keys()
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(sorted(names | {"id"}))
+
+
+@lru_cache(maxsize=256)
+def partial_task_model(fields: Tuple[str, ...], hidden: Tuple[str, ...] = ()) -> Type[BaseModel]:
+    """
+    Модель с подмножеством полей Task: по ее полям строится проекция MongoDB,
+    и валидируются только они. hidden — поля, нужные сервису (ключ курсора),
+    которые не попадают в ответ.
+    """
+    definitions = {}
+    for name in fields + tuple(name for name in hidden if name not in fields):
+        info = Task.model_fields[name]
+        if name not in fields:
+            info = FieldInfo.merge_field_infos(info, exclude=True)
+        definitions[name] = (info.annotation, info)
+    return create_model("PartialTask", **definitions)
+
+
+def project_task(task: "Task", view: Type[BaseModel]) -> BaseModel:
+    """Уже загруженная задача -> частичная модель view"""
+    return view.model_validate({name: getattr(task, name) for name in view.model_fields})
+
+
+class TaskFilter(BaseModel):
+    """Фильтры списка задач (все условия объединяются через И)"""
+    status: Optional[str] = None
+    category: Optional[str] = None
+    priority: Optional[str] = None
+    location_id: Optional[str] = None
+    assigned_to: Optional[str] = None
+    created_by: Optional[str] = None
+    due_from: Optional[datetime] = None
+    due_to: Optional[datetime] = None
+
+
+class TaskPage(BaseModel):
+    items: List[SerializeAsAny[BaseModel]]  # Task или частичная модель (fields=)
+    next_cursor: Optional[str] = None
+
+
+class TaskStats(BaseModel):
+    """Сводка по задачам для дашборда (из счетчиков, без сканирования задач)"""
+    total: int = 0
+    by_status: Dict[str, int] = {}
+    by_category: Dict[str, int] = {}
+    by_priority: Dict[str, int] = {}
+    rated: int = 0
+    average_rating: Optional[float] = None
+    completed: int = 0
+    average_completion_hours: Optional[float] = None
+
+
+class BulkItemResult(BaseModel):
+    """Результат одного элемента bulk-запроса (index — позиция в запросе)"""
+    index: int
+    ok: bool
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    items: List[BulkItemResult]
 
 
 class TaskStatusUpdate(BaseModel):
@@ -39,6 +118,14 @@ class TaskAssignment(BaseModel):
     assigned_to: str
 
 
+class TaskBulkStatusItem(TaskStatusUpdate):
+    id: str
+
+
+class TaskBulkAssignItem(TaskAssignment):
+    id: str
+
+
 class TaskRating(BaseModel):
     rating: int = Field(..., ge=1, le=5)
     comment: Optional[str] = None
@@ -58,6 +145,34 @@ class TaskHistoryRecord(BaseModel):
     comment: Optional[str] = None
 
 
+class Notification(BaseModel):
+    """Уведомление в outbox: ждет отправки в Notification Service (UC015)"""
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    event_type: str
+    task_id: str
+    recipient_id: str
+    message: str
+    channel: str
+    created_at: datetime
+    next_attempt_at: datetime
+    attempts: int = 0
+    status: str = "pending"  # pending | failed (попытки исчерпаны или получатель отверг)
+    last_error: Optional[str] = None
+
+
+class IdempotencyRecord(BaseModel):
+    """Ответ на запрос с Idempotency-Key: повтор запроса получает его, а не выполняется заново"""
+    key: str  # sub пользователя + Idempotency-Key
+    fingerprint: str  # метод, путь и тело первого запроса
+    status: str = "pending"  # pending — запрос выполняется, done — ответ сохранен
+    status_code: Optional[int] = None
+    body: Optional[bytes] = None
+    headers: Dict[str, str] = {}
+    created_at: datetime
+    expires_at: datetime
+    locked_until: Optional[datetime] = None  # pending после этого времени считается брошенным
+
+
 def generate_task_id() -> str:
     """Генерирует уникальный ID для задачи"""
     return f"T-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
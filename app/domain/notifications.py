@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import List, Optional
+
+from core.config import settings
+from domain.models import Notification, Task
+
+# Текст для заявителя при смене статуса его заявки
+STATUS_MESSAGES = {
+    "assigned": "назначена исполнителю",
+    "in_progress": "взята в работу",
+    "completed": "выполнена",
+    "closed": "закрыта",
+    "rejected": "отклонена",
+}
+
+
+def _notification(event_type: str, task: Task, recipient_id: Optional[str], message: str, now: datetime) -> List[Notification]:
+    if not recipient_id:
+        return []
+    return [Notification(
+        event_type=event_type,
+        task_id=task.id,
+        recipient_id=recipient_id,
+        message=message,
+        channel=settings.notifications_channel,
+        created_at=now,
+        next_attempt_at=now,
+    )]
+
+
+def build_notifications(event_type: str, task: Task, now: Optional[datetime] = None, **extra) -> List[Notification]:
+    """
+    Событие задачи -> уведомления (UC015): заявителю — о смене статуса,
+    исполнителю — о назначении и о нарушении срока. Для прочих событий — [].
+    """
+    now = now or datetime.now()
+    if event_type == "task_status_changed" and task.status in STATUS_MESSAGES:
+        message = f"Ваша заявка {task.id} {STATUS_MESSAGES[task.status]}"
+        return _notification(event_type, task, task.created_by, message, now)
+    if event_type == "task_assigned":
+        return (
+            _notification(event_type, task, task.assigned_to, f"Вам назначена заявка {task.id}: {task.title}", now)
+            + _notification(event_type, task, task.created_by, f"Ваша заявка {task.id} {STATUS_MESSAGES['assigned']}", now)
+        )
+    if event_type == "sla_breached":
+        return _notification(event_type, task, task.assigned_to, f"Нарушен срок заявки {task.id}: {task.title}", now)
+    if event_type == "sla_escalated":
+        minutes = extra.get("overdue_minutes")
+        message = f"Эскалация: заявка {task.id} просрочена на {minutes} мин"
+        return _notification(event_type, task, task.assigned_to, message, now)
+    return []
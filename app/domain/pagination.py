@@ -0,0 +1,79 @@
+import base64
+import binascii
+import hashlib
+import json
+from datetime import datetime
+from typing import Tuple
+
+from domain.models import Task, TaskFilter
+
+
+# Поля, по которым можно сортировать список; второй ключ всегда id (уникальный).
+# Задачи без значения поля (due_date=None) в такую сортировку не попадают
+SORT_FIELDS = ("created_at", "due_date")
+DEFAULT_SORT = "-created_at"
+SORT_PATTERN = r"^-?(created_at|due_date)$"
+
+
+class InvalidCursorError(ValueError):
+    """Курсор повреждён или выдан для другой сортировки"""
+
+
+def parse_sort(sort: str) -> Tuple[str, int]:
+    """Разбирает сортировку вида 'created_at' / '-created_at' в (поле, направление)"""
+    field = sort.lstrip("-")
+    if field not in SORT_FIELDS:
+        raise ValueError(f"Unsupported sort field: {field}")
+    return field, -1 if sort.startswith("-") else 1
+
+
+def encode_cursor(task: Task, sort: str) -> str:
+    """Непрозрачный курсор на позицию после задачи task"""
+    field, _ = parse_sort(sort)
+    value = getattr(task, field)
+    if value is None:
+        raise ValueError(f"Task {task.id} has no {field} to continue the sort from")
+    raw = json.dumps({"s": sort, "v": value.isoformat(), "id": task.id})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[datetime, str]:
+    """Возвращает (значение поля сортировки, id) последней задачи предыдущей страницы"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if data["s"] != sort:
+            raise InvalidCursorError("Cursor was issued for a different sort order")
+        return datetime.fromisoformat(data["v"]), str(data["id"])
+    except InvalidCursorError:
+        raise
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError("Invalid cursor") from e
+
+
+def search_key(query: str, filters: TaskFilter) -> str:
+    """Короткий отпечаток поискового запроса: курсор действителен только для него"""
+    raw = json.dumps([query, filters.model_dump(mode="json", exclude_none=True)], sort_keys=True)
+    return hashlib.blake2b(raw.encode(), digest_size=6).hexdigest()
+
+
+def encode_offset_cursor(offset: int, key: str) -> str:
+    """Курсор по результатам поиска: позиция в ранжированном списке"""
+    raw = json.dumps({"q": key, "o": offset})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_offset_cursor(cursor: str, key: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if data["q"] != key:
+            raise InvalidCursorError("Cursor was issued for a different search")
+        offset = int(data["o"])
+        if offset < 0:
+            raise ValueError("Negative offset")
+        return offset
+    except InvalidCursorError:
+        raise
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError("Invalid cursor") from e
@@ -1,7 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Type
 
-from domain.models import Task, TaskHistoryRecord
+from pydantic import BaseModel
+
+from domain.models import IdempotencyRecord, Notification, Task, TaskFilter, TaskHistoryRecord
 
 
 class TaskRepository(ABC):
@@ -12,23 +15,194 @@ class TaskRepository(ABC):
         pass
     
     @abstractmethod
-    async def get_by_id(self, task_id: str) -> Optional[Task]:
+    async def create_many(self, tasks: List[Task]) -> List[Optional[str]]:
+        """
+        Сохраняет задачи одной пачкой, не останавливаясь на ошибках.
+        Возвращает для каждой задачи None (успех) или текст ошибки.
+        """
+        pass
+    
+    @abstractmethod
+    async def get_by_id(self, task_id: str, view: Optional[Type[BaseModel]] = None) -> Optional[Task]:
+        """
+        view — частичная модель (partial_task_model): читаются и валидируются
+        только ее поля, и возвращается она вместо Task. То же у get_many и get_all.
+        """
+        pass
+    
+    @abstractmethod
+    async def get_many(self, task_ids: List[str], view: Optional[Type[BaseModel]] = None) -> List[Task]:
+        """Задачи по списку id в том же порядке (отсутствующие пропускаются)"""
+        pass
+    
+    @abstractmethod
+    async def get_all(
+        self,
+        filters: TaskFilter,
+        limit: int,
+        after: Optional[Tuple[datetime, str]] = None,
+        sort: str = "-created_at",
+        view: Optional[Type[BaseModel]] = None
+    ) -> List[Task]:
+        """
+        Страница задач по фильтрам в порядке sort (вторичный ключ — id).
+        after — (значение поля сортировки, id) последней задачи предыдущей страницы.
+        """
+        pass
+    
+    @abstractmethod
+    async def update_status(
+        self, task_id: str, status: str, from_statuses: List[str], version: Optional[int] = None
+    ) -> Optional[Tuple[Task, Task]]:
+        """
+        Атомарно меняет статус, только если текущий статус входит в from_statuses
+        (и version совпадает с текущей версией задачи, если задана).
+        Возвращает (задача до изменения, задача после) или None, если задача
+        не найдена, переход недопустим или версия устарела.
+        Любое изменение задачи увеличивает ее version на 1.
+        """
+        pass
+    
+    @abstractmethod
+    async def assign_task(
+        self, task_id: str, assigned_to: str, from_statuses: List[str], version: Optional[int] = None
+    ) -> Optional[Tuple[Task, Task]]:
+        """Атомарно назначает исполнителя и ставит статус 'assigned' (аналогично update_status)"""
+        pass
+    
+    @abstractmethod
+    async def bulk_update(
+        self, updates: List[Tuple[str, dict, List[str]]]
+    ) -> List[Tuple[Optional[Task], Optional[Task]]]:
+        """
+        Пакетное условное обновление: для каждого (task_id, изменения, допустимые статусы)
+        возвращает (задача до изменения, задача после).
+        (None, None) — задача не найдена; (задача, None) — статус не подходит
+        или задачу успели изменить параллельно.
+        """
+        pass
+    
+    @abstractmethod
+    async def rate_task(
+        self, task_id: str, rating: int, comment: Optional[str], from_statuses: List[str],
+        version: Optional[int] = None
+    ) -> Optional[Tuple[Task, Task]]:
+        """
+        Сохраняет оценку, только если статус задачи входит в from_statuses
+        (и версия совпадает, как в update_status).
+        Возвращает (задача до изменения, задача после) или None.
+        """
+        pass
+    
+    @abstractmethod
+    async def get_open_deadlines(
+        self, statuses: List[str], until: datetime, below_level: int
+    ) -> List[Tuple[str, datetime, int]]:
+        """
+        Сроки незавершенных задач: (id, due_date, sla_level) для задач в статусах
+        statuses с due_date <= until и sla_level ниже below_level (по остальным
+        таймеров уже нет). Один индексный запрос по диапазону due_date.
+        """
+        pass
+    
+    @abstractmethod
+    async def set_sla_level(
+        self, task_id: str, level: int, from_statuses: List[str]
+    ) -> Optional[Tuple[Task, Task]]:
+        """
+        Атомарно поднимает sla_level до level, только если он еще ниже и статус
+        входит в from_statuses. Из нескольких экземпляров сервиса выигрывает один.
+        """
+        pass
+
+
+class TaskSearchIndex(ABC):
+    """Полнотекстовый поиск задач по title и description"""
+    
+    @abstractmethod
+    async def search(self, query: str, filters: TaskFilter, limit: int, offset: int = 0) -> List[str]:
+        """id задач по убыванию релевантности (с учетом фильтров)"""
+        pass
+    
+    @abstractmethod
+    def update(self, task: Task) -> None:
+        """Задача создана или изменилась (вызывается TaskService после записи)"""
         pass
+
+
+class TaskStatsRepository(ABC):
+    """Счетчики для сводной статистики (см. domain.stats)"""
     
     @abstractmethod
-    async def get_all(self, status: Optional[str] = None) -> List[Task]:
+    async def apply(self, delta: Dict[Tuple[str, ...], float]) -> None:
+        """Атомарно прибавляет приращения к счетчикам"""
         pass
     
     @abstractmethod
-    async def update_status(self, task_id: str, status: str) -> Optional[Task]:
+    async def get(self) -> dict:
+        """
+        Текущие счетчики: {"total": n, "status": {...}, "category": {...},
+        "priority": {...}, "rating_count", "rating_sum", "completed_count", "completion_seconds"}
+        """
         pass
     
     @abstractmethod
-    async def assign_task(self, task_id: str, assigned_to: str) -> Optional[Task]:
+    async def rebuild(self) -> dict:
+        """Пересчитывает счетчики по задачам и истории и возвращает их"""
         pass
+
+
+class NotificationOutboxRepository(ABC):
+    """Outbox уведомлений: пишется вместе с задачей, читается фоновой отправкой"""
     
     @abstractmethod
-    async def rate_task(self, task_id: str, rating: int, comment: Optional[str]) -> bool:
+    async def add(self, notifications: List[Notification]) -> None:
+        pass
+    
+    @abstractmethod
+    async def claim(self, limit: int, now: datetime, lease_until: datetime) -> List[Notification]:
+        """
+        Забирает до limit ожидающих уведомлений с next_attempt_at <= now (старые первыми)
+        и переносит их next_attempt_at на lease_until, чтобы их не забрал другой под.
+        Если под упал посреди отправки, пачка снова станет доступна после lease_until.
+        """
+        pass
+    
+    @abstractmethod
+    async def complete(self, ids: List[str]) -> None:
+        """Удаляет доставленные уведомления"""
+        pass
+    
+    @abstractmethod
+    async def reschedule(self, notifications: List[Notification]) -> None:
+        """Сохраняет attempts, next_attempt_at, status и last_error после неудачной отправки"""
+        pass
+
+
+class IdempotencyRepository(ABC):
+    """Ответы на запросы с Idempotency-Key (хранятся до expires_at)"""
+    
+    @abstractmethod
+    async def reserve(self, record: IdempotencyRecord) -> Optional[IdempotencyRecord]:
+        """
+        Атомарно сохраняет pending-запись, если ключа еще нет (или он истек,
+        или его pending-запись брошена — locked_until прошел). None — ключ
+        зарезервирован этим вызовом, иначе — уже существующая запись.
+        """
+        pass
+    
+    @abstractmethod
+    async def complete(self, record: IdempotencyRecord) -> None:
+        """Сохраняет ответ (status=done), если ключ все еще зарезервирован этим запросом"""
+        pass
+    
+    @abstractmethod
+    async def release(self, record: IdempotencyRecord) -> None:
+        """Снимает резерв (pending-запись этого запроса): повтор выполнится заново"""
+        pass
+    
+    @abstractmethod
+    async def get(self, key: str) -> Optional[IdempotencyRecord]:
         pass
 
 
@@ -39,6 +213,10 @@ class TaskHistoryRepository(ABC):
     async def create_record(self, record: TaskHistoryRecord) -> None:
         pass
     
+    @abstractmethod
+    async def create_records(self, records: List[TaskHistoryRecord]) -> None:
+        pass
+    
     @abstractmethod
     async def get_task_history(self, task_id: str) -> List[dict]:
         pass
\ No newline at end of file
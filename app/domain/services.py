@@ -1,24 +1,85 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Callable, List, Optional, Tuple, Union
 
 from fastapi import HTTPException
 
 from core.config import settings
 from domain.models import (
-    Task, TaskCreate, TaskHistoryRecord, 
-    generate_task_id, calculate_due_date
+    BulkItemResult, BulkResult, Task, TaskBulkAssignItem, TaskBulkStatusItem, TaskCreate, TaskFilter, TaskHistoryRecord, TaskPage,
+    TaskStats,
+    generate_task_id, calculate_due_date, parse_task_fields, partial_task_model
 )
-from domain.repositories import TaskRepository, TaskHistoryRepository
+from domain.pagination import (
+    DEFAULT_SORT, InvalidCursorError, decode_cursor, decode_offset_cursor, encode_cursor,
+    encode_offset_cursor, parse_sort, search_key
+)
+from domain import stats
+from domain.events import EventBus
+from domain.notifications import build_notifications
+from domain.repositories import (
+    NotificationOutboxRepository, TaskRepository, TaskHistoryRepository, TaskSearchIndex,
+    TaskStatsRepository
+)
+from domain.sla import SLAMonitor
+
+
+# Оценить можно только завершенную задачу
+RATEABLE_STATUSES = ["completed", "closed"]
+
+
+def source_statuses(target_status: str) -> List[str]:
+    """Статусы, из которых по settings.valid_transitions разрешен переход в target_status"""
+    return [
+        status for status, targets in settings.valid_transitions.items()
+        if target_status in targets
+    ]
 
 
 class TaskService:
     def __init__(
         self, 
         task_repo: TaskRepository, 
-        history_repo: TaskHistoryRepository
+        history_repo: TaskHistoryRepository,
+        sla: Optional[SLAMonitor] = None,
+        stats_repo: Optional[TaskStatsRepository] = None,
+        events: Optional[EventBus] = None,
+        outbox: Optional[NotificationOutboxRepository] = None,
+        search_index: Optional[TaskSearchIndex] = None
     ):
         self.task_repo = task_repo
         self.history_repo = history_repo
+        self.sla = sla
+        self.stats_repo = stats_repo
+        self.events = events
+        self.outbox = outbox
+        self.search_index = search_index
+    
+    def _track(self, task: Task) -> None:
+        """Сообщает контролю сроков и поисковому индексу об изменении задачи"""
+        if self.sla is not None:
+            self.sla.track(task)
+        if self.search_index is not None:
+            self.search_index.update(task)
+    
+    def _publish(self, event_type: str, task: Task, **extra) -> None:
+        """Отдает событие подписчикам (SSE) — без ожидания"""
+        if self.events is not None:
+            self.events.publish(event_type, task, **extra)
+    
+    async def _notify(self, *changes: Tuple[str, Task]) -> None:
+        """Пишет уведомления о (событие, задача) в outbox — отправит NotificationDispatcher"""
+        if self.outbox is None:
+            return
+        notifications = [
+            notification for event_type, task in changes for notification in build_notifications(event_type, task)
+        ]
+        if notifications:
+            await self.outbox.add(notifications)
+    
+    async def _count(self, delta: stats.StatsDelta) -> None:
+        """Обновляет счетчики статистики (один $inc на операцию)"""
+        if self.stats_repo is not None and delta:
+            await self.stats_repo.apply(delta)
     
     async def create_task(self, task_data: TaskCreate, created_by: str) -> Task:
         """Создание новой задачи"""
@@ -50,59 +111,188 @@ class TaskService:
             timestamp=datetime.now()
         )
         await self.history_repo.create_record(history_record)
+        await self._count(stats.created(created_task))
+        self._track(created_task)
+        self._publish("task_created", created_task)
         
         return created_task
     
-    async def get_task(self, task_id: str) -> Task:
-        """Получение задачи по ID"""
-        task = await self.task_repo.get_by_id(task_id)
+    async def create_tasks(self, items: List[TaskCreate], created_by: str) -> BulkResult:
+        """Пакетное создание задач: одна вставка задач и одна вставка истории"""
+        now = datetime.now()
+        tasks = [
+            Task(
+                id=generate_task_id(),
+                **item.model_dump(),
+                status="new",
+                created_by=created_by,
+                created_at=now,
+                due_date=calculate_due_date(item.priority)
+            )
+            for item in items
+        ]
+        
+        errors = await self.task_repo.create_many(tasks)
+        
+        results = []
+        history_records = []
+        for index, (task, error) in enumerate(zip(tasks, errors)):
+            if error:
+                results.append(BulkItemResult(index=index, ok=False, error=error))
+                continue
+            results.append(BulkItemResult(index=index, ok=True, id=task.id))
+            self._track(task)
+            self._publish("task_created", task)
+            history_records.append(TaskHistoryRecord(
+                task_id=task.id,
+                action="created",
+                performed_by=created_by,
+                details={
+                    "title": task.title,
+                    "category": task.category,
+                    "priority": task.priority
+                },
+                timestamp=now
+            ))
+        await self.history_repo.create_records(history_records)
+        await self._count(stats.merge(*(stats.created(task) for task, error in zip(tasks, errors) if not error)))
+        
+        succeeded = len(history_records)
+        return BulkResult(succeeded=succeeded, failed=len(tasks) - succeeded, items=results)
+    
+    @staticmethod
+    def _view(fields: Optional[str], hidden: Tuple[str, ...] = ()):
+        """fields=id,title,... -> частичная модель (None — все поля)"""
+        try:
+            names = parse_task_fields(fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return partial_task_model(names, hidden) if names else None
+    
+    async def get_task(self, task_id: str, fields: Optional[str] = None) -> Task:
+        """Получение задачи по ID (fields — только эти поля; version читается всегда — для ETag)"""
+        task = await self.task_repo.get_by_id(task_id, self._view(fields, hidden=("version",)))
         if not task:
             raise HTTPException(status_code=404, detail="Task not found")
         return task
     
-    async def list_tasks(self, status: Optional[str] = None) -> List[Task]:
-        """Получение списка задач"""
-        return await self.task_repo.get_all(status)
+    async def list_tasks(
+        self,
+        filters: Optional[TaskFilter] = None,
+        limit: int = settings.default_page_size,
+        cursor: Optional[str] = None,
+        sort: str = DEFAULT_SORT,
+        fields: Optional[str] = None
+    ) -> TaskPage:
+        """Получение страницы списка задач"""
+        try:
+            sort_field, _ = parse_sort(sort)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Поле сортировки нужно для курсора, даже если клиент его не запросил
+        view = self._view(fields, hidden=(sort_field,))
+        
+        after = None
+        if cursor:
+            try:
+                after = decode_cursor(cursor, sort)
+            except InvalidCursorError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        
+        limit = max(1, min(limit, settings.max_page_size))
+        # Берем на одну задачу больше — так узнаем, есть ли следующая страница
+        tasks = await self.task_repo.get_all(filters or TaskFilter(), limit + 1, after, sort, view)
+        
+        next_cursor = None
+        if len(tasks) > limit:
+            tasks = tasks[:limit]
+            next_cursor = encode_cursor(tasks[-1], sort)
+        
+        return TaskPage(items=tasks, next_cursor=next_cursor)
+    
+    async def search_tasks(
+        self,
+        query: str,
+        filters: Optional[TaskFilter] = None,
+        limit: int = settings.default_page_size,
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None
+    ) -> TaskPage:
+        """Полнотекстовый поиск по title и description: страница по убыванию релевантности"""
+        if self.search_index is None:
+            raise HTTPException(status_code=503, detail="Search is not available")
+        view = self._view(fields)
+        filters = filters or TaskFilter()
+        key = search_key(query, filters)
+        
+        offset = 0
+        if cursor:
+            try:
+                offset = decode_offset_cursor(cursor, key)
+            except InvalidCursorError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        if offset > settings.search_max_offset:
+            raise HTTPException(status_code=400, detail="Search results are too deep, refine the query")
+        
+        limit = max(1, min(limit, settings.max_page_size))
+        task_ids = await self.search_index.search(query, filters, limit + 1, offset)
+        
+        next_cursor = None
+        if len(task_ids) > limit:
+            task_ids = task_ids[:limit]
+            next_cursor = encode_offset_cursor(offset + limit, key)
+        
+        return TaskPage(items=await self.task_repo.get_many(task_ids, view), next_cursor=next_cursor)
+    
+    async def _raise_update_error(self, task_id: str, detail: str, version: Optional[int] = None) -> None:
+        """
+        Условное обновление не сработало: выясняем причину (нет задачи, задачу
+        изменили после чтения клиентом или недопустимый статус). Лишнее чтение
+        только на пути ошибки.
+        """
+        current_task = await self.task_repo.get_by_id(task_id)
+        if not current_task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        if version is not None and current_task.version != version:
+            raise HTTPException(status_code=412, detail="Task was modified, reload it and retry")
+        raise HTTPException(status_code=400, detail=detail.format(status=current_task.status))
     
     async def update_task_status(
         self, 
         task_id: str, 
         new_status: str, 
-        performed_by: str
+        performed_by: str,
+        version: Optional[int] = None
     ) -> Task:
-        """Обновление статуса задачи"""
+        """Обновление статуса задачи (version — из If-Match)"""
         if new_status not in settings.valid_transitions:
             raise HTTPException(status_code=400, detail="Invalid status")
         
-        # Получаем текущую задачу
-        current_task = await self.task_repo.get_by_id(task_id)
-        if not current_task:
-            raise HTTPException(status_code=404, detail="Task not found")
-        
-        current_status = current_task.status
-        
-        # Проверяем валидность перехода
-        if new_status not in settings.valid_transitions.get(current_status, []):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid status transition from '{current_status}' to '{new_status}'"
+        # Проверка перехода — в фильтре самого обновления, без предварительного чтения
+        result = await self.task_repo.update_status(
+            task_id, new_status, source_statuses(new_status), version
+        )
+        if not result:
+            await self._raise_update_error(
+                task_id, f"Invalid status transition from '{{status}}' to '{new_status}'", version
             )
-        
-        # Обновляем статус
-        updated_task = await self.task_repo.update_status(task_id, new_status)
-        if not updated_task:
-            raise HTTPException(status_code=404, detail="Task not found or status not changed")
+        previous_task, updated_task = result
+        now = datetime.now()
         
         # Создаем запись в истории
         history_record = TaskHistoryRecord(
             task_id=task_id,
             action="status_changed",
-            from_status=current_status,
+            from_status=previous_task.status,
             to_status=new_status,
             performed_by=performed_by,
-            timestamp=datetime.now()
+            timestamp=now
         )
         await self.history_repo.create_record(history_record)
+        await self._count(stats.transition(previous_task, new_status, now))
+        self._track(updated_task)
+        self._publish("task_status_changed", updated_task, from_status=previous_task.status)
+        await self._notify(("task_status_changed", updated_task))
         
         return updated_task
     
@@ -110,53 +300,161 @@ class TaskService:
         self, 
         task_id: str, 
         assigned_to: str, 
-        performed_by: str
+        performed_by: str,
+        version: Optional[int] = None
     ) -> Task:
-        """Назначение исполнителя"""
-        # Получаем текущую задачу
-        current_task = await self.task_repo.get_by_id(task_id)
-        if not current_task:
-            raise HTTPException(status_code=404, detail="Task not found")
-        
-        # Назначаем исполнителя
-        updated_task = await self.task_repo.assign_task(task_id, assigned_to)
-        if not updated_task:
-            raise HTTPException(status_code=404, detail="Task not found")
+        """Назначение исполнителя (version — из If-Match)"""
+        # Назначить можно из статусов, откуда разрешен переход в 'assigned', и переназначить
+        result = await self.task_repo.assign_task(
+            task_id, assigned_to, source_statuses("assigned") + ["assigned"], version
+        )
+        if not result:
+            await self._raise_update_error(task_id, "Cannot assign task in status '{status}'", version)
+        previous_task, updated_task = result
+        now = datetime.now()
         
         # Создаем запись в истории
         history_record = TaskHistoryRecord(
             task_id=task_id,
             action="assigned",
-            previous_assignee=current_task.assigned_to,
+            previous_assignee=previous_task.assigned_to,
             new_assignee=assigned_to,
             performed_by=performed_by,
-            timestamp=datetime.now()
+            timestamp=now
         )
         await self.history_repo.create_record(history_record)
+        await self._count(stats.transition(previous_task, "assigned", now))
+        self._track(updated_task)
+        self._publish("task_assigned", updated_task, previous_assignee=previous_task.assigned_to)
+        await self._notify(("task_assigned", updated_task))
         
         return updated_task
     
+    async def _apply_bulk(
+        self,
+        items: list,
+        plan: Callable[[object], Union[str, Tuple[dict, List[str]]]],
+        error_for: Callable[[Task, object], str],
+        history_for: Callable[[Task, object], TaskHistoryRecord],
+        event_type: str
+    ) -> BulkResult:
+        """
+        Общая часть bulk-операций: plan(item) возвращает (изменения, допустимые статусы)
+        или текст ошибки; все допустимые изменения уходят в репозиторий одной пачкой.
+        """
+        errors: List[Optional[str]] = [None] * len(items)
+        updates = []
+        positions = []
+        seen = set()
+        for index, item in enumerate(items):
+            planned = "Duplicate task id in request" if item.id in seen else plan(item)
+            seen.add(item.id)
+            if isinstance(planned, str):
+                errors[index] = planned
+                continue
+            changes, from_statuses = planned
+            updates.append((item.id, changes, from_statuses))
+            positions.append(index)
+        
+        outcomes = await self.task_repo.bulk_update(updates)
+        
+        history_records = []
+        deltas = []
+        changed = []
+        now = datetime.now()
+        for index, (previous_task, updated_task) in zip(positions, outcomes):
+            if previous_task is None:
+                errors[index] = "Task not found"
+            elif updated_task is None:
+                errors[index] = error_for(previous_task, items[index])
+            else:
+                history_records.append(history_for(previous_task, items[index]))
+                deltas.append(stats.transition(previous_task, updated_task.status, now))
+                self._track(updated_task)
+                self._publish(event_type, updated_task, from_status=previous_task.status)
+                changed.append((event_type, updated_task))
+        await self.history_repo.create_records(history_records)
+        await self._count(stats.merge(*deltas))
+        await self._notify(*changed)
+        
+        results = [
+            BulkItemResult(index=index, ok=error is None, id=item.id, error=error)
+            for index, (item, error) in enumerate(zip(items, errors))
+        ]
+        succeeded = len(history_records)
+        return BulkResult(succeeded=succeeded, failed=len(items) - succeeded, items=results)
+    
+    async def bulk_update_status(
+        self,
+        items: List[TaskBulkStatusItem],
+        performed_by: str
+    ) -> BulkResult:
+        """Пакетная смена статусов с проверкой переходов по каждой задаче"""
+        def plan(item):
+            if item.status not in settings.valid_transitions:
+                return "Invalid status"
+            return {"status": item.status}, source_statuses(item.status)
+        
+        def error_for(task, item):
+            return f"Invalid status transition from '{task.status}' to '{item.status}'"
+        
+        def history_for(task, item):
+            return TaskHistoryRecord(
+                task_id=task.id,
+                action="status_changed",
+                from_status=task.status,
+                to_status=item.status,
+                performed_by=performed_by,
+                timestamp=datetime.now()
+            )
+        
+        return await self._apply_bulk(items, plan, error_for, history_for, "task_status_changed")
+    
+    async def bulk_assign(
+        self,
+        items: List[TaskBulkAssignItem],
+        performed_by: str
+    ) -> BulkResult:
+        """Пакетное назначение исполнителей"""
+        from_statuses = source_statuses("assigned") + ["assigned"]
+        
+        def plan(item):
+            return {"status": "assigned", "assigned_to": item.assigned_to}, from_statuses
+        
+        def error_for(task, item):
+            return f"Cannot assign task in status '{task.status}'"
+        
+        def history_for(task, item):
+            return TaskHistoryRecord(
+                task_id=task.id,
+                action="assigned",
+                previous_assignee=task.assigned_to,
+                new_assignee=item.assigned_to,
+                performed_by=performed_by,
+                timestamp=datetime.now()
+            )
+        
+        return await self._apply_bulk(items, plan, error_for, history_for, "task_assigned")
+    
     async def rate_task(
         self, 
         task_id: str, 
         rating: int, 
         comment: Optional[str], 
-        performed_by: str
+        performed_by: str,
+        version: Optional[int] = None
     ) -> dict:
-        """Оценка задачи"""
-        # Проверяем, что задача существует и завершена
-        task = await self.task_repo.get_by_id(task_id)
-        if not task or task.status not in ["completed", "closed"]:
+        """Оценка задачи (version — из If-Match)"""
+        # Сохраняем оценку, только если задача существует и завершена
+        result = await self.task_repo.rate_task(task_id, rating, comment, RATEABLE_STATUSES, version)
+        if not result:
+            if version is not None:
+                await self._raise_update_error(task_id, "Can only rate completed or closed tasks", version)
             raise HTTPException(
                 status_code=400, 
                 detail="Can only rate completed or closed tasks"
             )
         
-        # Сохраняем оценку
-        success = await self.task_repo.rate_task(task_id, rating, comment)
-        if not success:
-            raise HTTPException(status_code=500, detail="Failed to save rating")
-        
         # Создаем запись в истории
         history_record = TaskHistoryRecord(
             task_id=task_id,
@@ -167,10 +465,24 @@ class TaskService:
             timestamp=datetime.now()
         )
         await self.history_repo.create_record(history_record)
+        await self._count(stats.rated(result[0], rating))
+        self._publish("task_rated", result[1], rating=rating)
         
-        return {"task_id": task_id, "rating": rating, "comment": comment}
+        return {"task_id": task_id, "rating": rating, "comment": comment, "version": result[1].version}
     
     async def get_task_history(self, task_id: str) -> dict:
         """Получение истории задачи"""
         history = await self.history_repo.get_task_history(task_id)
-        return {"task_id": task_id, "history": history}
\ No newline at end of file
+        return {"task_id": task_id, "history": history}
+    
+    async def get_stats(self) -> TaskStats:
+        """Сводная статистика из счетчиков (O(1), без чтения задач)"""
+        if self.stats_repo is None:
+            raise HTTPException(status_code=503, detail="Statistics are not available")
+        return stats.to_stats(await self.stats_repo.get())
+    
+    async def rebuild_stats(self) -> TaskStats:
+        """Пересчет счетчиков по задачам и истории (полный проход — только по запросу)"""
+        if self.stats_repo is None:
+            raise HTTPException(status_code=503, detail="Statistics are not available")
+        return stats.to_stats(await self.stats_repo.rebuild())
\ No newline at end of file
@@ -0,0 +1,212 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.config import settings
+from domain.models import Task, TaskHistoryRecord
+from domain.repositories import TaskRepository, TaskHistoryRepository
+
+logger = logging.getLogger(__name__)
+
+# Срок контролируется, пока задача не завершена
+SLA_OPEN_STATUSES = ["new", "assigned", "in_progress"]
+
+# Уровни SLA: что происходит, когда наступает время следующего уровня
+SLA_BREACHED = 1
+SLA_ESCALATED = 2
+SLA_EVENTS = {SLA_BREACHED: "sla_breached", SLA_ESCALATED: "sla_escalated"}
+
+SLAListener = Callable[[dict], Awaitable[None]]
+
+
+class SLAMonitor:
+    """
+    Контроль сроков (UC007) без опроса коллекции.
+
+    При старте один индексный запрос загружает сроки незавершенных задач
+    на horizon вперед в кучу таймеров; дальше куча обновляется из TaskService
+    (создание, смена статуса, назначение), а раз в horizon/2 подгружается
+    следующее окно тем же запросом. Когда срок наступает, уровень SLA
+    поднимается условным обновлением (из нескольких подов выигрывает один),
+    победитель пишет историю и рассылает событие слушателям.
+
+    Уровни: 1 — срок нарушен (due_date), 2 — эскалация (due_date + escalation).
+    Если записать уровень не удалось, таймер ставится снова с нарастающей паузой.
+    """
+
+    RETRY_DELAY = timedelta(seconds=5)
+    RETRY_MAX_DELAY = timedelta(minutes=5)
+
+    def __init__(
+        self,
+        task_repo: TaskRepository,
+        history_repo: TaskHistoryRepository,
+        escalation: timedelta = timedelta(minutes=settings.sla_escalation_minutes),
+        horizon: timedelta = timedelta(hours=settings.sla_horizon_hours),
+        clock: Callable[[], datetime] = datetime.now,
+    ):
+        self.task_repo = task_repo
+        self.history_repo = history_repo
+        self.escalation = escalation
+        self.horizon = horizon
+        self.clock = clock
+
+        # Куча (время срабатывания, id, уровень); актуальная запись — в _scheduled,
+        # устаревшие записи кучи пропускаются при извлечении
+        self._heap: List[Tuple[datetime, str, int]] = []
+        self._scheduled: Dict[str, Tuple[datetime, int]] = {}
+        self._due_dates: Dict[str, datetime] = {}
+        self._attempts: Dict[str, int] = {}
+        self._loaded_until: Optional[datetime] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[SLAListener] = []
+
+        self.stats = {"loaded": 0, "breached": 0, "escalated": 0, "skipped": 0, "errors": 0}
+
+    @property
+    def pending(self) -> int:
+        return len(self._scheduled)
+
+    def add_listener(self, listener: SLAListener) -> None:
+        """Подписка на события SLA (async-функция, получает словарь события)"""
+        self._listeners.append(listener)
+
+    def _schedule(self, task_id: str, due_date: datetime, level: int) -> None:
+        """Ставит таймер следующего уровня после level (или снимает, если уровней больше нет)"""
+        if level >= SLA_ESCALATED:
+            self.untrack(task_id)
+            return
+        fire_at = due_date if level < SLA_BREACHED else due_date + self.escalation
+        next_level = level + 1
+        if self._scheduled.get(task_id) == (fire_at, next_level):
+            return
+        self._scheduled[task_id] = (fire_at, next_level)
+        self._due_dates[task_id] = due_date
+        heapq.heappush(self._heap, (fire_at, task_id, next_level))
+        if self._heap[0][1] == task_id:
+            # Новый ближайший срок — циклу нужно проснуться раньше
+            self._wakeup.set()
+
+    def track(self, task: Task) -> None:
+        """Обновляет таймер задачи после ее изменения (вызывается из TaskService)"""
+        if task.status in SLA_OPEN_STATUSES and task.due_date is not None:
+            self._schedule(task.id, task.due_date, task.sla_level)
+        else:
+            self.untrack(task.id)
+
+    def untrack(self, task_id: str) -> None:
+        self._scheduled.pop(task_id, None)
+        self._due_dates.pop(task_id, None)
+        self._attempts.pop(task_id, None)
+
+    def _retry(self, task_id: str, due_date: datetime, level: int) -> None:
+        """Снова ставит таймер уровня, который не удалось записать"""
+        if task_id in self._scheduled:
+            return  # пока шла запись, задачу перепланировали
+        attempt = self._attempts.get(task_id, 0)
+        self._attempts[task_id] = attempt + 1
+        fire_at = self.clock() + min(self.RETRY_DELAY * 2 ** attempt, self.RETRY_MAX_DELAY)
+        self._scheduled[task_id] = (fire_at, level)
+        self._due_dates[task_id] = due_date
+        heapq.heappush(self._heap, (fire_at, task_id, level))
+
+    async def load(self) -> None:
+        """Загружает сроки до now + horizon одним запросом"""
+        until = self.clock() + self.horizon
+        deadlines = await self.task_repo.get_open_deadlines(SLA_OPEN_STATUSES, until, SLA_ESCALATED)
+        for task_id, due_date, level in deadlines:
+            self._schedule(task_id, due_date, level)
+        self._loaded_until = until
+        self.stats["loaded"] += len(deadlines)
+
+    async def start(self) -> None:
+        await self.load()
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _next_wait(self) -> float:
+        now = self.clock()
+        wake_at = self._loaded_until - self.horizon / 2
+        if self._heap:
+            wake_at = min(wake_at, self._heap[0][0])
+        return max(0.0, (wake_at - now).total_seconds())
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._next_wait())
+            except asyncio.TimeoutError:
+                pass
+            try:
+                if self.clock() >= self._loaded_until - self.horizon / 2:
+                    await self.load()
+                await self.fire_due()
+            except Exception:
+                self.stats["errors"] += 1
+                logger.exception("SLA monitor iteration failed")
+                await asyncio.sleep(1)
+
+    async def fire_due(self) -> None:
+        """Обрабатывает все таймеры, время которых наступило"""
+        now = self.clock()
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, task_id, level = heapq.heappop(self._heap)
+            if self._scheduled.get(task_id) != (fire_at, level):
+                continue  # таймер устарел: задачу закрыли или перепланировали
+            del self._scheduled[task_id]
+            await self._fire(task_id, level, self._due_dates.pop(task_id))
+
+    async def _fire(self, task_id: str, level: int, due_date: datetime) -> None:
+        try:
+            result = await self.task_repo.set_sla_level(task_id, level, SLA_OPEN_STATUSES)
+        except Exception:
+            # Таймер уже снят: без повтора нарушение срока потеряется
+            self.stats["errors"] += 1
+            logger.exception("SLA level update failed for %s, will retry", task_id)
+            self._retry(task_id, due_date, level)
+            return
+        self._attempts.pop(task_id, None)
+        if result is None:
+            # Задача уже завершена или уровень поднял другой экземпляр сервиса
+            self.stats["skipped"] += 1
+            return
+        _, task = result
+        self._schedule(task_id, due_date, level)
+
+        action = SLA_EVENTS[level]
+        self.stats["breached" if level == SLA_BREACHED else "escalated"] += 1
+        now = self.clock()
+        details = {
+            "due_date": due_date.isoformat(),
+            "overdue_minutes": int((now - due_date).total_seconds() // 60),
+            "priority": task.priority,
+            "assigned_to": task.assigned_to,
+        }
+        await self.history_repo.create_record(TaskHistoryRecord(
+            task_id=task_id,
+            action=action,
+            performed_by="system",
+            details=details,
+            timestamp=now
+        ))
+
+        event = {"type": action, "task_id": task_id, "status": task.status, "level": level, "task": task, **details}
+        logger.warning("SLA %s: task %s (due %s)", action, task_id, due_date)
+        for listener in self._listeners:
+            try:
+                await listener(event)
+            except Exception:
+                logger.exception("SLA listener failed for %s", task_id)
@@ -0,0 +1,69 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from domain.models import Task, TaskStats
+
+# Изменение счетчиков: путь счетчика -> приращение.
+# ("total",) — число задач; ("status", "new") — задач в статусе new и т.д.
+StatsDelta = Dict[Tuple[str, ...], float]
+
+GROUPS = ("status", "category", "priority")
+
+
+def merge(*deltas: StatsDelta) -> StatsDelta:
+    """Складывает несколько изменений в одно (для пакетных операций — один $inc)"""
+    merged: StatsDelta = defaultdict(float)
+    for delta in deltas:
+        for path, amount in delta.items():
+            merged[path] += amount
+    return {path: amount for path, amount in merged.items() if amount}
+
+
+def created(task: Task) -> StatsDelta:
+    return {
+        ("total",): 1,
+        ("status", task.status): 1,
+        ("category", task.category): 1,
+        ("priority", task.priority): 1,
+    }
+
+
+def transition(previous: Task, new_status: str, at: datetime) -> StatsDelta:
+    """Смена статуса; переход в completed добавляет время выполнения"""
+    if previous.status == new_status:
+        return {}
+    delta: StatsDelta = {("status", previous.status): -1, ("status", new_status): 1}
+    if new_status == "completed":
+        delta[("completed_count",)] = 1
+        delta[("completion_seconds",)] = (at - previous.created_at).total_seconds()
+    return delta
+
+
+def rated(previous: Task, rating: int) -> StatsDelta:
+    """Оценка или переоценка (старая оценка вычитается)"""
+    if previous.rating is None:
+        return {("rating_count",): 1, ("rating_sum",): rating}
+    return {("rating_sum",): rating - previous.rating}
+
+
+def to_stats(counters: dict) -> TaskStats:
+    """Счетчики из хранилища -> ответ API (нулевые группы не показываем)"""
+    def group(name: str) -> Dict[str, int]:
+        return {key: int(value) for key, value in counters.get(name, {}).items() if value}
+
+    def average(total: str, count: str) -> Optional[float]:
+        n = counters.get(count, 0)
+        return round(counters.get(total, 0) / n, 2) if n else None
+
+    completion = average("completion_seconds", "completed_count")
+    return TaskStats(
+        total=int(counters.get("total", 0)),
+        by_status=group("status"),
+        by_category=group("category"),
+        by_priority=group("priority"),
+        rated=int(counters.get("rating_count", 0)),
+        average_rating=average("rating_sum", "rating_count"),
+        completed=int(counters.get("completed_count", 0)),
+        average_completion_hours=round(completion / 3600, 2) if completion is not None else None,
+    )
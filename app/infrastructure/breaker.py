@@ -0,0 +1,46 @@
+import logging
+import time
+from typing import Callable
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CooldownBreaker:
+    """
+    Предохранитель для необязательного общего хранилища (Redis): после ошибки
+    обращения к нему пропускаются cooldown секунд — запросы не ждут таймаута
+    недоступного сервера, а лог не заполняется одним и тем же предупреждением
+    (не чаще раза за cooldown, с числом ошибок за это время).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        cooldown: float = settings.redis_cooldown_seconds,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.cooldown = cooldown
+        self.clock = clock
+        self._open_until = 0.0
+        self._next_log = 0.0
+        self._suppressed = 0
+
+    @property
+    def available(self) -> bool:
+        return self.clock() >= self._open_until
+
+    def failed(self, error: Exception) -> None:
+        now = self.clock()
+        self._open_until = now + self.cooldown
+        if now < self._next_log:
+            self._suppressed += 1
+            return
+        logger.warning(
+            "%s failed (%d more errors since last warning), skipping it for %.0f s: %s",
+            self.name, self._suppressed, self.cooldown, error,
+        )
+        self._next_log = now + self.cooldown
+        self._suppressed = 0
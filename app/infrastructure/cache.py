@@ -0,0 +1,318 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from core.config import settings
+from domain.models import Task, TaskFilter, project_task
+from domain.repositories import TaskRepository
+from infrastructure.breaker import CooldownBreaker
+
+logger = logging.getLogger(__name__)
+
+
+class LocalCacheTier:
+    """In-process LRU с TTL"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Task]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Task]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, task = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return task
+
+    def set(self, key: str, task: Task) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, task)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# Заполнение после чтения из базы: только если за это время задачу не записывали
+# (запись ставит метку KEYS[2] на fence_seconds)
+FILL_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+
+class RedisCacheTier:
+    """Общий для всех подов уровень кэша в Redis (REDIS_URL)"""
+
+    def __init__(self, url: str, fence_seconds: float = settings.task_cache_fence_seconds):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(
+            url, socket_timeout=settings.redis_timeout_seconds, socket_connect_timeout=settings.redis_timeout_seconds
+        )
+        self.fill_script = self.client.register_script(FILL_SCRIPT)
+        self.fence_ms = int(fence_seconds * 1000)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.set(key, value, ex=ttl)
+            if self.fence_ms > 0:
+                pipe.set(key + ":fence", 1, px=self.fence_ms)
+            await pipe.execute()
+
+    async def fill(self, key: str, value: str, ttl: int) -> None:
+        await self.fill_script(keys=[key, key + ":fence"], args=[value, ttl])
+
+    async def delete(self, key: str) -> None:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            if self.fence_ms > 0:
+                pipe.set(key + ":fence", 1, px=self.fence_ms)
+            await pipe.execute()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class TaskCache:
+    """
+    Двухуровневый кэш задач: локальный LRU (короткий TTL) и общий уровень
+    (Redis или любой объект с async get/set/fill/delete). Ошибки общего уровня
+    не ломают запрос — считаются промахом, и redis_cooldown_seconds после
+    ошибки общий уровень не опрашивается.
+
+    Запись (set/invalidate) ставит на задачу метку на fence секунд; заполнение
+    после промаха (fill) пропускается, если метка новее начала чтения из базы —
+    иначе прочитанная до записи задача вернулась бы в кэш (и со старым ETag).
+    fence=0 отключает метки: промах заполняет кэш всегда.
+    """
+
+    KEY_PREFIX = "task:"
+
+    def __init__(
+        self,
+        local: LocalCacheTier,
+        shared=None,
+        shared_ttl: int = settings.task_cache_shared_ttl_seconds,
+        fence: float = settings.task_cache_fence_seconds,
+        breaker: Optional[CooldownBreaker] = None,
+    ):
+        self.local = local
+        self.shared = shared
+        self.breaker = breaker or CooldownBreaker("Shared task cache")
+        self.shared_ttl = shared_ttl
+        self.fence = fence
+        # Время последней записи по ключу (monotonic), только за последние fence секунд
+        self._fences: "OrderedDict[str, float]" = OrderedDict()
+        self.stats = {
+            "local_hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0, "skipped_fills": 0,
+            "shared_errors": 0, "shared_skipped": 0,
+        }
+
+    @classmethod
+    def from_settings(cls) -> "TaskCache":
+        local = LocalCacheTier(settings.task_cache_max_size, settings.task_cache_ttl_seconds)
+        shared = None
+        if settings.redis_url:
+            try:
+                shared = RedisCacheTier(settings.redis_url)
+            except ImportError:
+                logger.warning("redis package is not installed, shared task cache is disabled")
+        return cls(local, shared)
+
+    @property
+    def hit_ratio(self) -> float:
+        hits = self.stats["local_hits"] + self.stats["shared_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    async def get(self, task_id: str) -> Optional[Task]:
+        key = self.KEY_PREFIX + task_id
+        task = self.local.get(key)
+        if task is not None:
+            self.stats["local_hits"] += 1
+            return task
+
+        raw = await self._call_shared("get", key)
+        if raw is not None:
+            task = Task.model_validate_json(raw)
+            self.local.set(key, task)
+            self.stats["shared_hits"] += 1
+            return task
+
+        self.stats["misses"] += 1
+        return None
+
+    async def _call_shared(self, method: str, *args):
+        """Обращение к общему уровню; None — его нет, он на паузе после ошибки или ответил ошибкой"""
+        if self.shared is None:
+            return None
+        if not self.breaker.available:
+            self.stats["shared_skipped"] += 1
+            return None
+        try:
+            return await getattr(self.shared, method)(*args)
+        except Exception as e:
+            self.stats["shared_errors"] += 1
+            self.breaker.failed(e)
+            return None
+
+    def _mark_written(self, key: str) -> None:
+        now = time.monotonic()
+        self._fences[key] = now
+        self._fences.move_to_end(key)
+        while self._fences and next(iter(self._fences.values())) <= now - self.fence:
+            self._fences.popitem(last=False)
+
+    async def fill(self, task: Task, started_at: float) -> None:
+        """Кладет прочитанную из базы задачу, если с started_at ее не записывали"""
+        key = self.KEY_PREFIX + task.id
+        written_at = self._fences.get(key)
+        if self.fence > 0 and (
+            time.monotonic() - started_at >= self.fence or (written_at is not None and written_at >= started_at)
+        ):
+            self.stats["skipped_fills"] += 1
+            return
+        self.local.set(key, task)
+        await self._call_shared("fill", key, task.model_dump_json(), self.shared_ttl)
+
+    async def set(self, task: Task) -> None:
+        """Задача после записи: заменяет закэшированную"""
+        key = self.KEY_PREFIX + task.id
+        self._mark_written(key)
+        self.local.set(key, task)
+        await self._call_shared("set", key, task.model_dump_json(), self.shared_ttl)
+
+    async def invalidate(self, task_id: str) -> None:
+        key = self.KEY_PREFIX + task_id
+        self.stats["invalidations"] += 1
+        self._mark_written(key)
+        self.local.delete(key)
+        await self._call_shared("delete", key)
+
+    async def close(self) -> None:
+        if self.shared is not None and hasattr(self.shared, "close"):
+            await self.shared.close()
+
+
+class CachedTaskRepository(TaskRepository):
+    """
+    Cache-aside поверх любого TaskRepository: get_by_id читает через кэш,
+    изменения обновляют (или сбрасывают) закэшированную задачу. Списки не кэшируются.
+    Частичное чтение (view) берет поля из кэша, а при промахе читает из базы
+    только их и кэш не заполняет.
+    """
+
+    def __init__(self, inner: TaskRepository, cache: TaskCache):
+        self.inner = inner
+        self.cache = cache
+
+    async def create(self, task: Task) -> Task:
+        created = await self.inner.create(task)
+        await self.cache.set(created)
+        return created
+
+    async def create_many(self, tasks: List[Task]) -> List[Optional[str]]:
+        return await self.inner.create_many(tasks)
+
+    async def get_by_id(self, task_id: str, view: Optional[Type[BaseModel]] = None) -> Optional[Task]:
+        task = await self.cache.get(task_id)
+        if task is not None:
+            return task if view is None else project_task(task, view)
+        if view is not None:
+            return await self.inner.get_by_id(task_id, view)
+        started_at = time.monotonic()
+        task = await self.inner.get_by_id(task_id)
+        if task is not None:
+            await self.cache.fill(task, started_at)
+        return task
+
+    async def get_many(self, task_ids: List[str], view: Optional[Type[BaseModel]] = None) -> List[Task]:
+        return await self.inner.get_many(task_ids, view)
+
+    async def get_all(
+        self,
+        filters: TaskFilter,
+        limit: int,
+        after: Optional[Tuple[datetime, str]] = None,
+        sort: str = "-created_at",
+        view: Optional[Type[BaseModel]] = None
+    ) -> List[Task]:
+        return await self.inner.get_all(filters, limit, after, sort, view)
+
+    async def _apply(self, task_id: str, result: Optional[Tuple[Task, Task]]):
+        if result:
+            await self.cache.set(result[1])
+        else:
+            # Не знаем, что сейчас в базе — просто сбрасываем
+            await self.cache.invalidate(task_id)
+        return result
+
+    async def update_status(
+        self, task_id: str, status: str, from_statuses: List[str], version: Optional[int] = None
+    ) -> Optional[Tuple[Task, Task]]:
+        return await self._apply(task_id, await self.inner.update_status(task_id, status, from_statuses, version))
+
+    async def assign_task(
+        self, task_id: str, assigned_to: str, from_statuses: List[str], version: Optional[int] = None
+    ) -> Optional[Tuple[Task, Task]]:
+        return await self._apply(
+            task_id, await self.inner.assign_task(task_id, assigned_to, from_statuses, version)
+        )
+
+    async def bulk_update(
+        self, updates: List[Tuple[str, dict, List[str]]]
+    ) -> List[Tuple[Optional[Task], Optional[Task]]]:
+        results = await self.inner.bulk_update(updates)
+        await asyncio.gather(*(
+            self._apply(task_id, (None, updated_task) if updated_task else None)
+            for (task_id, _, _), (_, updated_task) in zip(updates, results)
+        ))
+        return results
+
+    async def rate_task(
+        self, task_id: str, rating: int, comment: Optional[str], from_statuses: List[str],
+        version: Optional[int] = None
+    ) -> Optional[Tuple[Task, Task]]:
+        result = await self.inner.rate_task(task_id, rating, comment, from_statuses, version)
+        await self.cache.invalidate(task_id)
+        return result
+    
+    async def get_open_deadlines(
+        self, statuses: List[str], until: datetime, below_level: int
+    ) -> List[Tuple[str, datetime, int]]:
+        return await self.inner.get_open_deadlines(statuses, until, below_level)
+    
+    async def set_sla_level(
+        self, task_id: str, level: int, from_statuses: List[str]
+    ) -> Optional[Tuple[Task, Task]]:
+        return await self._apply(task_id, await self.inner.set_sla_level(task_id, level, from_statuses))
+
+
+# Общий на процесс кэш задач (локальный уровень живет между запросами)
+task_cache = TaskCache.from_settings()
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from typing import Optional, Tuple
+
+from pymongo.errors import PyMongoError
+
+from domain.events import EventBus
+from infrastructure.repositories import load_task
+
+logger = logging.getLogger(__name__)
+
+
+def classify_change(change: dict) -> Optional[Tuple[str, dict]]:
+    """
+    Событие change stream коллекции tasks -> (тип события задачи, доп. поля).
+    None — изменение, о котором подписчикам сообщать не нужно.
+    """
+    operation = change.get("operationType")
+    if operation == "insert":
+        return "task_created", {}
+    if operation != "update":
+        return None
+
+    updated = change.get("updateDescription", {}).get("updatedFields", {})
+    if "assigned_to" in updated:
+        return "task_assigned", {}
+    if "status" in updated:
+        return "task_status_changed", {}
+    if "rating" in updated:
+        return "task_rated", {"rating": updated["rating"]}
+    if "sla_level" in updated:
+        return ("sla_escalated" if updated["sla_level"] >= 2 else "sla_breached"), {"level": updated["sla_level"]}
+    return None
+
+
+class ChangeStreamSource:
+    """
+    Источник событий для EventBus из одного change stream коллекции tasks
+    (нужен replica set). Видит изменения всех экземпляров сервиса, поэтому
+    при events_source=change_stream TaskService сам события не публикует.
+    После ошибки поток возобновляется с последнего resume token.
+    """
+
+    def __init__(self, collection, bus: EventBus, retry_delay: float = 1.0, max_retry_delay: float = 30.0):
+        self.collection = collection
+        self.bus = bus
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._resume_token = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        delay = self.retry_delay
+        while True:
+            try:
+                # Метки bulk_update подписчикам не нужны — не гоняем их по сети
+                async with self.collection.watch(
+                    [{"$project": {"fullDocument.bulk_marks": 0}}],
+                    full_document="updateLookup", resume_after=self._resume_token
+                ) as stream:
+                    async for change in stream:
+                        delay = self.retry_delay
+                        self._resume_token = stream.resume_token
+                        self.handle(change)
+            except PyMongoError as e:
+                logger.warning("Task change stream failed, retrying in %.1fs: %s", delay, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+
+    def handle(self, change: dict) -> None:
+        classified = classify_change(change)
+        document = change.get("fullDocument")
+        if classified is None or document is None:
+            return
+        event_type, extra = classified
+        document.pop("_id", None)
+        self.bus.publish(event_type, load_task(document), **extra)
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional, Tuple
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryWriter:
+    """
+    Буферизованная запись истории задач.
+
+    Записи складываются в ограниченную очередь и уходят в MongoDB пачками
+    через insert_many. Если очередь заполнена, write() ждет (backpressure).
+
+    durability=sync — запрос ждет, пока его запись будет сохранена; пачка
+    набирается из того, что накопилось за время предыдущей вставки (group commit).
+    durability=async — запрос не ждет; пачка сбрасывается по размеру
+    batch_size или через flush_interval секунд.
+    """
+
+    DURABILITY_MODES = ("sync", "async")
+
+    def __init__(
+        self,
+        collection,
+        batch_size: int = settings.history_batch_size,
+        flush_interval: float = settings.history_flush_interval_ms / 1000,
+        max_queue: int = settings.history_queue_size,
+        durability: str = settings.history_durability,
+    ):
+        if durability not in self.DURABILITY_MODES:
+            raise ValueError(f"Unknown history durability mode: {durability}")
+        self.collection = collection
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.durability = durability
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_queue))
+        self._batch_ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.stats = {
+            "written": 0,
+            "failed": 0,
+            "flushes": 0,
+            "flush_seconds_total": 0.0,
+            "flush_seconds_max": 0.0,
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def write(self, record: dict) -> None:
+        """Ставит запись в очередь; в режиме sync — дожидается ее сохранения"""
+        future = asyncio.get_running_loop().create_future() if self.durability == "sync" else None
+        await self._queue.put((record, future))
+        if self._queue.qsize() >= self.batch_size - 1:
+            self._batch_ready.set()
+        if future is not None:
+            await future
+
+    async def write_many(self, records: List[dict]) -> None:
+        """Ставит в очередь несколько записей; в режиме sync — ждет сохранения всех"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for record in records:
+            future = loop.create_future() if self.durability == "sync" else None
+            await self._queue.put((record, future))
+            if self._queue.qsize() >= self.batch_size - 1:
+                self._batch_ready.set()
+            if future is not None:
+                futures.append(future)
+        # Пачка уже собрана — не ждем таймера
+        self._batch_ready.set()
+        if futures:
+            await asyncio.gather(*futures)
+
+    async def close(self) -> None:
+        """Сбрасывает все, что осталось в очереди, и останавливает запись"""
+        if self._task is None or self._task.done():
+            return
+        # None — признак остановки: все, что встало в очередь раньше, будет записано
+        self._closing = True
+        await self._queue.put(None)
+        self._batch_ready.set()
+        await self._task
+
+    async def _run(self) -> None:
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+
+            if (
+                self.durability == "async"
+                and not self._closing
+                and self._queue.qsize() < self.batch_size - 1
+            ):
+                self._batch_ready.clear()
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            stop = False
+            while len(batch) < self.batch_size and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+            if stop:
+                # Остаток очереди после признака остановки (если был) тоже сохраняем
+                while not self._queue.empty():
+                    rest = [i for i in self._drain() if i is not None]
+                    if rest:
+                        await self._flush(rest)
+                return
+
+    def _drain(self) -> List[Tuple[dict, Optional[asyncio.Future]]]:
+        items = []
+        while not self._queue.empty() and len(items) < self.batch_size:
+            items.append(self._queue.get_nowait())
+        return items
+
+    async def _flush(self, batch: List[Tuple[dict, Optional[asyncio.Future]]]) -> None:
+        started = time.perf_counter()
+        error: Optional[Exception] = None
+        try:
+            await self.collection.insert_many([record for record, _ in batch], ordered=False)
+            self.stats["written"] += len(batch)
+        except Exception as e:
+            error = e
+            self.stats["failed"] += len(batch)
+            logger.exception("Failed to write %d history records", len(batch))
+
+        elapsed = time.perf_counter() - started
+        self.stats["flushes"] += 1
+        self.stats["flush_seconds_total"] += elapsed
+        self.stats["flush_seconds_max"] = max(self.stats["flush_seconds_max"], elapsed)
+
+        for _, future in batch:
+            if future is None or future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
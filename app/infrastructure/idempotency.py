@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Tuple
+
+from core.config import settings
+from domain.models import IdempotencyRecord
+from domain.repositories import IdempotencyRepository
+from infrastructure.cache import LocalCacheTier
+
+logger = logging.getLogger(__name__)
+
+# Действие, выполняемое один раз на ключ: (status_code, тело, заголовки ответа)
+Action = Callable[[], Awaitable[Tuple[int, bytes, Dict[str, str]]]]
+
+
+class IdempotencyError(Exception):
+    """Повтор нельзя обслужить: ключ с другим запросом (422) или первый еще выполняется (409)"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+
+
+class IdempotencyStore:
+    """
+    Запросы с Idempotency-Key выполняются один раз. Первый запрос резервирует
+    ключ (pending-запись, атомарно и между подами), выполняется и сохраняет ответ;
+    повтор получает сохраненный ответ — из локального кэша пода без обращения
+    к базе, иначе тем же одним запросом резервирования. Параллельный повтор
+    ждет результата первого: в том же поде — без опроса базы.
+
+    Если действие упало или запрос отменили, резерв снимается — повтор выполнится
+    заново. Резерв запроса, который не успел его снять (pod убит), действует
+    lock секунд, после чего ключ занимает следующий повтор.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(
+        self,
+        repository: IdempotencyRepository,
+        ttl: int = settings.idempotency_ttl_seconds,
+        cache_size: int = settings.idempotency_cache_size,
+        wait: float = settings.idempotency_wait_seconds,
+        lock: float = settings.idempotency_lock_seconds,
+    ):
+        self.repository = repository
+        self.ttl = ttl
+        self.wait = wait
+        self.lock = lock
+        self.local = LocalCacheTier(cache_size, ttl)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"executed": 0, "local_replays": 0, "stored_replays": 0, "conflicts": 0, "released": 0}
+
+    async def execute(self, key: str, fingerprint: str, action: Action) -> IdempotencyRecord:
+        record = self.local.get(key)
+        if record is not None:
+            self.stats["local_replays"] += 1
+            return self._check(record, fingerprint)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                record = await asyncio.wait_for(asyncio.shield(inflight), self.wait)
+            except asyncio.TimeoutError:
+                raise self._in_progress()
+            self.stats["local_replays"] += 1
+            return self._check(record, fingerprint)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            record = await self._execute(key, fingerprint, action)
+        except BaseException as e:
+            # Отмененный запрос для ожидающих выглядит как незавершенный
+            future.set_exception(e if isinstance(e, Exception) else self._in_progress())
+            future.exception()  # ожидающих может не быть
+            raise
+        else:
+            future.set_result(record)
+            return record
+        finally:
+            del self._inflight[key]
+
+    async def _execute(self, key: str, fingerprint: str, action: Action) -> IdempotencyRecord:
+        # Время — с точностью MongoDB (мс): по locked_until запрос узнает свой резерв
+        now = datetime.now()
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        pending = IdempotencyRecord(
+            key=key, fingerprint=fingerprint, created_at=now, expires_at=now + timedelta(seconds=self.ttl),
+            locked_until=now + timedelta(seconds=self.lock),
+        )
+        existing = await self.repository.reserve(pending)
+        if existing is None:
+            try:
+                status_code, body, headers = await action()
+            except BaseException:
+                await self._release(pending)
+                raise
+            record = pending.model_copy(
+                update={"status": "done", "status_code": status_code, "body": body, "headers": headers}
+            )
+            try:
+                await self.repository.complete(record)
+            except Exception:
+                # Действие выполнено: ответ отдаем, повтор в этом поде получит его из кэша,
+                # в других — выполнит запрос, когда истечет резерв
+                logger.exception("Failed to store response for Idempotency-Key")
+            self.stats["executed"] += 1
+            self.local.set(key, record)
+            return record
+
+        # Ключ занят: ответ уже сохранен или запрос выполняется в другом поде
+        self._check(existing, fingerprint)
+        deadline = time.monotonic() + self.wait
+        while existing.status != "done":
+            if time.monotonic() >= deadline:
+                raise self._in_progress()
+            await asyncio.sleep(self.POLL_INTERVAL)
+            existing = await self.repository.get(key)
+            if existing is None or existing.status == "pending" and self._abandoned(existing):
+                # Первый запрос снял резерв или брошен — выполняем сами
+                return await self._execute(key, fingerprint, action)
+        self.stats["stored_replays"] += 1
+        self.local.set(key, existing)
+        return existing
+
+    async def _release(self, pending: IdempotencyRecord) -> None:
+        """Снимает резерв после неудачи; если не вышло — его снимет истечение locked_until"""
+        try:
+            await self.repository.release(pending)
+            self.stats["released"] += 1
+        except Exception:
+            logger.exception("Failed to release Idempotency-Key %s", pending.key)
+
+    @staticmethod
+    def _abandoned(record: IdempotencyRecord) -> bool:
+        return record.locked_until is not None and record.locked_until < datetime.now()
+
+    def _check(self, record: IdempotencyRecord, fingerprint: str) -> IdempotencyRecord:
+        if record.fingerprint != fingerprint:
+            self.stats["conflicts"] += 1
+            raise IdempotencyError(422, "Idempotency-Key was already used for a different request")
+        return record
+
+    def _in_progress(self) -> IdempotencyError:
+        self.stats["conflicts"] += 1
+        return IdempotencyError(409, "A request with this Idempotency-Key is still in progress")
@@ -0,0 +1,132 @@
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+logger = logging.getLogger(__name__)
+
+
+def _list_index(*prefix: str, sort_field: str = "created_at") -> IndexModel:
+    """Индекс под список: равенство по prefix, затем ключ keyset-пагинации (sort_field, id)"""
+    keys = [(field, ASCENDING) for field in prefix]
+    keys += [(sort_field, DESCENDING), ("id", DESCENDING)]
+    name = "_".join([*prefix, sort_field, "id"])
+    return IndexModel(keys, name=name)
+
+
+# Фильтры GET /api/v1/tasks по равенству
+TASK_LIST_FILTERS = ("status", "category", "priority", "location_id", "assigned_to", "created_by")
+
+# Индексы коллекции tasks под GET /api/v1/tasks: без фильтра и каждый фильтр —
+# с каждой сортировкой (created_at или due_date, затем id)
+TASK_LIST_INDEXES = [
+    _list_index(*prefix, sort_field=sort_field)
+    for sort_field in ("created_at", "due_date")
+    for prefix in [(), *((field,) for field in TASK_LIST_FILTERS)]
+]
+
+# Реестр индексов: коллекция -> индексы, которые должны существовать
+INDEXES: Dict[str, List[IndexModel]] = {
+    "tasks": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        *TASK_LIST_INDEXES,
+        # GET /api/v1/tasks/search: совпадение в title весит втрое больше, чем в description
+        IndexModel(
+            [("title", TEXT), ("description", TEXT)],
+            name="title_description_text",
+            weights={"title": 3, "description": 1},
+            default_language="russian",
+        ),
+        # Сроки SLA: условие на sla_level и проекция (id, due_date, sla_level) — по ключам индекса
+        IndexModel(
+            [("status", ASCENDING), ("due_date", ASCENDING), ("sla_level", ASCENDING), ("id", ASCENDING)],
+            name="status_due_date_sla_level_id",
+        ),
+    ],
+    "task_history": [
+        IndexModel([("task_id", ASCENDING), ("timestamp", DESCENDING)], name="task_id_timestamp"),
+    ],
+    "notification_outbox": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt_at"),
+    ],
+    "idempotency_keys": [
+        # Ключ — _id; истекшие ответы удаляет сама MongoDB
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+# Горячие запросы (коллекция, фильтр, сортировка) — ни один не должен сканировать коллекцию
+HOT_QUERIES: List[Tuple[str, dict, Optional[list]]] = [
+    ("tasks", {"id": "T-00000000-PROBE"}, None),
+    ("tasks", {}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("tasks", {"status": "new"}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("tasks", {"assigned_to": "probe"}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("tasks", {"created_by": "probe"}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    # Сортировка по сроку: задачи без due_date в нее не попадают
+    *(
+        ("tasks", {**({field: "probe"} if field else {}), "due_date": {"$ne": None}}, [("due_date", ASCENDING), ("id", ASCENDING)])
+        for field in (None, *TASK_LIST_FILTERS)
+    ),
+    ("task_history", {"task_id": "T-00000000-PROBE"}, [("timestamp", DESCENDING)]),
+    ("tasks", {"$text": {"$search": "probe"}}, None),
+    # Загрузка сроков SLA: незавершенные и еще не эскалированные задачи
+    (
+        "tasks",
+        {
+            "status": {"$in": ["new", "assigned", "in_progress"]},
+            "due_date": {"$lte": datetime(2000, 1, 1)},
+            "sla_level": {"$not": {"$gte": 2}},
+        },
+        None,
+    ),
+    # Очередная пачка уведомлений для отправки
+    ("notification_outbox", {"status": "pending", "next_attempt_at": {"$lte": datetime(2000, 1, 1)}}, [("next_attempt_at", ASCENDING)]),
+]
+
+
+async def ensure_indexes(database) -> None:
+    """Создает все индексы из реестра (повторный вызов ничего не меняет)"""
+    for collection_name, indexes in INDEXES.items():
+        await database[collection_name].create_indexes(indexes)
+
+
+def has_collscan(plan) -> bool:
+    """Есть ли в плане запроса (вывод explain) стадия COLLSCAN"""
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            return True
+        return any(has_collscan(value) for value in plan.values())
+    if isinstance(plan, list):
+        return any(has_collscan(item) for item in plan)
+    return False
+
+
+async def verify_hot_queries(database) -> List[str]:
+    """Прогоняет explain() для горячих запросов и возвращает те, что идут через COLLSCAN"""
+    problems = []
+    for collection_name, query, sort in HOT_QUERIES:
+        cursor = database[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        if has_collscan(explain.get("queryPlanner", {}).get("winningPlan", {})):
+            problems.append(f"{collection_name}.find({query}).sort({sort})")
+    return problems
+
+
+async def check_hot_queries(database, mode: str = "warn") -> None:
+    """
+    Проверка при старте: mode=off — пропустить, warn — залогировать,
+    fail — не давать сервису стартовать, если горячий запрос идет мимо индекса.
+    """
+    if mode == "off":
+        return
+    problems = await verify_hot_queries(database)
+    if not problems:
+        return
+    message = "Hot queries use COLLSCAN: " + "; ".join(problems)
+    if mode == "fail":
+        raise RuntimeError(message)
+    logger.warning(message)
@@ -0,0 +1,343 @@
+import bisect
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Type
+
+from pydantic import BaseModel
+
+from domain.models import IdempotencyRecord, Notification, Task, TaskFilter, TaskHistoryRecord, project_task
+from domain.pagination import parse_sort
+from domain import stats
+from domain.repositories import (
+    IdempotencyRepository, NotificationOutboxRepository, TaskRepository, TaskHistoryRepository,
+    TaskStatsRepository
+)
+
+
+# Поля с вторичным индексом «значение -> множество id»
+INDEXED_FIELDS = ("status", "assigned_to", "created_by")
+
+
+class InMemoryTaskRepository(TaskRepository):
+    """
+    Репозиторий задач в памяти процесса — для тестов и профилирования TaskService
+    без MongoDB. Вторичные индексы: status, assigned_to, created_by (хэш) и
+    отсортированные (created_at, id) / (due_date, id) для пагинации и диапазонов.
+    Между проверкой и записью нет await, поэтому условные обновления атомарны.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, Task] = {}
+        self._indexes: Dict[str, Dict[str, Set[str]]] = {
+            field: defaultdict(set) for field in INDEXED_FIELDS
+        }
+        self._sorted: Dict[str, List[Tuple[datetime, str]]] = {
+            "created_at": [],
+            "due_date": [],
+        }
+
+    def __iter__(self) -> Iterator[Task]:
+        """Все задачи (для построения поискового индекса)"""
+        return iter(list(self._tasks.values()))
+
+    def _index(self, task: Task) -> None:
+        for field in INDEXED_FIELDS:
+            value = getattr(task, field)
+            if value is not None:
+                self._indexes[field][value].add(task.id)
+        for field, keys in self._sorted.items():
+            value = getattr(task, field)
+            if value is not None:
+                bisect.insort(keys, (value, task.id))
+
+    def _unindex(self, task: Task) -> None:
+        for field in INDEXED_FIELDS:
+            value = getattr(task, field)
+            if value is not None:
+                self._indexes[field][value].discard(task.id)
+        for field, keys in self._sorted.items():
+            value = getattr(task, field)
+            if value is not None:
+                position = bisect.bisect_left(keys, (value, task.id))
+                if position < len(keys) and keys[position] == (value, task.id):
+                    del keys[position]
+
+    def _store(self, task: Task) -> None:
+        previous = self._tasks.get(task.id)
+        if previous is not None:
+            self._unindex(previous)
+        self._tasks[task.id] = task
+        self._index(task)
+
+    async def create(self, task: Task) -> Task:
+        if task.id in self._tasks:
+            raise ValueError(f"Duplicate task id: {task.id}")
+        self._store(task.model_copy())
+        return task
+
+    async def create_many(self, tasks: List[Task]) -> List[Optional[str]]:
+        errors: List[Optional[str]] = []
+        for task in tasks:
+            if task.id in self._tasks:
+                errors.append(f"Duplicate task id: {task.id}")
+                continue
+            self._store(task.model_copy())
+            errors.append(None)
+        return errors
+
+    @staticmethod
+    def _copy(task: Task, view: Optional[Type[BaseModel]]) -> Task:
+        return task.model_copy() if view is None else project_task(task, view)
+
+    async def get_by_id(self, task_id: str, view: Optional[Type[BaseModel]] = None) -> Optional[Task]:
+        task = self._tasks.get(task_id)
+        return self._copy(task, view) if task else None
+
+    async def get_many(self, task_ids: List[str], view: Optional[Type[BaseModel]] = None) -> List[Task]:
+        return [self._copy(self._tasks[task_id], view) for task_id in task_ids if task_id in self._tasks]
+
+    @staticmethod
+    def _matches(task: Task, filters: TaskFilter) -> bool:
+        for field, value in filters.model_dump(exclude_none=True, exclude={"due_from", "due_to"}).items():
+            if getattr(task, field) != value:
+                return False
+        if filters.due_from or filters.due_to:
+            if task.due_date is None:
+                return False
+            if filters.due_from and task.due_date < filters.due_from:
+                return False
+            if filters.due_to and task.due_date >= filters.due_to:
+                return False
+        return True
+
+    async def get_all(
+        self,
+        filters: TaskFilter,
+        limit: int,
+        after: Optional[Tuple[datetime, str]] = None,
+        sort: str = "-created_at",
+        view: Optional[Type[BaseModel]] = None
+    ) -> List[Task]:
+        field, direction = parse_sort(sort)
+
+        # Самое узкое из хэш-индексов множество кандидатов
+        candidates: Optional[Set[str]] = None
+        for indexed in INDEXED_FIELDS:
+            value = getattr(filters, indexed)
+            if value is not None:
+                ids = self._indexes[indexed].get(value, set())
+                candidates = ids if candidates is None or len(ids) < len(candidates) else candidates
+
+        if candidates is not None:
+            keys = sorted(
+                (getattr(self._tasks[task_id], field), task_id) for task_id in candidates
+                if getattr(self._tasks[task_id], field) is not None
+            )
+        else:
+            keys = self._sorted[field]
+
+        # Keyset: позиция сразу после (value, id) предыдущей страницы
+        if direction > 0:
+            start = bisect.bisect_right(keys, after) if after else 0
+            ordered = (keys[i] for i in range(start, len(keys)))
+        else:
+            start = bisect.bisect_left(keys, after) if after else len(keys)
+            ordered = (keys[i] for i in range(start - 1, -1, -1))
+
+        page = []
+        for _, task_id in ordered:
+            task = self._tasks[task_id]
+            if self._matches(task, filters):
+                page.append(self._copy(task, view))
+                if len(page) >= limit:
+                    break
+        return page
+
+    def _guarded_update(
+        self, task_id: str, changes: dict, from_statuses: List[str], version: Optional[int] = None
+    ) -> Optional[Tuple[Task, Task]]:
+        task = self._tasks.get(task_id)
+        if task is None or task.status not in from_statuses:
+            return None
+        if version is not None and task.version != version:
+            return None
+        updated = task.model_copy(update={**changes, "version": task.version + 1})
+        self._store(updated)
+        return task.model_copy(), updated.model_copy()
+
+    async def update_status(
+        self, task_id: str, status: str, from_statuses: List[str], version: Optional[int] = None
+    ) -> Optional[Tuple[Task, Task]]:
+        return self._guarded_update(task_id, {"status": status}, from_statuses, version)
+
+    async def assign_task(
+        self, task_id: str, assigned_to: str, from_statuses: List[str], version: Optional[int] = None
+    ) -> Optional[Tuple[Task, Task]]:
+        return self._guarded_update(
+            task_id, {"status": "assigned", "assigned_to": assigned_to}, from_statuses, version
+        )
+
+    async def bulk_update(
+        self, updates: List[Tuple[str, dict, List[str]]]
+    ) -> List[Tuple[Optional[Task], Optional[Task]]]:
+        results = []
+        for task_id, changes, from_statuses in updates:
+            task = self._tasks.get(task_id)
+            result = self._guarded_update(task_id, changes, from_statuses)
+            results.append(result if result else (task.model_copy() if task else None, None))
+        return results
+
+    async def rate_task(
+        self, task_id: str, rating: int, comment: Optional[str], from_statuses: List[str],
+        version: Optional[int] = None
+    ) -> Optional[Tuple[Task, Task]]:
+        return self._guarded_update(
+            task_id, {"rating": rating, "rating_comment": comment}, from_statuses, version
+        )
+    
+    async def get_open_deadlines(
+        self, statuses: List[str], until: datetime, below_level: int
+    ) -> List[Tuple[str, datetime, int]]:
+        keys = self._sorted["due_date"]
+        end = bisect.bisect_right(keys, (until, chr(0x10FFFF)))
+        return [
+            (task_id, due_date, self._tasks[task_id].sla_level)
+            for due_date, task_id in keys[:end]
+            if self._tasks[task_id].status in statuses and self._tasks[task_id].sla_level < below_level
+        ]
+    
+    async def set_sla_level(
+        self, task_id: str, level: int, from_statuses: List[str]
+    ) -> Optional[Tuple[Task, Task]]:
+        task = self._tasks.get(task_id)
+        if task is None or task.sla_level >= level:
+            return None
+        return self._guarded_update(task_id, {"sla_level": level}, from_statuses)
+
+
+class InMemoryTaskHistoryRepository(TaskHistoryRepository):
+    """История задач в памяти процесса (индекс по task_id)"""
+
+    def __init__(self):
+        self._records: Dict[str, List[dict]] = defaultdict(list)
+
+    async def create_record(self, record: TaskHistoryRecord) -> None:
+        self._records[record.task_id].append(record.model_dump())
+
+    async def create_records(self, records: List[TaskHistoryRecord]) -> None:
+        for record in records:
+            await self.create_record(record)
+
+    async def get_task_history(self, task_id: str) -> List[dict]:
+        history = sorted(self._records.get(task_id, []), key=lambda r: r["timestamp"], reverse=True)
+        return [dict(record) for record in history[:100]]
+
+
+class InMemoryTaskStatsRepository(TaskStatsRepository):
+    """Счетчики статистики в памяти; rebuild пересчитывает по репозиториям задач и истории"""
+
+    def __init__(self, tasks: InMemoryTaskRepository, history: InMemoryTaskHistoryRepository):
+        self.tasks = tasks
+        self.history = history
+        self._counters: dict = {}
+
+    async def apply(self, delta: Dict[Tuple[str, ...], float]) -> None:
+        for path, amount in delta.items():
+            if len(path) == 1:
+                self._counters[path[0]] = self._counters.get(path[0], 0) + amount
+            else:
+                group = self._counters.setdefault(path[0], {})
+                group[path[1]] = group.get(path[1], 0) + amount
+
+    async def get(self) -> dict:
+        return {key: dict(value) if isinstance(value, dict) else value for key, value in self._counters.items()}
+
+    async def rebuild(self) -> dict:
+        self._counters = {}
+        tasks = self.tasks._tasks
+        for task in tasks.values():
+            # created() берет текущий статус задачи — это и есть нужный счетчик
+            await self.apply(stats.created(task))
+            if task.rating is not None:
+                await self.apply({("rating_count",): 1, ("rating_sum",): task.rating})
+        for records in self.history._records.values():
+            for record in records:
+                task = tasks.get(record["task_id"])
+                if task and record["action"] == "status_changed" and record["to_status"] == "completed":
+                    await self.apply({
+                        ("completed_count",): 1,
+                        ("completion_seconds",): (record["timestamp"] - task.created_at).total_seconds(),
+                    })
+        return await self.get()
+
+
+class InMemoryNotificationOutboxRepository(NotificationOutboxRepository):
+    """Outbox уведомлений в памяти процесса"""
+
+    def __init__(self):
+        self._notifications: Dict[str, Notification] = {}
+
+    def __len__(self) -> int:
+        return len(self._notifications)
+
+    async def add(self, notifications: List[Notification]) -> None:
+        for notification in notifications:
+            self._notifications[notification.id] = notification
+
+    async def claim(self, limit: int, now: datetime, lease_until: datetime) -> List[Notification]:
+        due = sorted(
+            (n for n in self._notifications.values() if n.status == "pending" and n.next_attempt_at <= now),
+            key=lambda n: n.next_attempt_at,
+        )[:limit]
+        for notification in due:
+            self._notifications[notification.id] = notification.model_copy(update={"next_attempt_at": lease_until})
+        return sorted(due, key=lambda n: n.created_at)
+
+    async def complete(self, ids: List[str]) -> None:
+        for notification_id in ids:
+            self._notifications.pop(notification_id, None)
+
+    async def reschedule(self, notifications: List[Notification]) -> None:
+        for notification in notifications:
+            if notification.id in self._notifications:
+                self._notifications[notification.id] = notification
+
+
+class InMemoryIdempotencyRepository(IdempotencyRepository):
+    """Ответы по Idempotency-Key в памяти; истекшие записи заменяются при резервировании"""
+
+    def __init__(self):
+        self._records: Dict[str, IdempotencyRecord] = {}
+
+    def _holds(self, record: IdempotencyRecord) -> bool:
+        existing = self._records.get(record.key)
+        return existing is not None and existing.status == "pending" and existing.locked_until == record.locked_until
+
+    async def reserve(self, record: IdempotencyRecord) -> Optional[IdempotencyRecord]:
+        existing = self._records.get(record.key)
+        now = datetime.now()
+        if existing is not None and existing.expires_at > now and not (
+            existing.status == "pending" and existing.locked_until is not None and existing.locked_until < now
+        ):
+            return existing
+        self._records[record.key] = record
+        return None
+
+    async def complete(self, record: IdempotencyRecord) -> None:
+        if self._holds(record):
+            self._records[record.key] = record
+
+    async def release(self, record: IdempotencyRecord) -> None:
+        if self._holds(record):
+            del self._records[record.key]
+
+    async def get(self, key: str) -> Optional[IdempotencyRecord]:
+        return self._records.get(key)
+
+
+# Хранилище живет, пока живет процесс (storage_backend=memory)
+task_repository = InMemoryTaskRepository()
+history_repository = InMemoryTaskHistoryRepository()
+stats_repository = InMemoryTaskStatsRepository(task_repository, history_repository)
+notification_outbox = InMemoryNotificationOutboxRepository()
+idempotency_repository = InMemoryIdempotencyRepository()
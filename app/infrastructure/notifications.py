@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+import httpx
+
+from core.config import settings
+from domain.models import Notification
+from domain.notifications import build_notifications
+from domain.repositories import NotificationOutboxRepository
+
+logger = logging.getLogger(__name__)
+
+# Ответы, после которых пачку имеет смысл повторить; прочие 4xx — отказ получателя
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Retry-After в секундах (форму с HTTP-датой не поддерживаем)"""
+    try:
+        return max(0.0, float(response.headers["Retry-After"]))
+    except (KeyError, ValueError):
+        return None
+
+
+class NotificationDispatcher:
+    """
+    Фоновая отправка уведомлений из outbox в Notification Service (UC015).
+
+    TaskService только пишет уведомления в outbox вместе с изменением задачи —
+    запрос не ждет Notification Service. Диспетчер забирает пачку (до batch_size,
+    старые первыми), отправляет ее одним POST через общий пул соединений
+    и удаляет доставленное. При ошибке каждое уведомление откладывается
+    с экспоненциальной задержкой и полным джиттером (после max_attempts —
+    status=failed), а сам диспетчер приостанавливается на Retry-After или на ту
+    же задержку — недоступный получатель не засыпают запросами. Доставка
+    «как минимум один раз»: получатель отбрасывает повторы по id уведомления.
+    """
+
+    def __init__(
+        self,
+        outbox: NotificationOutboxRepository,
+        url: str,
+        client: Optional[httpx.AsyncClient] = None,
+        batch_size: int = settings.notifications_batch_size,
+        poll_interval: float = settings.notifications_poll_interval_ms / 1000,
+        lease: timedelta = timedelta(seconds=settings.notifications_lease_seconds),
+        max_attempts: int = settings.notifications_max_attempts,
+        backoff_base: float = settings.notifications_backoff_base_ms / 1000,
+        backoff_max: float = settings.notifications_backoff_max_seconds,
+        clock: Callable[[], datetime] = datetime.now,
+    ):
+        self.outbox = outbox
+        self.url = url
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(
+            timeout=settings.notifications_timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=settings.notifications_max_connections,
+                max_keepalive_connections=settings.notifications_max_connections,
+            ),
+        )
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.clock = clock
+
+        self._failures = 0  # неудачных пачек подряд — для паузы диспетчера
+        self._pause = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "sent": 0,
+            "retried": 0,
+            "failed": 0,
+            "batches": 0,
+            "errors": 0,
+            "lag_seconds": 0.0,
+            "delivery_seconds_max": 0.0,
+        }
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._owns_client:
+            await self.client.aclose()
+
+    def wake(self) -> None:
+        """В outbox появились уведомления — не ждать интервала опроса"""
+        self._wakeup.set()
+
+    async def on_sla(self, event: dict) -> None:
+        """Слушатель SLAMonitor: нарушение срока — уведомление исполнителю"""
+        notifications = build_notifications(
+            event["type"], event["task"], overdue_minutes=event.get("overdue_minutes")
+        )
+        if notifications:
+            await self.outbox.add(notifications)
+            self.wake()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                claimed = await self.dispatch_once()
+            except Exception:
+                self.stats["errors"] += 1
+                logger.exception("Notification dispatch failed")
+                claimed, self._pause = 0, max(self._pause, 1.0)
+
+            if self._pause:
+                pause, self._pause = self._pause, 0.0
+                await asyncio.sleep(pause)
+            elif claimed < self.batch_size:
+                # Outbox разобран — ждем интервал опроса (или wake)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def dispatch_once(self) -> int:
+        """Отправляет одну пачку; возвращает число забранных из outbox уведомлений"""
+        now = self.clock()
+        batch = await self.outbox.claim(self.batch_size, now, now + self.lease)
+        if not batch:
+            self.stats["lag_seconds"] = 0.0
+            return 0
+        # Отставание — возраст самого старого недоставленного уведомления
+        self.stats["lag_seconds"] = (now - batch[0].created_at).total_seconds()
+        self.stats["batches"] += 1
+
+        error, retryable, retry_after = await self._send(batch)
+        if error is None:
+            self._failures = 0
+            await self.outbox.complete([notification.id for notification in batch])
+            sent_at = self.clock()
+            self.stats["sent"] += len(batch)
+            self.stats["delivery_seconds_max"] = max(
+                self.stats["delivery_seconds_max"],
+                max((sent_at - notification.created_at).total_seconds() for notification in batch),
+            )
+            return len(batch)
+
+        self._failures += 1
+        logger.warning("Failed to send %d notifications: %s", len(batch), error)
+        await self.outbox.reschedule([
+            self._retry(notification, error, retryable, retry_after, now) for notification in batch
+        ])
+        if retryable:
+            self._pause = retry_after if retry_after is not None else self._backoff(self._failures)
+        return len(batch)
+
+    async def _send(self, batch: List[Notification]) -> Tuple[Optional[str], bool, Optional[float]]:
+        """POST пачки: (ошибка или None, можно ли повторить, Retry-After)"""
+        payload = {"notifications": [
+            notification.model_dump(
+                mode="json", include={"id", "event_type", "task_id", "recipient_id", "message", "channel"}
+            )
+            for notification in batch
+        ]}
+        try:
+            response = await self.client.post(self.url, json=payload)
+        except httpx.HTTPError as e:
+            return f"{type(e).__name__}: {e}", True, None
+        if response.is_success:
+            return None, False, None
+        return f"HTTP {response.status_code}", response.status_code in RETRYABLE_STATUSES, _retry_after(response)
+
+    def _backoff(self, attempt: int) -> float:
+        """Полный джиттер: случайная задержка от 0 до base * 2^(attempt-1), не больше backoff_max"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def _retry(
+        self, notification: Notification, error: str, retryable: bool, retry_after: Optional[float], now: datetime
+    ) -> Notification:
+        attempts = notification.attempts + 1
+        if not retryable or attempts >= self.max_attempts:
+            self.stats["failed"] += 1
+            return notification.model_copy(update={"attempts": attempts, "status": "failed", "last_error": error})
+        self.stats["retried"] += 1
+        delay = max(self._backoff(attempts), retry_after or 0.0)
+        return notification.model_copy(update={
+            "attempts": attempts,
+            "next_attempt_at": now + timedelta(seconds=delay),
+            "last_error": error,
+        })
@@ -0,0 +1,133 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from core.config import settings
+from infrastructure.breaker import CooldownBreaker
+
+logger = logging.getLogger(__name__)
+
+# Token bucket в Redis: пополнение и списание одним атомарным скриптом,
+# время — часы Redis (одинаковые для всех подов)
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class LocalTokenBuckets:
+    """Token bucket на ключ в памяти процесса (LRU: давно не приходившие ключи вытесняются)"""
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: str, now: Optional[float] = None) -> float:
+        """Списывает токен; 0 — запрос разрешен, иначе сколько секунд ждать"""
+        now = time.monotonic() if now is None else now
+        tokens, updated_at = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisTokenBuckets:
+    """Общие для всех подов token bucket в Redis (REDIS_URL)"""
+
+    def __init__(self, url: str, rate: float, burst: int):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(
+            url, socket_timeout=settings.redis_timeout_seconds, socket_connect_timeout=settings.redis_timeout_seconds
+        )
+        self.script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+        self.rate = rate
+        self.burst = burst
+
+    async def take(self, key: str) -> float:
+        return float(await self.script(keys=[key], args=[self.rate, self.burst]))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class RateLimiter:
+    """
+    Ограничение частоты запросов на пользователя (sub): общий уровень в Redis,
+    чтобы лимит не умножался на число подов, и локальный — если Redis нет
+    или он недоступен (тогда лимит действует в каждом поде отдельно). После
+    ошибки Redis не опрашивается redis_cooldown_seconds.
+    """
+
+    KEY_PREFIX = "rate:"
+
+    def __init__(self, local: LocalTokenBuckets, shared=None, breaker: Optional[CooldownBreaker] = None):
+        self.local = local
+        self.shared = shared
+        self.breaker = breaker or CooldownBreaker("Shared rate limit")
+        self.stats = {"allowed": 0, "limited": 0, "shared_errors": 0, "shared_skipped": 0}
+
+    @classmethod
+    def from_settings(cls) -> "RateLimiter":
+        local = LocalTokenBuckets(settings.rate_limit_per_second, settings.rate_limit_burst)
+        shared = None
+        if settings.redis_url:
+            try:
+                shared = RedisTokenBuckets(settings.redis_url, settings.rate_limit_per_second, settings.rate_limit_burst)
+            except ImportError:
+                logger.warning("redis package is not installed, rate limits are per pod")
+        return cls(local, shared)
+
+    async def take(self, user_id: str) -> float:
+        """0 — запрос разрешен, иначе через сколько секунд появится токен"""
+        key = self.KEY_PREFIX + user_id
+        wait = None
+        if self.shared is not None and not self.breaker.available:
+            self.stats["shared_skipped"] += 1
+        elif self.shared is not None:
+            try:
+                wait = await self.shared.take(key)
+            except Exception as e:
+                self.stats["shared_errors"] += 1
+                self.breaker.failed(e)
+        if wait is None:
+            wait = self.local.take(key)
+        self.stats["limited" if wait > 0 else "allowed"] += 1
+        return wait
+
+    async def close(self) -> None:
+        if self.shared is not None and hasattr(self.shared, "close"):
+            await self.shared.close()
+
+
+# Один на процесс: локальные корзины живут между запросами
+rate_limiter = RateLimiter.from_settings()
@@ -1,62 +1,460 @@
-from typing import List, Optional
+import random
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Type
 
-from core.database import get_database
-from domain.models import Task, TaskHistoryRecord
-from domain.repositories import TaskRepository, TaskHistoryRepository
+from pydantic import BaseModel, TypeAdapter
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from core.config import settings
+from core.database import get_database, get_history_writer
+from domain.models import IdempotencyRecord, Notification, Task, TaskFilter, TaskHistoryRecord
+from domain.pagination import parse_sort
+from domain.repositories import (
+    IdempotencyRepository, NotificationOutboxRepository, TaskRepository, TaskHistoryRepository,
+    TaskStatsRepository
+)
+from domain.stats import GROUPS
+
+
+# Служебный _id в ответы не попадает — отбрасываем его еще в MongoDB
+NO_ID = {"_id": False}
+
+# Полная задача: без _id и служебных меток bulk_update (они нужны только ему)
+TASK_PROJECTION = {"_id": False, "bulk_marks": False}
+
+_TASK_LIST = TypeAdapter(List[Task])
+
+# Сколько последних меток bulk_update хранит задача: по метке после частичного
+# bulk_write видно, какая именно операция записалась
+BULK_MARKS_KEPT = 16
+
+
+@lru_cache(maxsize=256)
+def _view_list(view: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[view])
+
+
+def projection(view: Optional[Type[BaseModel]] = None) -> dict:
+    """Проекция MongoDB под частичную модель: с диска и по сети идут только ее поля"""
+    if view is None:
+        return TASK_PROJECTION
+    return {**NO_ID, **dict.fromkeys(view.model_fields, True)}
+
+
+def version_condition(version: Optional[int]) -> dict:
+    """Условие If-Match для фильтра обновления (у старых документов version еще нет)"""
+    if version is None:
+        return {}
+    return {"version": version} if version else {"version": {"$in": [0, None]}}
+
+
+def load_task(doc: dict, view: Optional[Type[BaseModel]] = None) -> Task:
+    """Документ коллекции tasks -> Task (единственная валидация на пути чтения)"""
+    return (view or Task).model_validate(doc)
+
+
+def load_tasks(docs: List[dict], view: Optional[Type[BaseModel]] = None) -> List[Task]:
+    """Список документов -> задачи одним проходом валидатора, без копий словарей"""
+    return (_TASK_LIST if view is None else _view_list(view)).validate_python(docs)
+
+
+def build_task_query(filters: TaskFilter) -> dict:
+    """Преобразует фильтры списка в запрос MongoDB"""
+    query = filters.model_dump(exclude_none=True, exclude={"due_from", "due_to"})
+    due_range = {}
+    if filters.due_from:
+        due_range["$gte"] = filters.due_from
+    if filters.due_to:
+        due_range["$lt"] = filters.due_to
+    if due_range:
+        query["due_date"] = due_range
+    return query
 
 
 class MongoTaskRepository(TaskRepository):
-    def __init__(self):
-        self.database = get_database()
-        self.collection = self.database["tasks"]
+    def __init__(self, collection=None):
+        # collection — заглушка в тестах; по умолчанию коллекция tasks
+        self.collection = collection if collection is not None else get_database()["tasks"]
     
     async def create(self, task: Task) -> Task:
         await self.collection.insert_one(task.model_dump())
         return task
     
-    async def get_by_id(self, task_id: str) -> Optional[Task]:
-        task_data = await self.collection.find_one({"id": task_id})
+    async def create_many(self, tasks: List[Task]) -> List[Optional[str]]:
+        errors: List[Optional[str]] = [None] * len(tasks)
+        if not tasks:
+            return errors
+        try:
+            await self.collection.insert_many(
+                [task.model_dump() for task in tasks], ordered=False
+            )
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                errors[write_error["index"]] = write_error.get("errmsg", "Write failed")
+        return errors
+    
+    async def get_by_id(self, task_id: str, view: Optional[Type[BaseModel]] = None) -> Optional[Task]:
+        task_data = await self.collection.find_one({"id": task_id}, projection=projection(view))
         if task_data:
-            return Task(**task_data)
+            return load_task(task_data, view)
         return None
     
-    async def get_all(self, status: Optional[str] = None) -> List[Task]:
-        query = {}
-        if status:
-            query["status"] = status
+    async def get_many(self, task_ids: List[str], view: Optional[Type[BaseModel]] = None) -> List[Task]:
+        if not task_ids:
+            return []
+        cursor = self.collection.find({"id": {"$in": task_ids}}, projection=projection(view))
+        docs = {doc["id"]: doc for doc in await cursor.to_list(length=len(task_ids))}
+        return load_tasks([docs[task_id] for task_id in task_ids if task_id in docs], view)
+    
+    async def get_all(
+        self,
+        filters: TaskFilter,
+        limit: int,
+        after: Optional[Tuple[datetime, str]] = None,
+        sort: str = "-created_at",
+        view: Optional[Type[BaseModel]] = None
+    ) -> List[Task]:
+        field, direction = parse_sort(sort)
+        query = build_task_query(filters)
+        if field == "due_date" and "due_date" not in query:
+            # Задачи без срока в сортировку по сроку не попадают (как и в памяти):
+            # у них нет значения для курсора
+            query["due_date"] = {"$ne": None}
         
-        cursor = self.collection.find(query)
-        tasks_data = await cursor.to_list(length=100)
-        return [Task(**task_data) for task_data in tasks_data]
-    
-    async def update_status(self, task_id: str, status: str) -> Optional[Task]:
-        result = await self.collection.update_one(
-            {"id": task_id},
-            {"$set": {"status": status}}
-        )
+        if after:
+            # Keyset-пагинация: продолжаем строго после (value, id) предыдущей страницы
+            value, last_id = after
+            op = "$lt" if direction < 0 else "$gt"
+            keyset = {"$or": [{field: {op: value}}, {field: value, "id": {op: last_id}}]}
+            query = {"$and": [query, keyset]} if query else keyset
         
-        if result.modified_count == 0:
+        cursor = self.collection.find(query, projection=projection(view))
+        cursor = cursor.sort([(field, direction), ("id", direction)]).limit(limit)
+        tasks_data = await cursor.to_list(length=limit)
+        return load_tasks(tasks_data, view)
+    
+    async def _guarded_update(
+        self, task_id: str, changes: dict, from_statuses: List[str],
+        condition: Optional[dict] = None, version: Optional[int] = None
+    ) -> Optional[Tuple[Task, Task]]:
+        """
+        Один round trip: find_one_and_update с условием на текущий статус
+        (и версию — If-Match). Берем документ до изменения (нужен для истории),
+        а итоговый получаем, применив те же изменения локально.
+        """
+        before = await self.collection.find_one_and_update(
+            {"id": task_id, "status": {"$in": from_statuses}, **version_condition(version), **(condition or {})},
+            {"$set": changes, "$inc": {"version": 1}},
+            projection=TASK_PROJECTION,
+            return_document=ReturnDocument.BEFORE
+        )
+        if before is None:
             return None
         
-        return await self.get_by_id(task_id)
+        previous = load_task(before)
+        return previous, previous.model_copy(update={**changes, "version": previous.version + 1})
     
-    async def assign_task(self, task_id: str, assigned_to: str) -> Optional[Task]:
-        result = await self.collection.update_one(
-            {"id": task_id},
-            {"$set": {"status": "assigned", "assigned_to": assigned_to}}
+    async def update_status(
+        self, task_id: str, status: str, from_statuses: List[str], version: Optional[int] = None
+    ) -> Optional[Tuple[Task, Task]]:
+        return await self._guarded_update(task_id, {"status": status}, from_statuses, version=version)
+    
+    async def assign_task(
+        self, task_id: str, assigned_to: str, from_statuses: List[str], version: Optional[int] = None
+    ) -> Optional[Tuple[Task, Task]]:
+        return await self._guarded_update(
+            task_id, {"status": "assigned", "assigned_to": assigned_to}, from_statuses, version=version
         )
+    
+    async def bulk_update(
+        self, updates: List[Tuple[str, dict, List[str]]]
+    ) -> List[Tuple[Optional[Task], Optional[Task]]]:
+        if not updates:
+            return []
         
-        if result.modified_count == 0:
-            return None
+        # 1 round trip: текущее состояние всех задач пачки
+        ids = [task_id for task_id, _, _ in updates]
+        cursor = self.collection.find({"id": {"$in": ids}}, projection=TASK_PROJECTION)
+        current = {doc["id"]: load_task(doc) for doc in await cursor.to_list(length=len(ids))}
+        
+        results: List[Tuple[Optional[Task], Optional[Task]]] = []
+        operations = []
+        planned = []
+        batch = uuid.uuid4().hex
+        for task_id, changes, from_statuses in updates:
+            task = current.get(task_id)
+            if task is None or task.status not in from_statuses:
+                results.append((task, None))
+                continue
+            # Фильтр по увиденным статусу и версии: если задачу изменили между чтением
+            # и записью, операция просто ничего не найдет
+            mark = f"{batch}:{len(operations)}"
+            operations.append(UpdateOne(
+                {"id": task_id, "status": task.status, **version_condition(task.version)},
+                {
+                    "$set": changes,
+                    "$inc": {"version": 1},
+                    "$push": {"bulk_marks": {"$each": [mark], "$slice": -BULK_MARKS_KEPT}},
+                },
+            ))
+            planned.append((len(results), task, mark))
+            results.append((task, task.model_copy(update={**changes, "version": task.version + 1})))
+        
+        if not operations:
+            return results
+        
+        # 1 round trip: все изменения одним bulk_write
+        result = await self.collection.bulk_write(operations, ordered=False)
+        if result.matched_count < len(operations):
+            # bulk_write не сообщает, какие именно операции не сработали — уточняем чтением:
+            # записалась ровно та операция, чья метка есть в задаче (совпадение полей
+            # ничего не доказывает — конкурент мог записать те же значения)
+            cursor = self.collection.find(
+                {"id": {"$in": [task.id for _, task, _ in planned]}}, projection=NO_ID  # с метками
+            )
+            after = {doc["id"]: doc for doc in await cursor.to_list(length=len(planned))}
+            for position, task, mark in planned:
+                doc = after.get(task.id)
+                if doc is None or mark not in (doc.get("bulk_marks") or ()):
+                    results[position] = (load_task(doc) if doc else None, None)
+        
+        return results
+    
+    async def rate_task(
+        self, task_id: str, rating: int, comment: Optional[str], from_statuses: List[str],
+        version: Optional[int] = None
+    ) -> Optional[Tuple[Task, Task]]:
+        return await self._guarded_update(
+            task_id, {"rating": rating, "rating_comment": comment}, from_statuses, version=version
+        )
+    
+    async def get_open_deadlines(
+        self, statuses: List[str], until: datetime, below_level: int
+    ) -> List[Tuple[str, datetime, int]]:
+        # Индекс (status, due_date, sla_level, id): $in по статусам + диапазон по сроку,
+        # уровень проверяется по ключам индекса — эскалированные задачи не читаются
+        cursor = self.collection.find(
+            {"status": {"$in": statuses}, "due_date": {"$lte": until}, "sla_level": {"$not": {"$gte": below_level}}},
+            projection={"_id": False, "id": True, "due_date": True, "sla_level": True}
+        )
+        return [
+            (doc["id"], doc["due_date"], doc.get("sla_level", 0))
+            async for doc in cursor
+        ]
+    
+    async def set_sla_level(
+        self, task_id: str, level: int, from_statuses: List[str]
+    ) -> Optional[Tuple[Task, Task]]:
+        # $not/$gte совпадает и с документами, где sla_level еще нет
+        return await self._guarded_update(
+            task_id, {"sla_level": level}, from_statuses,
+            condition={"sla_level": {"$not": {"$gte": level}}}
+        )
+
+
+def _escape_key(key: str) -> str:
+    """Значение (категория и т.п.) как имя поля MongoDB: без '.' и '$'"""
+    return key.replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+
+def _unescape_key(key: str) -> str:
+    return key.replace("%24", "$").replace("%2E", ".").replace("%25", "%")
+
+
+def _add_counters(total: dict, doc: dict) -> None:
+    for field, value in doc.items():
+        if field == "_id":
+            continue
+        if isinstance(value, dict):
+            group = total.setdefault(field, {})
+            for key, amount in value.items():
+                key = _unescape_key(key)
+                group[key] = group.get(key, 0) + amount
+        else:
+            total[field] = total.get(field, 0) + value
+
+
+class MongoTaskStatsRepository(TaskStatsRepository):
+    """
+    Счетчики в коллекции task_stats. Чтобы параллельные $inc не упирались
+    в один документ, счетчики разложены по stats_shards документам:
+    запись идет в случайный, чтение суммирует все (их немного).
+    """
+    
+    def __init__(self, shards: int = settings.stats_shards):
+        self.database = get_database()
+        self.collection = self.database["task_stats"]
+        self.shards = max(1, shards)
+    
+    async def apply(self, delta: Dict[Tuple[str, ...], float]) -> None:
+        increments = {".".join(_escape_key(part) for part in path): amount for path, amount in delta.items()}
+        await self.collection.update_one(
+            {"_id": f"shard-{random.randrange(self.shards)}"},
+            {"$inc": increments},
+            upsert=True
+        )
+    
+    async def get(self) -> dict:
+        counters: dict = {}
+        async for doc in self.collection.find({}):
+            _add_counters(counters, doc)
+        return counters
+    
+    async def rebuild(self) -> dict:
+        """
+        Полный пересчет агрегацией по tasks и task_history. Записи счетчиков,
+        пришедшие во время пересчета, могут потеряться — запускать в спокойное время.
+        """
+        facets = {
+            group: [{"$group": {"_id": f"${group}", "n": {"$sum": 1}}}] for group in GROUPS
+        }
+        facets["rating"] = [
+            {"$match": {"rating": {"$ne": None}}},
+            {"$group": {"_id": None, "count": {"$sum": 1}, "sum": {"$sum": "$rating"}}},
+        ]
+        [result] = await self.database["tasks"].aggregate([{"$facet": facets}]).to_list(length=1)
+        
+        # Время выполнения: момент перехода в completed из истории минус created_at задачи
+        completion = await self.database["task_history"].aggregate([
+            {"$match": {"action": "status_changed", "to_status": "completed"}},
+            {"$lookup": {"from": "tasks", "localField": "task_id", "foreignField": "id", "as": "task"}},
+            {"$unwind": "$task"},
+            {"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "ms": {"$sum": {"$subtract": ["$timestamp", "$task.created_at"]}},
+            }},
+        ]).to_list(length=1)
+        
+        rating = result["rating"][0] if result["rating"] else {"count": 0, "sum": 0}
+        counters = {
+            "total": sum(row["n"] for row in result["status"]),
+            **{
+                group: {_escape_key(str(row["_id"])): row["n"] for row in result[group]}
+                for group in GROUPS
+            },
+            "rating_count": rating["count"],
+            "rating_sum": rating["sum"],
+            "completed_count": completion[0]["count"] if completion else 0,
+            "completion_seconds": completion[0]["ms"] / 1000 if completion else 0,
+        }
+        await self.collection.replace_one({"_id": "shard-0"}, counters, upsert=True)
+        await self.collection.delete_many({"_id": {"$ne": "shard-0"}})
+        
+        rebuilt: dict = {}
+        _add_counters(rebuilt, counters)
+        return rebuilt
+
+
+class MongoNotificationOutboxRepository(NotificationOutboxRepository):
+    """
+    Коллекция notification_outbox. Индекс (status, next_attempt_at) — под выборку
+    очередной пачки; доставленные уведомления удаляются, outbox не растет.
+    """
+    
+    def __init__(self):
+        self.database = get_database()
+        self.collection = self.database["notification_outbox"]
+    
+    async def add(self, notifications: List[Notification]) -> None:
+        if notifications:
+            await self.collection.insert_many(
+                [notification.model_dump() for notification in notifications], ordered=False
+            )
+    
+    async def claim(self, limit: int, now: datetime, lease_until: datetime) -> List[Notification]:
+        due = {"status": "pending", "next_attempt_at": {"$lte": now}}
+        cursor = self.collection.find(due, projection={"id": True, "_id": False})
+        ids = [doc["id"] for doc in await cursor.sort("next_attempt_at", 1).to_list(length=limit)]
+        if not ids:
+            return []
         
-        return await self.get_by_id(task_id)
+        # Условие due повторяется: что успел забрать другой под, сюда не попадет
+        lease = str(uuid.uuid4())
+        await self.collection.update_many(
+            {"id": {"$in": ids}, **due},
+            {"$set": {"next_attempt_at": lease_until, "lease": lease}}
+        )
+        cursor = self.collection.find(
+            {"id": {"$in": ids}, "lease": lease}, projection={"_id": False, "lease": False}
+        )
+        claimed = [Notification(**doc) for doc in await cursor.to_list(length=limit)]
+        return sorted(claimed, key=lambda notification: notification.created_at)
+    
+    async def complete(self, ids: List[str]) -> None:
+        if ids:
+            await self.collection.delete_many({"id": {"$in": ids}})
+    
+    async def reschedule(self, notifications: List[Notification]) -> None:
+        if not notifications:
+            return
+        await self.collection.bulk_write([
+            UpdateOne({"id": notification.id}, {"$set": notification.model_dump(
+                include={"attempts", "next_attempt_at", "status", "last_error"}
+            )})
+            for notification in notifications
+        ], ordered=False)
+
+
+class MongoIdempotencyRepository(IdempotencyRepository):
+    """
+    Коллекция idempotency_keys: _id — ключ, TTL-индекс по expires_at удаляет
+    истекшие записи. Резервирование — один upsert по условию «записи нет, она истекла
+    или ее pending брошен»: из параллельных запросов (в том числе из разных подов)
+    записывает ровно один, остальные получают DuplicateKeyError и читают запись.
+    Свою pending-запись запрос узнает по locked_until.
+    """
+    
+    def __init__(self):
+        self.database = get_database()
+        self.collection = self.database["idempotency_keys"]
+    
+    @staticmethod
+    def _load(doc: Optional[dict]) -> Optional[IdempotencyRecord]:
+        if doc is None:
+            return None
+        return IdempotencyRecord(key=doc.pop("_id"), **doc)
+    
+    @staticmethod
+    def _reservation(record: IdempotencyRecord) -> dict:
+        return {"_id": record.key, "status": "pending", "locked_until": record.locked_until}
+    
+    async def reserve(self, record: IdempotencyRecord) -> Optional[IdempotencyRecord]:
+        now = datetime.now()
+        for _ in range(3):
+            try:
+                # Совпавшая запись (истекшая или брошенная) перезаписывается; нет записи — вставка
+                await self.collection.find_one_and_update(
+                    {"_id": record.key, "$or": [
+                        {"expires_at": {"$lte": now}},
+                        {"status": "pending", "locked_until": {"$lt": now}},
+                    ]},
+                    {"$set": record.model_dump(exclude={"key"})},
+                    upsert=True,
+                    return_document=ReturnDocument.BEFORE
+                )
+                return None
+            except DuplicateKeyError:
+                existing = await self.get(record.key)
+                if existing is not None:
+                    return existing
+                # Запись удалили между upsert и чтением (release, TTL) — пробуем снова
+        raise RuntimeError(f"Idempotency-Key {record.key} could not be reserved")
     
-    async def rate_task(self, task_id: str, rating: int, comment: Optional[str]) -> bool:
-        result = await self.collection.update_one(
-            {"id": task_id},
-            {"$set": {"rating": rating, "rating_comment": comment}}
+    async def complete(self, record: IdempotencyRecord) -> None:
+        await self.collection.update_one(
+            self._reservation(record),
+            {"$set": record.model_dump(include={"status", "status_code", "body", "headers"})}
         )
-        return result.modified_count > 0
+    
+    async def release(self, record: IdempotencyRecord) -> None:
+        await self.collection.delete_one(self._reservation(record))
+    
+    async def get(self, key: str) -> Optional[IdempotencyRecord]:
+        return self._load(await self.collection.find_one({"_id": key}))
 
 
 class MongoTaskHistoryRepository(TaskHistoryRepository):
@@ -65,14 +463,23 @@ class MongoTaskHistoryRepository(TaskHistoryRepository):
         self.collection = self.database["task_history"]
     
     async def create_record(self, record: TaskHistoryRecord) -> None:
-        await self.collection.insert_one(record.model_dump())
+        writer = get_history_writer()
+        if writer:
+            await writer.write(record.model_dump())
+        else:
+            await self.collection.insert_one(record.model_dump())
+    
+    async def create_records(self, records: List[TaskHistoryRecord]) -> None:
+        if not records:
+            return
+        writer = get_history_writer()
+        if writer:
+            await writer.write_many([record.model_dump() for record in records])
+        else:
+            await self.collection.insert_many(
+                [record.model_dump() for record in records], ordered=False
+            )
     
     async def get_task_history(self, task_id: str) -> List[dict]:
-        cursor = self.collection.find({"task_id": task_id}).sort("timestamp", -1)
-        history = await cursor.to_list(length=100)
-        
-        # Удаляем _id для чистоты JSON
-        for record in history:
-            record.pop("_id", None)
-        
-        return history
\ No newline at end of file
+        cursor = self.collection.find({"task_id": task_id}, projection=NO_ID).sort("timestamp", -1)
+        return await cursor.to_list(length=100)
\ No newline at end of file
@@ -0,0 +1,363 @@
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from domain.models import Task, TaskFilter
+from domain.repositories import TaskSearchIndex
+from infrastructure.repositories import NO_ID, TASK_PROJECTION, build_task_query, load_tasks
+
+TOKEN_RE = re.compile(r"\w+")
+CYRILLIC_RE = re.compile(r"[а-я]")
+NONZERO_BYTE_RE = re.compile(rb"[^\x00]")
+
+STOP_WORDS = frozenset(
+    "и в во на не что с со по к ко у о об от до из за для а но же ли бы"
+    " the a an and or of in on at to for is are not".split()
+)
+
+# Упрощенный стеммер: отбрасываем частые окончания русских слов (длинные первыми),
+# пока отбрасывается — так «туалет» и «туалете» дают одну основу
+RU_ENDINGS = tuple(sorted(
+    "ами ями ого его ому ему ыми ими ать ять ить ется ится ах ях ов ев ей ой ый ий ая яя ое ее ые ие"
+    " ом ем ам ям ую юю ет ит ут ют ал ил ла ло ли а я о е ы и у ю ь".split(),
+    key=len, reverse=True,
+))
+
+
+@lru_cache(maxsize=1 << 16)
+def stem(token: str) -> str:
+    if token.isdigit():
+        return token
+    if CYRILLIC_RE.search(token):
+        for ending in RU_ENDINGS:
+            if token.endswith(ending) and len(token) - len(ending) >= 3:
+                return stem(token[:-len(ending)])
+        return token
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Текст -> термы: нижний регистр, ё -> е, без стоп-слов, с упрощенным стеммингом"""
+    return [
+        stem(token) for token in TOKEN_RE.findall(text.lower().replace("ё", "е"))
+        if token not in STOP_WORDS
+    ]
+
+
+class InvertedIndex(TaskSearchIndex):
+    """
+    Полнотекстовый индекс задач в памяти процесса с ранжированием BM25.
+
+    Термы title (с весом title_weight) и description -> постинги
+    {номер документа: вклад}, где вклад — tf-часть BM25, квантованная в целое
+    при индексации; idf тоже целый, так что оценка документа — точная целая
+    сумма, а равные оценки упорядочиваются по номеру (новые задачи выше).
+    По умолчанию b=0 (без нормализации по длине): заявки короткие, а вклады
+    принимают немного значений, и граница оценки при раннем останове точная.
+    Поля фильтров хранятся множествами номеров по значению. Текст задачи
+    не меняется, поэтому постинги только дописываются; смена статуса или
+    исполнителя переносит номер между множествами фильтров.
+
+    Поиск: документ должен содержать все термы запроса (если таких нет —
+    отбрасывается самый частый терм, и так далее), ранжирование — по всем
+    термам. Если самое узкое из условий (постинги или фильтр) не больше
+    score_budget, условия пересекаются и кандидаты оцениваются целиком.
+    Иначе частые условия пересекаются битовыми масками (int, бит на документ),
+    а если совпадений все еще много — постинги самого редкого терма обходятся
+    по убыванию вклада, и обход останавливается, как только верхняя граница
+    оценки оставшихся документов не может попасть в top-k.
+    """
+
+    FILTER_FIELDS = ("status", "category", "priority", "location_id", "assigned_to", "created_by")
+    SCALE = 100
+    # Битовая маска заводится для условий, которые покрывают хотя бы 1/DENSE_RATIO документов
+    DENSE_RATIO = 256
+
+    def __init__(self, k1: float = 1.2, b: float = 0.0, title_weight: int = 3, score_budget: int = 1000):
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self.score_budget = score_budget
+
+        self._ids: List[str] = []  # номер документа -> id задачи
+        self._numbers: Dict[str, int] = {}
+        self._values: List[Tuple[Optional[str], ...]] = []  # номер -> значения полей фильтров
+        self._due: List[Optional[datetime]] = []
+        self._by_value: Dict[str, Dict[Optional[str], Set[int]]] = {
+            field: defaultdict(set) for field in self.FILTER_FIELDS
+        }
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._max_impact: Dict[str, int] = {}
+        self._total_length = 0
+        # Постинги частых термов по убыванию (вклад, номер) + дописанное после сортировки
+        self._ordered: Dict[str, List[int]] = {}
+        self._fresh: Dict[str, List[int]] = defaultdict(list)
+        # Маски частых условий: ("term", терм) или (поле, значение) -> int
+        self._bits: Dict[Tuple[str, Optional[str]], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, task: Task) -> None:
+        if task.id in self._numbers:
+            self.update(task)
+            return
+        doc = len(self._ids)
+        self._ids.append(task.id)
+        self._numbers[task.id] = doc
+        values = tuple(getattr(task, field) for field in self.FILTER_FIELDS)
+        self._values.append(values)
+        self._due.append(task.due_date)
+        for field, value in zip(self.FILTER_FIELDS, values):
+            self._by_value[field][value].add(doc)
+            self._set_bit((field, value), doc)
+
+        frequencies = Counter(tokenize(task.description))
+        for term in tokenize(task.title):
+            frequencies[term] += self.title_weight
+        length = sum(frequencies.values())
+        self._total_length += length
+        norm = self.k1 * (1 - self.b + self.b * length / (self._total_length / len(self._ids)))
+
+        for term, tf in frequencies.items():
+            impact = max(1, round(tf * (self.k1 + 1) / (tf + norm) * self.SCALE))
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+            postings[doc] = impact
+            if impact > self._max_impact.get(term, 0):
+                self._max_impact[term] = impact
+            if term in self._ordered:
+                self._fresh[term].append(doc)
+            self._set_bit(("term", term), doc)
+
+    def add_many(self, tasks: Iterable[Task]) -> None:
+        for task in tasks:
+            self.add(task)
+
+    def update(self, task: Task) -> None:
+        """Новая задача индексируется, у известной — переносим ее между множествами фильтров"""
+        doc = self._numbers.get(task.id)
+        if doc is None:
+            self.add(task)
+            return
+        values = tuple(getattr(task, field) for field in self.FILTER_FIELDS)
+        for field, old, new in zip(self.FILTER_FIELDS, self._values[doc], values):
+            if old != new:
+                self._by_value[field][old].discard(doc)
+                self._by_value[field][new].add(doc)
+                self._set_bit((field, old), doc, False)
+                self._set_bit((field, new), doc)
+        self._values[doc] = values
+        self._due[doc] = task.due_date
+
+    def optimize(self) -> None:
+        """После массовой загрузки: сортирует постинги и строит маски частых условий заранее, а не на запросах"""
+        dense = self._dense()
+        for term, postings in self._postings.items():
+            if len(postings) > self.score_budget:
+                self._order(term)
+            if len(postings) >= dense:
+                self._bitmap(("term", term), postings)
+        for field, by_value in self._by_value.items():
+            for value, docs in by_value.items():
+                if value is not None and len(docs) >= dense:
+                    self._bitmap((field, value), docs)
+
+    def _dense(self) -> int:
+        return max(self.score_budget, len(self._ids) // self.DENSE_RATIO)
+
+    def _order(self, term: str) -> List[int]:
+        postings = self._postings[term]
+        ordered = self._ordered.get(term)
+        if ordered is None:
+            ordered = self._ordered[term] = sorted(postings, key=lambda d: (postings[d], d), reverse=True)
+            self._fresh.pop(term, None)
+        elif self._fresh.get(term):
+            # Отсортированный список + отсортированная добавка: timsort сливает их за линейное время
+            ordered.extend(sorted(self._fresh.pop(term), key=lambda d: (postings[d], d), reverse=True))
+            ordered.sort(key=lambda d: (postings[d], d), reverse=True)
+        return ordered
+
+    def _set_bit(self, key: Tuple[str, Optional[str]], doc: int, value: bool = True) -> None:
+        bits = self._bits.get(key)
+        if bits is not None:
+            self._bits[key] = bits | (1 << doc) if value else bits & ~(1 << doc)
+
+    def _bitmap(self, key: Tuple[str, Optional[str]], docs: Iterable[int]) -> int:
+        """Маска условия; строится при первом запросе и дальше поддерживается add/update"""
+        bits = self._bits.get(key)
+        if bits is None:
+            buffer = bytearray(len(self._ids) // 8 + 1)
+            for doc in docs:
+                buffer[doc >> 3] |= 1 << (doc & 7)
+            bits = self._bits[key] = int.from_bytes(buffer, "little")
+        return bits
+
+    @staticmethod
+    def _docs(bits: int) -> List[int]:
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+        return [
+            (match.start() << 3) + bit
+            for match in NONZERO_BYTE_RE.finditer(data)
+            for bit in range(8) if data[match.start()] >> bit & 1
+        ]
+
+    def _weight(self, term: str) -> int:
+        """Целый idf терма (не меньше 1)"""
+        n = len(self._ids)
+        df = len(self._postings[term])
+        return max(1, round(math.log(1 + (n - df + 0.5) / (df + 0.5)) * self.SCALE))
+
+    def _filter_conditions(self, filters: TaskFilter) -> Optional[List[Tuple[Tuple[str, Optional[str]], Set[int]]]]:
+        conditions = []
+        for field in self.FILTER_FIELDS:
+            value = getattr(filters, field)
+            if value is not None:
+                docs = self._by_value[field].get(value)
+                if not docs:
+                    return None
+                conditions.append(((field, value), docs))
+        return conditions
+
+    def _due_matches(self, doc: int, filters: TaskFilter) -> bool:
+        due = self._due[doc]
+        if due is None:
+            return False
+        if filters.due_from and due < filters.due_from:
+            return False
+        if filters.due_to and due >= filters.due_to:
+            return False
+        return True
+
+    def search_ranked(self, query: str, filters: TaskFilter, k: int) -> List[Tuple[str, float]]:
+        """Top-k (id задачи, оценка) по убыванию оценки"""
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term in self._postings]
+        filter_conditions = self._filter_conditions(filters)
+        if not terms or filter_conditions is None or k <= 0:
+            return []
+        terms.sort(key=lambda term: len(self._postings[term]))
+        weights = {term: self._weight(term) for term in terms}
+
+        for required in range(len(terms), 0, -1):
+            hits = self._top(terms, terms[:required], weights, filter_conditions, filters, k)
+            if hits:
+                return [(self._ids[doc], score / self.SCALE ** 2) for score, doc in hits]
+        return []
+
+    def _top(self, terms, required, weights, filter_conditions, filters, k) -> List[Tuple[int, int]]:
+        due_filter = filters.due_from is not None or filters.due_to is not None
+        scoring = [(weights[term], self._postings[term]) for term in terms]
+
+        def score(doc: int) -> int:
+            return sum(weight * postings.get(doc, 0) for weight, postings in scoring)
+
+        conditions = [(("term", term), self._postings[term]) for term in required] + filter_conditions
+        conditions.sort(key=lambda condition: len(condition[1]))
+        if len(conditions[0][1]) <= self.score_budget:
+            candidates = set(conditions[0][1])
+            for _, docs in conditions[1:]:
+                candidates = candidates & docs.keys() if isinstance(docs, dict) else candidates & docs
+                if not candidates:
+                    return []
+            if due_filter:
+                candidates = [doc for doc in candidates if self._due_matches(doc, filters)]
+            return heapq.nlargest(k, ((score(doc), doc) for doc in candidates))
+
+        # Частые условия пересекаем масками: пустое пересечение или немного кандидатов видно сразу
+        dense = self._dense()
+        matched = None
+        checks = []
+        for key, docs in conditions:
+            if len(docs) >= dense:
+                bits = self._bitmap(key, docs)
+                matched = bits if matched is None else matched & bits
+            else:
+                checks.append(docs)
+        if matched is not None and not matched:
+            return []
+
+        # Отброшенные термы, которые не встречаются с обязательными, ничего не добавят к оценке
+        optional = [
+            term for term in terms[len(required):]
+            if matched is None or len(self._postings[term]) < dense
+            or self._bitmap(("term", term), self._postings[term]) & matched
+        ]
+        scoring = [(weights[term], self._postings[term]) for term in required + optional]
+
+        lead = required[0]
+        lead_postings = self._postings[lead]
+        if matched is not None:
+            # Обход ниже найдет k совпадений примерно за k * len(lead) / count шагов;
+            # если совпадений мало, дешевле оценить их все
+            count = matched.bit_count()
+            if count <= self.score_budget and count * count * 8 <= k * len(lead_postings):
+                candidates = [
+                    doc for doc in self._docs(matched)
+                    if all(doc in docs for docs in checks) and (not due_filter or self._due_matches(doc, filters))
+                ]
+                return heapq.nlargest(k, ((score(doc), doc) for doc in candidates))
+
+        # Обход самого редкого обязательного терма по убыванию (вклад, номер)
+        lead_weight = weights[lead]
+        others_max = sum(weights[term] * self._max_impact[term] for term in required[1:] + optional)
+        checks = [docs for _, docs in conditions if docs is not lead_postings]
+
+        heap: List[Tuple[int, int]] = []
+        for doc in self._order(lead):
+            if len(heap) >= k:
+                # Дальше оценки не выше bound, а при равной оценке номера только меньше
+                bound = lead_weight * lead_postings[doc] + others_max
+                if bound < heap[0][0] or (bound == heap[0][0] and doc < heap[0][1]):
+                    break
+            if all(doc in docs for docs in checks) and (not due_filter or self._due_matches(doc, filters)):
+                item = (score(doc), doc)
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+        return sorted(heap, reverse=True)
+
+    async def search(self, query: str, filters: TaskFilter, limit: int, offset: int = 0) -> List[str]:
+        hits = self.search_ranked(query, filters, offset + limit)
+        return [task_id for task_id, _ in hits[offset:]]
+
+    async def load(self, collection, batch_size: int = 10000) -> None:
+        """Строит индекс по коллекции tasks (при старте пода)"""
+        batch = []
+        async for doc in collection.find({}, projection=TASK_PROJECTION).batch_size(batch_size):
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                self.add_many(load_tasks(batch))
+                batch = []
+        self.add_many(load_tasks(batch))
+        self.optimize()
+
+
+class MongoTextSearchIndex(TaskSearchIndex):
+    """
+    Поиск текстовым индексом title_description_text: $text вместе с фильтрами
+    списка, сортировка по textScore. Индекс поддерживает сама MongoDB,
+    поэтому update ничего не делает.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def search(self, query: str, filters: TaskFilter, limit: int, offset: int = 0) -> List[str]:
+        score = {"score": {"$meta": "textScore"}}
+        cursor = self.collection.find(
+            {"$text": {"$search": query}, **build_task_query(filters)},
+            projection={**NO_ID, "id": True, **score},
+        )
+        cursor = cursor.sort([("score", {"$meta": "textScore"}), ("id", 1)]).skip(offset).limit(limit)
+        return [doc["id"] for doc in await cursor.to_list(length=limit)]
+
+    def update(self, task: Task) -> None:
+        pass
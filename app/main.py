@@ -1,30 +1,155 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
 
+from fastapi import FastAPI, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+
+from auth import jwks_cache, token_cache, token_verifier
+from tracing import tracer
+from core.admission import concurrency_limit
 from core.config import settings
-from core.database import connect_to_mongo, close_mongo_connection
+from core.database import get_history_writer
+from core.metrics import register_stats
+from core.profiling import SamplingProfiler
+from domain.events import event_bus
+from infrastructure.cache import task_cache
+from infrastructure.rate_limit import rate_limiter
+from presentation.container import AppContainer
+from presentation.dependencies import request_user
+from presentation.middleware import AdmissionMiddleware, ProfilingMiddleware, TracingMiddleware
+from presentation.responses import ModelJSONResponse
 from presentation.routers import router
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Сборка контейнера до приема запросов и его остановка после"""
+    app.state.container = AppContainer()
+    try:
+        await app.state.container.start()
+        yield
+    finally:
+        await app.state.container.close()
+        if settings.profiling_enabled:
+            app.state.profiler.stop()
+
+
 def create_app() -> FastAPI:
     """Создает и настраивает FastAPI приложение"""
     app = FastAPI(
         title=settings.title,
-        version=settings.version
+        version=settings.version,
+        default_response_class=ModelJSONResponse,
+        lifespan=lifespan
     )
-    
+
     # Подключаем роутеры
     app.include_router(router)
-    
-    # События запуска и завершения
-    @app.on_event("startup")
-    async def startup_event():
-        await connect_to_mongo()
-    
-    @app.on_event("shutdown")
-    async def shutdown_event():
-        await close_mongo_connection()
-    
+
+    @app.get("/health", include_in_schema=False)
+    async def health():
+        """Liveness: процесс жив и обслуживает event loop"""
+        return {"status": "ok"}
+
+    @app.get("/ready", include_in_schema=False)
+    async def ready(request: Request):
+        """Readiness: контейнер собран, пул прогрет, база отвечает"""
+        container = getattr(request.app.state, "container", None)
+        if container is None or not await container.is_ready():
+            return ModelJSONResponse({"status": "starting"}, status_code=503)
+        return {"status": "ready"}
+
+    if settings.metrics_enabled:
+        _register_component_stats(app)
+
+        @app.get("/metrics", include_in_schema=False)
+        def metrics():
+            return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+    # Ограничения — внутри профилирования и трассировки: отказ тоже виден в трассе
+    if settings.rate_limit_enabled or settings.admission_enabled:
+        app.add_middleware(
+            AdmissionMiddleware,
+            identify=request_user,
+            rate_limiter=rate_limiter if settings.rate_limit_enabled else None,
+            concurrency_limit=concurrency_limit if settings.admission_enabled else None,
+            prefix=settings.api_v1_prefix,
+        )
+
+    # Профайлер внутри трассировки — чтобы профиль знал trace id
+    if settings.profiling_enabled:
+        app.state.profiler = SamplingProfiler(interval=settings.profiling_interval_ms / 1000)
+        app.add_middleware(
+            ProfilingMiddleware,
+            profiler=app.state.profiler,
+            sample_every=settings.profiling_sample_every,
+            slow_ms=settings.profiling_slow_ms,
+            output_dir=settings.profiling_output_dir,
+        )
+    if tracer.enabled:
+        app.add_middleware(TracingMiddleware, tracer=tracer)
+
     return app
 
 
-app = create_app()
\ No newline at end of file
+def _register_component_stats(app: FastAPI):
+    """Счетчики компонентов читаются только в момент сбора метрик"""
+    register_stats("jwks", lambda: jwks_cache.stats)
+    register_stats("token_cache", lambda: {**token_cache.stats, "size": len(token_cache)}, gauges=["size"])
+    register_stats("token_verifier", lambda: token_verifier.stats)
+    register_stats(
+        "task_cache",
+        lambda: {**task_cache.stats, "size": len(task_cache.local)},
+        gauges=["size"],
+    )
+    register_stats("sla", lambda: _sla_stats(app), gauges=["pending"])
+    register_stats("events", lambda: {**event_bus.stats, "subscribers": event_bus.subscribers}, gauges=["subscribers"])
+    register_stats("history_writer", _history_writer_stats, gauges=["queue_depth", "flush_seconds_max"])
+    register_stats(
+        "notifications",
+        lambda: _notification_stats(app),
+        gauges=["lag_seconds", "delivery_seconds_max"],
+    )
+    register_stats("idempotency", lambda: _idempotency_stats(app))
+    register_stats("rate_limit", lambda: {**rate_limiter.stats, "local_keys": len(rate_limiter.local)}, gauges=["local_keys"])
+    register_stats(
+        "admission",
+        lambda: {
+            **concurrency_limit.stats,
+            "limit": concurrency_limit.limit,
+            "in_flight": concurrency_limit.in_flight,
+            "mongo_latency_seconds": concurrency_limit.short_latency or 0.0,
+        },
+        gauges=["limit", "in_flight", "mongo_latency_seconds"],
+    )
+
+
+def _component(app: FastAPI, name: str):
+    container = getattr(app.state, "container", None)
+    return getattr(container, name, None)
+
+
+def _sla_stats(app: FastAPI):
+    monitor = _component(app, "sla_monitor")
+    if monitor is None:
+        return None
+    return {**monitor.stats, "pending": monitor.pending}
+
+
+def _notification_stats(app: FastAPI):
+    dispatcher = _component(app, "notification_dispatcher")
+    return dispatcher.stats if dispatcher is not None else None
+
+
+def _idempotency_stats(app: FastAPI):
+    store = _component(app, "idempotency")
+    return store.stats if store is not None else None
+
+
+def _history_writer_stats():
+    writer = get_history_writer()
+    if writer is None:
+        return None
+    return {**writer.stats, "queue_depth": writer.queue_depth}
+
+
+app = create_app()
@@ -0,0 +1,145 @@
+import gc
+from typing import Optional
+
+from auth import token_verifier
+from tracing import traced, tracer
+
+from core.config import settings
+from core.database import close_mongo_connection, connect_to_mongo, get_database, ping_database
+from domain.events import event_bus
+from domain.repositories import (
+    NotificationOutboxRepository, TaskRepository, TaskHistoryRepository, TaskSearchIndex,
+    TaskStatsRepository
+)
+from domain.services import TaskService
+from domain.sla import SLAMonitor
+from infrastructure import memory
+from infrastructure.cache import CachedTaskRepository, task_cache
+from infrastructure.change_stream import ChangeStreamSource
+from infrastructure.idempotency import IdempotencyStore
+from infrastructure.notifications import NotificationDispatcher
+from infrastructure.rate_limit import rate_limiter
+from infrastructure.repositories import (
+    MongoIdempotencyRepository, MongoNotificationOutboxRepository, MongoTaskRepository,
+    MongoTaskHistoryRepository, MongoTaskStatsRepository
+)
+from infrastructure.search import InvertedIndex, MongoTextSearchIndex
+
+
+class AppContainer:
+    """
+    Все, что живет столько же, сколько приложение: соединение с MongoDB,
+    репозитории, фоновые компоненты и TaskService. Собирается один раз
+    в lifespan до приема запросов — зависимости запроса только берут
+    готовый сервис из app.state.container.
+    """
+
+    def __init__(self):
+        self.task_repo: Optional[TaskRepository] = None
+        self.history_repo: Optional[TaskHistoryRepository] = None
+        self.stats_repo: Optional[TaskStatsRepository] = None
+        self.outbox: Optional[NotificationOutboxRepository] = None
+        self.sla_monitor: Optional[SLAMonitor] = None
+        self.notification_dispatcher: Optional[NotificationDispatcher] = None
+        self.change_stream: Optional[ChangeStreamSource] = None
+        self.search_index: Optional[TaskSearchIndex] = None
+        self.idempotency: Optional[IdempotencyStore] = None
+        self.task_service: Optional[TaskService] = None
+        self.ready = False
+
+    def _build_repositories(self) -> None:
+        if settings.storage_backend == "memory":
+            task_repo = memory.task_repository
+            history_repo = memory.history_repository
+            stats_repo = memory.stats_repository
+            outbox = memory.notification_outbox
+            idempotency_repo = memory.idempotency_repository
+        else:
+            task_repo = MongoTaskRepository()
+            if settings.task_cache_enabled:
+                task_repo = CachedTaskRepository(task_repo, task_cache)
+            history_repo = MongoTaskHistoryRepository()
+            stats_repo = MongoTaskStatsRepository()
+            outbox = MongoNotificationOutboxRepository()
+            idempotency_repo = MongoIdempotencyRepository()
+
+        if tracer.enabled:
+            # При включенной трассировке каждый вызов репозитория — отдельный спан
+            task_repo = traced(task_repo, "task_repository")
+            history_repo = traced(history_repo, "history_repository")
+            stats_repo = traced(stats_repo, "stats_repository")
+            outbox = traced(outbox, "notification_outbox")
+            idempotency_repo = traced(idempotency_repo, "idempotency_repository")
+
+        self.task_repo = task_repo
+        self.history_repo = history_repo
+        self.stats_repo = stats_repo
+        # Без Notification Service уведомления не пишутся
+        self.outbox = outbox if settings.notifications_url else None
+        self.idempotency = IdempotencyStore(idempotency_repo)
+
+    async def _build_search_index(self) -> TaskSearchIndex:
+        if settings.storage_backend == "memory":
+            index = InvertedIndex()
+            index.add_many(memory.task_repository)
+            index.optimize()
+            return index
+        collection = get_database()["tasks"]
+        if settings.search_backend == "index":
+            index = InvertedIndex()
+            await index.load(collection)
+            # Миллионы долгоживущих объектов индекса не нужно обходить при каждой полной сборке мусора
+            gc.freeze()
+            return index
+        return MongoTextSearchIndex(collection)
+
+    async def start(self) -> None:
+        if settings.storage_backend == "mongo":
+            await connect_to_mongo()
+        self._build_repositories()
+        self.search_index = await self._build_search_index()
+
+        if self.outbox is not None:
+            self.notification_dispatcher = NotificationDispatcher(self.outbox, settings.notifications_url)
+            self.notification_dispatcher.start()
+
+        if settings.sla_enabled:
+            self.sla_monitor = SLAMonitor(self.task_repo, self.history_repo)
+            if settings.events_source == "service":
+                self.sla_monitor.add_listener(event_bus.publish_sla)
+            if self.notification_dispatcher is not None:
+                self.sla_monitor.add_listener(self.notification_dispatcher.on_sla)
+            await self.sla_monitor.start()
+
+        event_bus.start()
+        if settings.events_source == "change_stream":
+            self.change_stream = ChangeStreamSource(get_database()["tasks"], event_bus)
+            self.change_stream.start()
+
+        # При change_stream события публикует поток изменений, а не сервис
+        events = event_bus if settings.events_source == "service" else None
+        self.task_service = TaskService(
+            self.task_repo, self.history_repo, self.sla_monitor, self.stats_repo, events, self.outbox,
+            self.search_index
+        )
+        self.ready = True
+
+    async def is_ready(self) -> bool:
+        """Готов принимать запросы: все собрано и (для mongo) база отвечает"""
+        if not self.ready:
+            return False
+        return settings.storage_backend != "mongo" or await ping_database()
+
+    async def close(self) -> None:
+        self.ready = False
+        if self.sla_monitor is not None:
+            await self.sla_monitor.close()
+        if self.change_stream is not None:
+            await self.change_stream.close()
+        if self.notification_dispatcher is not None:
+            await self.notification_dispatcher.close()
+        await event_bus.close()
+        await close_mongo_connection()
+        await task_cache.close()
+        await rate_limiter.close()
+        token_verifier.shutdown()
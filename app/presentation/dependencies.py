@@ -1,30 +1,69 @@
-from fastapi import Depends
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.datastructures import Headers
 
 # Импортируем модуль авторизации (предполагается, что он есть)
 from auth import verify_token
 
+from domain.events import EventBus, event_bus
 from domain.services import TaskService
-from infrastructure.repositories import MongoTaskRepository, MongoTaskHistoryRepository
+from infrastructure.idempotency import IdempotencyStore
+from presentation.container import AppContainer
+from presentation.responses import etag_version
+
+
+def get_container(request: Request) -> AppContainer:
+    """Dependency для получения контейнера приложения (собран в lifespan)"""
+    return request.app.state.container
+
+
+def get_task_service(container: AppContainer = Depends(get_container)) -> TaskService:
+    """Dependency для получения сервиса задач — один экземпляр на приложение"""
+    return container.task_service
+
+
+def get_idempotency_store(container: AppContainer = Depends(get_container)) -> IdempotencyStore:
+    """Dependency для получения хранилища ответов по Idempotency-Key"""
+    return container.idempotency
 
 
-def get_task_repository() -> MongoTaskRepository:
-    """Dependency для получения репозитория задач"""
-    return MongoTaskRepository()
+def get_event_bus() -> EventBus:
+    """Dependency для получения шины событий задач"""
+    return event_bus
 
 
-def get_history_repository() -> MongoTaskHistoryRepository:
-    """Dependency для получения репозитория истории"""
-    return MongoTaskHistoryRepository()
+def get_expected_version(if_match: Optional[str] = Header(None)) -> Optional[int]:
+    """
+    If-Match -> версия, с которой клиент читал задачу (None — без условия).
+    Проверяется в фильтре самого обновления; несовпадение — 412.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    version = etag_version(if_match)
+    if version is None:
+        # Слабые теги и списки тегов сильному сравнению не удовлетворяют
+        raise HTTPException(status_code=412, detail="If-Match must be a single ETag of the task")
+    return version
 
 
-def get_task_service(
-    task_repo: MongoTaskRepository = Depends(get_task_repository),
-    history_repo: MongoTaskHistoryRepository = Depends(get_history_repository)
-) -> TaskService:
-    """Dependency для получения сервиса задач"""
-    return TaskService(task_repo, history_repo)
+async def request_user(scope: dict) -> Optional[str]:
+    """
+    sub из Bearer-токена запроса — для middleware, которым пользователь нужен
+    до зависимостей. Результат проверки (и ошибка) остается в scope["state"]:
+    verify_token в обработчике берет его оттуда, подпись проверяется один раз.
+    """
+    scheme, _, token = Headers(scope=scope).get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = await verify_token(HTTPAuthorizationCredentials(scheme=scheme, credentials=token), Request(scope))
+    except HTTPException:
+        return None
+    return payload.get("sub")
 
 
 def get_current_user(payload: dict = Depends(verify_token)) -> dict:
     """Dependency для получения текущего пользователя из токена"""
-    return payload
\ No newline at end of file
+    return payload
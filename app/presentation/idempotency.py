@@ -0,0 +1,78 @@
+import hashlib
+from typing import Awaitable, Callable, Optional
+
+from fastapi import Depends, Header, HTTPException, Request, Response
+
+from infrastructure.idempotency import IdempotencyError, IdempotencyStore
+from presentation.dependencies import get_current_user, get_idempotency_store
+from presentation.responses import ModelJSONResponse
+
+# Заголовки ответа, которые сохраняются вместе с телом и отдаются при повторе
+REPLAYED_HEADERS = ("etag",)
+
+
+class _NotStored(Exception):
+    """Ответ 5xx: отдается клиенту, но не сохраняется — ключ освобождается для повтора"""
+
+    def __init__(self, response: Response):
+        self.response = response
+
+
+class IdempotentCall:
+    """
+    Обработчик запроса с Idempotency-Key: выполняет действие один раз на ключ
+    пользователя, повтор получает сохраненный ответ (тот же статус, тело и ETag).
+    Сохраняются успешные ответы и ошибки клиента (HTTPException 4xx) — повтор
+    не выполняет запрос снова. Ответ 5xx или непредвиденное исключение не
+    сохраняются: резерв ключа снимается, повтор выполнит запрос заново.
+    Без заголовка действие просто выполняется.
+    """
+
+    def __init__(self, request: Request, store: IdempotencyStore, key: Optional[str], user_id: str):
+        self.request = request
+        self.store = store
+        self.key = key
+        self.user_id = user_id
+
+    async def __call__(self, action: Callable[[], Awaitable[Response]]) -> Response:
+        if self.key is None:
+            return await action()
+
+        async def run():
+            try:
+                response = await action()
+            except HTTPException as e:
+                if e.status_code >= 500:
+                    raise
+                response = ModelJSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+            if response.status_code >= 500:
+                raise _NotStored(response)
+            headers = {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers}
+            return response.status_code, response.body, headers
+
+        # Тот же ключ с другим методом, путем или телом — ошибка клиента (422)
+        fingerprint = hashlib.blake2b(
+            f"{self.request.method} {self.request.url.path}\n".encode() + await self.request.body(),
+            digest_size=16,
+        ).hexdigest()
+        try:
+            record = await self.store.execute(f"{self.user_id}:{self.key}", fingerprint, run)
+        except _NotStored as e:
+            return e.response
+        except IdempotencyError as e:
+            headers = {"Retry-After": "1"} if e.status_code == 409 else None
+            raise HTTPException(status_code=e.status_code, detail=str(e), headers=headers)
+        return Response(record.body, status_code=record.status_code, headers=record.headers, media_type="application/json")
+
+
+def get_idempotent_call(
+    request: Request,
+    idempotency_key: Optional[str] = Header(
+        None, min_length=1, max_length=255,
+        description="Повтор с тем же ключом вернет сохраненный ответ, а не выполнит запрос снова",
+    ),
+    store: IdempotencyStore = Depends(get_idempotency_store),
+    current_user: dict = Depends(get_current_user),
+) -> IdempotentCall:
+    """Dependency: обработчик Idempotency-Key для текущего запроса"""
+    return IdempotentCall(request, store, idempotency_key, current_user["sub"])
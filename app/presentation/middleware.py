@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import math
+import os
+import re
+import time
+from typing import Awaitable, Callable, Optional
+
+from tracing import TRACE_HEADER, Tracer, current_trace
+
+from core.admission import AdaptiveConcurrencyLimit
+from core.profiling import SamplingProfiler
+from infrastructure.rate_limit import RateLimiter
+from presentation.responses import ModelJSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Входящий X-Trace-Id принимаем, только если он похож на идентификатор
+_TRACE_ID_PATTERN = re.compile(r"^[A-Za-z0-9\-]{1,64}$")
+
+
+class TracingMiddleware:
+    """
+    Открывает трассу на каждый HTTP-запрос и возвращает ее id в заголовке
+    X-Trace-Id (в том числе для ошибок). Корневой спан называется по шаблону
+    маршрута, когда роутер его определил.
+    """
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+        self.header = TRACE_HEADER.lower().encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(self.header, b"").decode("latin-1")
+        trace, root = self.tracer.start_trace(
+            f"{scope['method']} {scope['path']}",
+            trace_id=incoming if _TRACE_ID_PATTERN.match(incoming) else None,
+        )
+        trace_id = trace.trace_id.encode()
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (self.header, trace_id)]
+                root.span.attributes["status"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                root.span.name = f"{scope['method']} {route.path_format}"
+            self.tracer.finish_trace(trace, root)
+
+
+class AdmissionMiddleware:
+    """
+    Защита API от перегрузки: token bucket на пользователя (429) и адаптивный
+    предел одновременных запросов (503), оба с Retry-After. Лишние запросы
+    отклоняются сразу, а не копятся в event loop и в очереди пула MongoDB.
+    Место в пределе занято до отправки заголовков ответа, поэтому поток
+    событий (SSE) держит его только до начала ответа.
+    """
+
+    def __init__(
+        self,
+        app,
+        identify: Callable[[dict], Awaitable[Optional[str]]],
+        rate_limiter: Optional[RateLimiter] = None,
+        concurrency_limit: Optional[AdaptiveConcurrencyLimit] = None,
+        prefix: str = "/api/v1",
+    ):
+        self.app = app
+        self.identify = identify
+        self.rate_limiter = rate_limiter
+        self.concurrency_limit = concurrency_limit
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        if self.rate_limiter is not None:
+            # Без пользователя (нет или неверный токен) лимит считается по адресу
+            # клиента — перебор токенов тоже ограничен; 401 ответит обработчик
+            user_id = await self.identify(scope)
+            if user_id is None:
+                client = scope.get("client")
+                user_id = f"addr:{client[0] if client else 'unknown'}"
+            wait = await self.rate_limiter.take(user_id)
+            if wait > 0:
+                await self._reject(scope, receive, send, 429, "Too many requests", wait)
+                return
+
+        limit = self.concurrency_limit
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        if not limit.try_acquire():
+            await self._reject(scope, receive, send, 503, "Service is overloaded, retry later", 1)
+            return
+
+        held = True
+
+        def release():
+            nonlocal held
+            if held:
+                held = False
+                limit.release()
+
+        async def send_and_release(message):
+            if message["type"] == "http.response.start":
+                release()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_release)
+        finally:
+            release()
+
+    @staticmethod
+    async def _reject(scope, receive, send, status: int, detail: str, retry_after: float) -> None:
+        response = ModelJSONResponse(
+            {"detail": detail}, status_code=status, headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+        await response(scope, receive, send)
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует запрос семплирующим профайлером, если он попал в выборку
+    (каждый sample_every-й) или работал дольше slow_ms. Профиль в формате
+    folded stacks хранится в profiler.profiles и, если задан output_dir,
+    пишется в файл <время>-<trace id>.folded.
+    """
+
+    def __init__(
+        self,
+        app,
+        profiler: SamplingProfiler,
+        sample_every: int = 0,
+        slow_ms: float = 0,
+        output_dir: Optional[str] = None,
+    ):
+        self.app = app
+        self.profiler = profiler
+        self.sample_every = sample_every
+        self.slow_ms = slow_ms
+        self.output_dir = output_dir
+        self._count = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        self._count += 1
+        sampled = self.sample_every > 0 and self._count % self.sample_every == 0
+        started = self.profiler.begin()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ended = self.profiler.end()
+            duration_ms = (ended - started) * 1000
+            slow = self.slow_ms > 0 and duration_ms >= self.slow_ms
+            if sampled or slow:
+                await self._save(scope, started, ended, duration_ms, "slow" if slow else "sampled")
+
+    async def _save(self, scope, started: float, ended: float, duration_ms: float, reason: str) -> None:
+        trace = current_trace()
+        profile = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "duration_ms": round(duration_ms, 3),
+            "reason": reason,
+            "trace_id": trace.trace_id if trace else None,
+            "stacks": self.profiler.collect(started, ended),
+        }
+        self.profiler.profiles.append(profile)
+        if self.output_dir:
+            name = f"{int(time.time() * 1000)}-{profile['trace_id'] or self._count}.folded"
+            path = os.path.join(self.output_dir, name)
+            try:
+                await asyncio.to_thread(_write_folded, path, profile["stacks"])
+            except OSError as e:
+                logger.warning("Failed to write profile %s: %s", path, e)
+
+
+def _write_folded(path: str, stacks: dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        for stack, count in stacks.items():
+            f.write(f"{stack} {count}\n")
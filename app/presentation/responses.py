@@ -0,0 +1,68 @@
+from typing import Any, Callable, Optional
+
+import orjson
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+def etag(version: int) -> str:
+    """ETag задачи — ее версия (сильный: одна версия — одно представление по URL)"""
+    return f'"{version}"'
+
+
+def etag_version(value: str) -> Optional[int]:
+    """'"3"' -> 3; слабый или чужой тег -> None"""
+    value = value.strip()
+    if len(value) < 3 or value[0] != '"' or value[-1] != '"' or not value[1:-1].isdigit():
+        return None
+    return int(value[1:-1])
+
+
+def none_match(if_none_match: Optional[str], version: int) -> bool:
+    """If-None-Match совпал с текущей версией — можно ответить 304 (слабое сравнение)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag(version) in (tag.removeprefix("W/") for tag in tags)
+
+
+def _dump_model(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class ModelJSONResponse(ORJSONResponse):
+    """
+    JSON-ответ без повторной валидации. Обработчик, вернувший
+    ModelJSONResponse(task), пропускает валидацию и сериализацию по
+    response_model: модели уже проверены при создании или чтении из хранилища.
+
+    Модель или список моделей сериализуется сразу в JSON сериализатором
+    pydantic (один проход без промежуточных словарей); словари и «сырые»
+    документы (история, ответы без response_model) — через orjson.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel) or (isinstance(content, list) and content and isinstance(content[0], BaseModel)):
+            return to_json(content)
+        return orjson.dumps(content, default=_dump_model, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse, после которого всегда вызывается on_close: и когда тело
+    дочитано, и когда клиент ушел или отправка упала раньше первого кадра
+    (тогда finally генератора тела не выполняется).
+    """
+
+    def __init__(self, content: Any, on_close: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
@@ -1,75 +1,267 @@
+from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response
 
+from core.config import settings
+from domain.events import EVENT_TYPES, EventBus, SubscriberLimitError, event_stream
+from domain.models import TaskFilter
+from domain.pagination import DEFAULT_SORT, SORT_PATTERN
 from domain.services import TaskService
-from presentation.dependencies import get_task_service, get_current_user
+from presentation.dependencies import get_event_bus, get_expected_version, get_task_service, get_current_user
+from presentation.idempotency import IdempotentCall, get_idempotent_call
+from presentation.responses import ClosingStreamingResponse, ModelJSONResponse, etag, none_match
+from presentation.routing import InstrumentedRoute
 from presentation.schemas import (
-    Task, TaskCreate, TaskStatusUpdate, 
-    TaskAssignment, TaskRating
+    BulkResult, Task, TaskCreate, TaskStatusUpdate, 
+    TaskAssignment, TaskBulkStatusItem, TaskBulkAssignItem, TaskRating, TaskStats
 )
 
-router = APIRouter(prefix="/api/v1", tags=["tasks"])
+# Обработчики, отдающие задачи, возвращают ModelJSONResponse сами: модели уже
+# проверены, повторная валидация по response_model (он остается для OpenAPI) не нужна
+router = APIRouter(
+    prefix="/api/v1",
+    tags=["tasks"],
+    route_class=InstrumentedRoute,
+    default_response_class=ModelJSONResponse,
+)
+
+# fields=: из MongoDB читаются, валидируются и отдаются только эти поля
+FIELDS_QUERY = Query(None, description="Поля ответа через запятую (id отдается всегда), например id,title,status,due_date")
 
 
 @router.post("/tasks", response_model=Task)
 async def create_task(
     task: TaskCreate,
+    once: IdempotentCall = Depends(get_idempotent_call),
+    service: TaskService = Depends(get_task_service),
+    current_user: dict = Depends(get_current_user)
+):
+    """Создание новой заявки (повтор с тем же Idempotency-Key не создает дубликат)"""
+    async def create():
+        return ModelJSONResponse(await service.create_task(task, current_user["sub"]))
+    return await once(create)
+
+
+@router.post("/tasks:bulk", response_model=BulkResult)
+async def create_tasks_bulk(
+    tasks: List[TaskCreate] = Body(..., min_length=1, max_length=settings.bulk_max_items),
+    service: TaskService = Depends(get_task_service),
+    current_user: dict = Depends(get_current_user)
+):
+    """Пакетное создание заявок (результат по каждому элементу)"""
+    return await service.create_tasks(tasks, current_user["sub"])
+
+
+@router.patch("/tasks:bulk-status", response_model=BulkResult)
+async def update_tasks_status_bulk(
+    items: List[TaskBulkStatusItem] = Body(..., min_length=1, max_length=settings.bulk_max_items),
+    service: TaskService = Depends(get_task_service),
+    current_user: dict = Depends(get_current_user)
+):
+    """Пакетная смена статусов (результат по каждому элементу)"""
+    return await service.bulk_update_status(items, current_user["sub"])
+
+
+@router.patch("/tasks:bulk-assign", response_model=BulkResult)
+async def assign_tasks_bulk(
+    items: List[TaskBulkAssignItem] = Body(..., min_length=1, max_length=settings.bulk_max_items),
     service: TaskService = Depends(get_task_service),
     current_user: dict = Depends(get_current_user)
 ):
-    """Создание новой заявки"""
-    return await service.create_task(task, current_user["sub"])
+    """Пакетное назначение исполнителей (результат по каждому элементу)"""
+    return await service.bulk_assign(items, current_user["sub"])
+
+
+# Объявлены раньше /tasks/{task_id}, иначе "events" и "stats" попадут в task_id
+@router.get("/tasks/events")
+async def stream_task_events(
+    status: Optional[str] = None,
+    category: Optional[str] = None,
+    priority: Optional[str] = None,
+    location_id: Optional[str] = None,
+    assigned_to: Optional[str] = None,
+    created_by: Optional[str] = None,
+    types: Optional[str] = Query(None, description="Типы событий через запятую"),
+    last_event_id: Optional[int] = Header(None),
+    bus: EventBus = Depends(get_event_bus),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Поток событий заявок (Server-Sent Events) вместо опроса списка:
+    создание, смена статуса, назначение, оценка, нарушение SLA.
+    Фильтры — как у списка; после переподключения пропущенное досылается по Last-Event-ID.
+    """
+    event_types = [t for t in types.split(",") if t] if types else None
+    if event_types and not set(event_types) <= set(EVENT_TYPES):
+        raise HTTPException(status_code=400, detail=f"Unknown event type, expected: {', '.join(EVENT_TYPES)}")
+    filters = {
+        "status": status,
+        "category": category,
+        "priority": priority,
+        "location_id": location_id,
+        "assigned_to": assigned_to,
+        "created_by": created_by,
+    }
+    try:
+        subscription = bus.subscribe(filters, event_types, last_event_id)
+    except SubscriberLimitError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    # Слот подписчика освобождается, даже если тело ответа так и не начали отправлять
+    return ClosingStreamingResponse(
+        event_stream(bus, subscription),
+        on_close=lambda: bus.unsubscribe(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/tasks/stats", response_model=TaskStats)
+async def get_stats(
+    service: TaskService = Depends(get_task_service),
+    current_user: dict = Depends(get_current_user)
+):
+    """Сводная статистика по заявкам (из счетчиков)"""
+    return await service.get_stats()
+
+
+@router.post("/tasks/stats:rebuild", response_model=TaskStats)
+async def rebuild_stats(
+    service: TaskService = Depends(get_task_service),
+    current_user: dict = Depends(get_current_user)
+):
+    """Пересчет счетчиков статистики по всем заявкам"""
+    return await service.rebuild_stats()
+
+
+@router.get("/tasks/search", response_model=List[Task])
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=200, description="Текст для поиска в названии и описании"),
+    status: Optional[str] = None,
+    category: Optional[str] = None,
+    priority: Optional[str] = None,
+    location_id: Optional[str] = None,
+    assigned_to: Optional[str] = None,
+    created_by: Optional[str] = None,
+    due_from: Optional[datetime] = None,
+    due_to: Optional[datetime] = None,
+    limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = FIELDS_QUERY,
+    service: TaskService = Depends(get_task_service),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Полнотекстовый поиск заявок (например, дубликатов) с теми же фильтрами, что у списка.
+    Результаты по убыванию релевантности; курсор следующей страницы — в заголовке X-Next-Cursor.
+    """
+    filters = TaskFilter(
+        status=status,
+        category=category,
+        priority=priority,
+        location_id=location_id,
+        assigned_to=assigned_to,
+        created_by=created_by,
+        due_from=due_from,
+        due_to=due_to
+    )
+    page = await service.search_tasks(q, filters, limit, cursor, fields)
+    headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor else None
+    return ModelJSONResponse(page.items, headers=headers)
 
 
 @router.get("/tasks/{task_id}", response_model=Task)
 async def get_task(
     task_id: str,
+    fields: Optional[str] = FIELDS_QUERY,
+    if_none_match: Optional[str] = Header(None),
     service: TaskService = Depends(get_task_service),
     current_user: dict = Depends(get_current_user)
 ):
-    """Получение заявки по ID"""
-    return await service.get_task(task_id)
+    """Получение заявки по ID (ETag — версия; If-None-Match -> 304 без тела)"""
+    task = await service.get_task(task_id, fields)
+    headers = {"ETag": etag(task.version)}
+    if none_match(if_none_match, task.version):
+        return Response(status_code=304, headers=headers)
+    return ModelJSONResponse(task, headers=headers)
 
 
 @router.get("/tasks", response_model=List[Task])
 async def list_tasks(
     status: Optional[str] = None,
+    category: Optional[str] = None,
+    priority: Optional[str] = None,
+    location_id: Optional[str] = None,
+    assigned_to: Optional[str] = None,
+    created_by: Optional[str] = None,
+    due_from: Optional[datetime] = None,
+    due_to: Optional[datetime] = None,
+    sort: str = Query(DEFAULT_SORT, pattern=SORT_PATTERN),
+    limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = FIELDS_QUERY,
     service: TaskService = Depends(get_task_service),
     current_user: dict = Depends(get_current_user)
 ):
-    """Список заявок с фильтрацией по статусу"""
-    return await service.list_tasks(status)
+    """
+    Список заявок с фильтрами и keyset-пагинацией.
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor.
+    """
+    filters = TaskFilter(
+        status=status,
+        category=category,
+        priority=priority,
+        location_id=location_id,
+        assigned_to=assigned_to,
+        created_by=created_by,
+        due_from=due_from,
+        due_to=due_to
+    )
+    page = await service.list_tasks(filters, limit, cursor, sort, fields)
+    headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor else None
+    return ModelJSONResponse(page.items, headers=headers)
 
 
 @router.patch("/tasks/{task_id}/status", response_model=Task)
 async def update_task_status(
     task_id: str,
     status_update: TaskStatusUpdate,
+    version: Optional[int] = Depends(get_expected_version),
+    once: IdempotentCall = Depends(get_idempotent_call),
     service: TaskService = Depends(get_task_service),
     current_user: dict = Depends(get_current_user)
 ):
-    """Обновление статуса заявки с валидацией переходов"""
-    return await service.update_task_status(
-        task_id, 
-        status_update.status, 
-        current_user["sub"]
-    )
+    """Обновление статуса заявки с валидацией переходов (If-Match -> 412 при устаревшей версии)"""
+    async def update():
+        task = await service.update_task_status(
+            task_id, 
+            status_update.status, 
+            current_user["sub"],
+            version
+        )
+        return ModelJSONResponse(task, headers={"ETag": etag(task.version)})
+    return await once(update)
 
 
 @router.patch("/tasks/{task_id}/assign", response_model=Task)
 async def assign_task(
     task_id: str,
     assignment: TaskAssignment,
+    version: Optional[int] = Depends(get_expected_version),
+    once: IdempotentCall = Depends(get_idempotent_call),
     service: TaskService = Depends(get_task_service),
     current_user: dict = Depends(get_current_user)
 ):
-    """Назначение исполнителя (автоматически меняет статус на 'assigned')"""
-    return await service.assign_task(
-        task_id, 
-        assignment.assigned_to, 
-        current_user["sub"]
-    )
+    """Назначение исполнителя (автоматически меняет статус на 'assigned'; If-Match — как у статуса)"""
+    async def assign():
+        task = await service.assign_task(
+            task_id, 
+            assignment.assigned_to, 
+            current_user["sub"],
+            version
+        )
+        return ModelJSONResponse(task, headers={"ETag": etag(task.version)})
+    return await once(assign)
 
 
 @router.get("/tasks/{task_id}/history")
@@ -79,20 +271,26 @@ async def get_task_history(
     current_user: dict = Depends(get_current_user)
 ):
     """Получение истории изменений заявки"""
-    return await service.get_task_history(task_id)
+    return ModelJSONResponse(await service.get_task_history(task_id))
 
 
 @router.post("/tasks/{task_id}/rating")
 async def rate_task(
     task_id: str,
     rating_data: TaskRating,
+    version: Optional[int] = Depends(get_expected_version),
+    once: IdempotentCall = Depends(get_idempotent_call),
     service: TaskService = Depends(get_task_service),
     current_user: dict = Depends(get_current_user)
 ):
-    """Оценка выполненной заявки"""
-    return await service.rate_task(
-        task_id, 
-        rating_data.rating, 
-        rating_data.comment,
-        current_user["sub"]
-    )
\ No newline at end of file
+    """Оценка выполненной заявки (If-Match — как у статуса)"""
+    async def rate():
+        result = await service.rate_task(
+            task_id, 
+            rating_data.rating, 
+            rating_data.comment,
+            current_user["sub"],
+            version
+        )
+        return ModelJSONResponse(result, headers={"ETag": etag(result["version"])})
+    return await once(rate)
\ No newline at end of file
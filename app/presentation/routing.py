@@ -0,0 +1,83 @@
+import functools
+import inspect
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+
+from tracing import current_trace, span
+
+from core.metrics import RouteTimer
+
+# Открытый этап обработки запроса (зависимости или сериализация) — закрывается в другом месте кода
+_open_phase: ContextVar[Optional[Any]] = ContextVar("open_phase", default=None)
+
+
+def _switch_phase(name: Optional[str]) -> None:
+    """Закрывает текущий этап и, если задано имя, открывает следующий"""
+    if current_trace() is None:
+        return
+    phase = _open_phase.get()
+    if phase is not None:
+        phase.__exit__(None, None, None)
+    phase = span(name) if name else None
+    if phase is not None:
+        phase.__enter__()
+    _open_phase.set(phase)
+
+
+def _traced_endpoint(endpoint: Callable) -> Callable:
+    """Делит обработку на resolve_dependencies / endpoint / serialize_response"""
+    # include_router пересоздает маршруты с уже обернутым endpoint
+    if not inspect.iscoroutinefunction(endpoint) or getattr(endpoint, "_phased", False):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def call(*args, **kwargs):
+        _switch_phase(None)
+        with span("endpoint"):
+            result = await endpoint(*args, **kwargs)
+        _switch_phase("serialize_response")
+        return result
+
+    call._phased = True
+    return call
+
+
+class InstrumentedRoute(APIRoute):
+    """
+    APIRoute с метриками: латентность по шаблону пути (/api/v1/tasks/{task_id}),
+    запросы в работе и коды ответов. В замер входят зависимости
+    (в том числе проверка токена), обработчик и сериализация ответа.
+    При включенной трассировке эти этапы попадают в трассу отдельными спанами.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _traced_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        timers = {method: RouteTimer(method, self.path_format) for method in self.methods}
+
+        async def instrumented_handler(request: Request) -> Response:
+            timer = timers[request.method]
+            started = timer.start()
+            status = 500
+            _switch_phase("resolve_dependencies")
+            try:
+                response = await handler(request)
+                status = response.status_code
+                return response
+            except HTTPException as e:
+                status = e.status_code
+                raise
+            except RequestValidationError:
+                status = 422  # ответ соберет стандартный обработчик FastAPI
+                raise
+            finally:
+                _switch_phase(None)
+                timer.stop(started, status)
+
+        return instrumented_handler
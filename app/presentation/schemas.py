@@ -2,18 +2,26 @@
 # Если нужны отдельные схемы для API, можно добавить их здесь
 
 from domain.models import (
+    BulkResult,
     Task,
     TaskCreate,
     TaskStatusUpdate,
     TaskAssignment,
-    TaskRating
+    TaskBulkStatusItem,
+    TaskBulkAssignItem,
+    TaskRating,
+    TaskStats
 )
 
 # Экспортируем схемы для использования в роутерах
 __all__ = [
+    "BulkResult",
     "Task",
     "TaskCreate", 
     "TaskStatusUpdate",
     "TaskAssignment",
-    "TaskRating"
+    "TaskBulkStatusItem",
+    "TaskBulkAssignItem",
+    "TaskRating",
+    "TaskStats"
 ]
\ No newline at end of file
@@ -1,69 +1,425 @@
 # auth.py
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt, JWTError
-from config import KEYCLOAK_CLIENT_SECRET, KEYCLOAK_REALM, KEYCLOAK_SERVER_URL
-# Кэшируем JWKS (публичные ключи) — чтобы не ходить в Keycloak на каждый запрос
-from jose import jwk
-import httpx
+import asyncio
+import hashlib
+import logging
+import json
 import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
 
+import httpx
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from jose import jwk, jwt, JWTError
+from jose.backends.base import Key
+
+from config import (
+    KEYCLOAK_SERVER_URL,
+    KEYCLOAK_REALM,
+    JWKS_CACHE_TTL,
+    JWKS_REFRESH_AHEAD,
+    JWKS_MIN_REFETCH_INTERVAL,
+    JWKS_HTTP_TIMEOUT,
+    TOKEN_CACHE_ENABLED,
+    TOKEN_CACHE_MAX_SIZE,
+    JWT_VERIFY_EXECUTOR,
+    JWT_VERIFY_WORKERS,
+    JWT_VERIFY_BATCH_SIZE,
+    JWT_VERIFY_BATCH_WINDOW_MS,
+)
+from tracing import span
+
+logger = logging.getLogger(__name__)
 
 # URL для получения JWKS (публичные ключи для проверки подписи токена)
 JWKS_URL = f"{KEYCLOAK_SERVER_URL}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/certs"
 
 # Алгоритм подписи — всегда RS256 для Keycloak
 ALGORITHM = "RS256"
+AUDIENCE = "task-service"
+ISSUER = f"{KEYCLOAK_SERVER_URL}/realms/{KEYCLOAK_REALM}"
 
 # Схема авторизации — Bearer token
 security = HTTPBearer()
 
 
+class JWKSUnavailableError(Exception):
+    """Не удалось получить JWKS, а ранее полученных ключей нет"""
 
-_jwks = None
-_jwks_fetched_at = 0
 
-def get_jwks():
-    global _jwks, _jwks_fetched_at
-    if _jwks is None or time.time() - _jwks_fetched_at > 3600:  # обновляем раз в час
-        response = requests.get(JWKS_URL)
-        response.raise_for_status()
-        _jwks = response.json()
-        _jwks_fetched_at = time.time()
-    return _jwks
+class JWKSCache:
+    """
+    Асинхронный кэш публичных ключей Keycloak.
+
+    - ключи собираются (jwk.construct) один раз при загрузке и ищутся по kid;
+    - одновременно выполняется не больше одной загрузки, остальные запросы ждут её;
+    - за refresh_ahead секунд до истечения TTL ключи обновляются в фоне;
+    - неизвестный kid вызывает перезагрузку не чаще min_refetch_interval;
+    - если Keycloak недоступен, продолжаем отдавать последний удачный набор ключей.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ttl: float = JWKS_CACHE_TTL,
+        refresh_ahead: float = JWKS_REFRESH_AHEAD,
+        min_refetch_interval: float = JWKS_MIN_REFETCH_INTERVAL,
+        timeout: float = JWKS_HTTP_TIMEOUT,
+    ):
+        self.url = url
+        self.ttl = ttl
+        self.refresh_ahead = min(refresh_ahead, ttl)
+        self.min_refetch_interval = min_refetch_interval
+        self.timeout = timeout
+
+        self._keys: Dict[str, Key] = {}
+        self._fetched_at = 0.0
+        self._attempted_at = float("-inf")
+        self._inflight: Optional[asyncio.Future] = None
+
+        self.stats = {"fetches": 0, "fetch_errors": 0, "unknown_kid_refetches": 0}
+
+    async def get_key(self, kid: Optional[str]) -> Key:
+        """Возвращает ключ по kid, при необходимости загружая JWKS"""
+        if not self._keys:
+            # Ключей ещё нет — ждать придётся в любом случае
+            await self.refresh()
+        elif self._needs_refresh():
+            self._refresh_in_background()
+
+        key = self._keys.get(kid)
+        if key is None and self._can_refetch():
+            # Keycloak мог ротировать ключи — перезагружаем, но с ограничением частоты
+            self.stats["unknown_kid_refetches"] += 1
+            try:
+                await self.refresh()
+            except JWKSUnavailableError:
+                pass
+            key = self._keys.get(kid)
 
-async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    try:
-        # Получаем публичные ключи
-        jwks = get_jwks()
-        
-        # Декодируем заголовок токена — чтобы узнать kid (key id)
-        header = jwt.get_unverified_header(credentials.credentials)
-        kid = header.get("kid")
-        
-        # Ищем ключ с таким kid
-        key = None
-        for jwk_item in jwks["keys"]:
-            if jwk_item["kid"] == kid:
-                key = jwk.construct(jwk_item)
-                break
-        
         if key is None:
             raise JWTError("Key not found")
-        
-        # В функции verify_token, при вызове jwt.decode:
-        payload = jwt.decode(
-            credentials.credentials,
-            key,
-            algorithms=[ALGORITHM],
-            audience="task-service",  # <-- ИЗМЕНИТЬ с "account" на "task-service"
-            issuer=f"{KEYCLOAK_SERVER_URL}/realms/{KEYCLOAK_REALM}"
+        return key
+
+    async def refresh(self) -> None:
+        """Загружает JWKS; параллельные вызовы ждут одну и ту же загрузку"""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._fetch())
+        try:
+            await asyncio.shield(self._inflight)
+        except Exception as e:
+            if not self._keys:
+                raise JWKSUnavailableError(str(e)) from e
+            logger.warning("JWKS refresh failed, serving cached keys: %s", e)
+
+    def _needs_refresh(self) -> bool:
+        now = time.monotonic()
+        age = now - self._fetched_at
+        return (
+            age >= self.ttl - self.refresh_ahead
+            and now - self._attempted_at >= self.min_refetch_interval
         )
-        
-        return payload
-        
-    except JWTError as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"Invalid token: {str(e)}",
-        )
\ No newline at end of file
+
+    def _can_refetch(self) -> bool:
+        return time.monotonic() - self._attempted_at >= self.min_refetch_interval
+
+    def _refresh_in_background(self) -> None:
+        if self._inflight is not None and not self._inflight.done():
+            return
+        self._inflight = asyncio.ensure_future(self._fetch())
+        # Ошибка фоновой загрузки уже залогирована — не даём asyncio ругаться на неё
+        self._inflight.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    async def _fetch(self) -> None:
+        self._attempted_at = time.monotonic()
+        self.stats["fetches"] += 1
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                response = await client.get(self.url)
+                response.raise_for_status()
+                jwks = response.json()
+
+            keys = {}
+            for item in jwks["keys"]:
+                # Keycloak публикует ещё и ключи шифрования (use=enc) — они нам не нужны
+                if item.get("use", "sig") != "sig" or "kid" not in item:
+                    continue
+                keys[item["kid"]] = jwk.construct(item, ALGORITHM)
+            if not keys:
+                raise ValueError("JWKS contains no signing keys")
+        except Exception as e:
+            self.stats["fetch_errors"] += 1
+            logger.warning("JWKS fetch from %s failed: %s", self.url, e)
+            raise
+
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+
+
+class TokenCache:
+    """
+    Ограниченный LRU-кэш уже проверенных токенов.
+
+    Ключ — SHA-256 от токена (сам токен в памяти не храним), значение — payload
+    и его exp. Запись живёт до exp токена; при переполнении вытесняются
+    давно не использованные записи. Токены без exp не кэшируются.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_MAX_SIZE, enabled: bool = TOKEN_CACHE_ENABLED):
+        self.max_size = max_size
+        self.enabled = enabled
+        self._entries: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """Возвращает payload, если токен уже проверялся и ещё не истёк"""
+        if not self.enabled:
+            return None
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        expires_at, payload = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            self.stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return dict(payload)
+
+    def put(self, token: str, payload: dict) -> None:
+        """Сохраняет payload проверенного токена до его exp"""
+        if not self.enabled or self.max_size <= 0:
+            return
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)) or exp <= time.time():
+            return
+
+        key = self._key(token)
+        self._entries[key] = (float(exp), dict(payload))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def _decode(token: str, key: Union[Key, dict]) -> dict:
+    return jwt.decode(
+        token,
+        key,
+        algorithms=[ALGORITHM],
+        audience=AUDIENCE,
+        issuer=ISSUER
+    )
+
+
+# Ключи, уже собранные в процессе-исполнителе (process pool): JWK (json) -> Key
+_worker_keys: Dict[str, Key] = {}
+
+
+def _decode_batch(items: List[Tuple[str, Union[Key, dict]]]) -> List[Tuple[bool, Union[dict, str]]]:
+    """
+    Проверяет пачку токенов в исполнителе.
+
+    Возвращает список (ok, payload | текст ошибки) — исключения jose не всегда
+    сериализуются, поэтому между процессами передаём только текст.
+    """
+    results = []
+    for token, key in items:
+        try:
+            if isinstance(key, dict):
+                cache_key = json.dumps(key, sort_keys=True)
+                if cache_key not in _worker_keys:
+                    _worker_keys[cache_key] = jwk.construct(key, ALGORITHM)
+                key = _worker_keys[cache_key]
+            results.append((True, _decode(token, key)))
+        except JWTError as e:
+            results.append((False, str(e)))
+    return results
+
+
+class TokenVerifier:
+    """
+    Проверка подписи JWT вне event loop.
+
+    mode=inline — проверка прямо в корутине (как раньше);
+    mode=thread/process — в пуле потоков/процессов. Новые токены, пришедшие
+    почти одновременно, собираются в пачку (до batch_size штук или batch_window
+    секунд) и уходят в исполнитель одной задачей. Одинаковые токены внутри
+    окна проверяются один раз.
+    """
+
+    MODES = ("inline", "thread", "process")
+
+    def __init__(
+        self,
+        mode: str = JWT_VERIFY_EXECUTOR,
+        workers: int = JWT_VERIFY_WORKERS,
+        batch_size: int = JWT_VERIFY_BATCH_SIZE,
+        batch_window: float = JWT_VERIFY_BATCH_WINDOW_MS / 1000,
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown JWT verify executor mode: {mode}")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window
+
+        self._executor: Optional[Executor] = None
+        self._pending: List[Tuple[str, Key, asyncio.Future]] = []
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+        self.stats = {"verified": 0, "batches": 0}
+
+    async def decode(self, token: str, key: Key) -> dict:
+        """Проверяет подпись и claims токена, возвращает payload"""
+        if self.mode == "inline":
+            self.stats["verified"] += 1
+            return _decode(token, key)
+
+        future = self._inflight.get(token)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._inflight[token] = future
+            self._pending.append((token, key, future))
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.batch_window, self._flush)
+
+        ok, result = await asyncio.shield(future)
+        if not ok:
+            raise JWTError(result)
+        return dict(result)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[Tuple[str, Key, asyncio.Future]]) -> None:
+        if self.mode == "process":
+            # Объекты ключей между процессами не передаются — отправляем JWK
+            jwk_dicts: Dict[int, dict] = {}
+            items = [
+                (token, jwk_dicts.setdefault(id(key), key.to_dict()))
+                for token, key, _ in batch
+            ]
+        else:
+            items = [(token, key) for token, key, _ in batch]
+
+        try:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(self._get_executor(), _decode_batch, items)
+        except Exception as e:
+            logger.exception("JWT verification batch failed")
+            results = [(False, f"Verification failed: {e}")] * len(batch)
+
+        self.stats["batches"] += 1
+        self.stats["verified"] += len(batch)
+        for (token, _, future), result in zip(batch, results):
+            self._inflight.pop(token, None)
+            if not future.done():
+                future.set_result(result)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="jwt-verify"
+                )
+        return self._executor
+
+    def shutdown(self) -> None:
+        """Останавливает пул исполнителей"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Кэшируем JWKS (публичные ключи) — чтобы не ходить в Keycloak на каждый запрос
+jwks_cache = JWKSCache(JWKS_URL)
+
+# Кэшируем результат проверки токена — бот и дашборд шлют один и тот же токен сотни раз
+token_cache = TokenCache()
+
+# Проверка подписи — inline или в пуле исполнителей (JWT_VERIFY_EXECUTOR)
+token_verifier = TokenVerifier()
+
+
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security), request: Request = None):
+    """
+    Проверяет Bearer-токен. Результат (payload или ошибка) запоминается в состоянии
+    запроса: повторная проверка того же токена в этом запросе (middleware, затем
+    обработчик) не проверяет подпись заново, даже без кэша токенов.
+    """
+    if request is None:
+        return await _verify_token(credentials)
+    checked = getattr(request.state, "token_check", None)
+    if checked is not None and checked[0] == credentials.credentials:
+        if isinstance(checked[1], HTTPException):
+            raise checked[1]
+        return checked[1]
+    try:
+        payload = await _verify_token(credentials)
+    except HTTPException as e:
+        request.state.token_check = (credentials.credentials, e)
+        raise
+    request.state.token_check = (credentials.credentials, payload)
+    return payload
+
+
+async def _verify_token(credentials: HTTPAuthorizationCredentials):
+    with span("verify_token") as current:
+        cached = token_cache.get(credentials.credentials)
+        if cached is not None:
+            if current is not None:
+                current.attributes["token_cache"] = "hit"
+            return cached
+
+        try:
+            # Декодируем заголовок токена — чтобы узнать kid (key id)
+            header = jwt.get_unverified_header(credentials.credentials)
+
+            # Ищем ключ с таким kid
+            with span("jwks.get_key"):
+                key = await jwks_cache.get_key(header.get("kid"))
+
+            with span("jwt.decode"):
+                payload = await token_verifier.decode(credentials.credentials, key)
+
+            token_cache.put(credentials.credentials, payload)
+            return payload
+
+        except JWKSUnavailableError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Identity provider is unavailable",
+            )
+        except JWTError as e:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail=f"Invalid token: {str(e)}",
+            )
@@ -0,0 +1,290 @@
+"""
+Нагрузочный бенчмарк API задач через ASGI (без сети и без Keycloak).
+
+Прогоняет смесь операций — create, get, list, status, assign, history, rating —
+через слоистое приложение (app/main.py) или legacy main.py. verify_token
+подменяется заглушкой. Для каждой операции считает пропускную способность
+и задержки p50/p95/p99, результат сохраняет в JSON. С --baseline сравнивает
+с прошлым прогоном и завершается с кодом 1, если что-то стало хуже порога.
+
+Запуск из корня репозитория:
+    python -m benchmarks.api_load --backend memory --requests 5000 --output bench.json
+    python -m benchmarks.api_load --backend mongo --mix get=5,list=3,create=1 --baseline bench.json
+    python -m benchmarks.api_load --target legacy --backend mongo
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+import auth
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT_DIR, "app")
+
+OPERATIONS = ("create", "get", "list", "status", "assign", "history", "rating", "stats")
+DEFAULT_MIX = "create=2,get=6,list=4,status=2,assign=1,history=1,rating=1"
+
+# Счастливый путь заявки: в какой статус ее переводит операция status
+NEXT_STATUS = {"new": "assigned", "assigned": "in_progress", "in_progress": "completed", "completed": "closed"}
+
+
+def load_app(target, backend):
+    """Импортирует нужное приложение и подменяет проверку токена"""
+    if target == "layered":
+        sys.path.insert(0, APP_DIR)
+        from core.config import settings
+
+        settings.storage_backend = backend
+        app = importlib.import_module("main").app
+    else:
+        if backend != "mongo":
+            raise SystemExit("legacy main.py works with MongoDB only (--backend mongo)")
+        app = importlib.import_module("main").app
+
+    app.dependency_overrides[auth.verify_token] = lambda: {"sub": "bench-user"}
+    return app
+
+
+class Requests:
+    """Запросы к слоистому API и к legacy main.py отличаются способом передачи параметров"""
+
+    def __init__(self, target):
+        self.legacy = target == "legacy"
+
+    def status(self, client, task_id, status):
+        if self.legacy:
+            return client.patch(f"/api/v1/tasks/{task_id}/status", params={"status": status})
+        return client.patch(f"/api/v1/tasks/{task_id}/status", json={"status": status})
+
+    def assign(self, client, task_id, assigned_to):
+        if self.legacy:
+            return client.patch(f"/api/v1/tasks/{task_id}/assign", params={"assigned_to": assigned_to})
+        return client.patch(f"/api/v1/tasks/{task_id}/assign", json={"assigned_to": assigned_to})
+
+    def rating(self, client, task_id, rating):
+        if self.legacy:
+            return client.post(f"/api/v1/tasks/{task_id}/rating", params={"rating": rating})
+        return client.post(f"/api/v1/tasks/{task_id}/rating", json={"rating": rating})
+
+
+class Scenario:
+    """Смесь операций и локальное знание о статусах созданных заявок"""
+
+    def __init__(self, mix, requests, seed):
+        self.operations = list(mix)
+        self.weights = [mix[op] for op in self.operations]
+        self.requests = requests
+        self.random = random.Random(seed)
+        self.statuses = {}
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def task_data(self):
+        return {
+            "title": f"Bench task {self.random.randint(1, 10**6)}",
+            "description": "Load test",
+            "category": self.random.choice(["electrical", "plumbing", "repair"]),
+            "location_id": f"room_{self.random.randint(100, 120)}",
+            "priority": self.random.choice(["low", "medium", "high", "critical"]),
+        }
+
+    def pick(self, statuses):
+        candidates = [task_id for task_id, status in self.statuses.items() if status in statuses]
+        return self.random.choice(candidates) if candidates else None
+
+    async def run_one(self, client):
+        op = self.random.choices(self.operations, self.weights)[0]
+        task_id = None
+        if op in ("get", "history"):
+            task_id = self.pick(NEXT_STATUS.keys() | {"closed"})
+        elif op == "status":
+            task_id = self.pick(NEXT_STATUS.keys())
+        elif op == "assign":
+            task_id = self.pick({"new", "assigned"})
+        elif op == "rating":
+            task_id = self.pick({"completed", "closed"})
+        if op not in ("list", "create", "stats") and task_id is None:
+            op = "create"
+
+        started = time.perf_counter()
+        if op == "create":
+            response = await client.post("/api/v1/tasks", json=self.task_data())
+        elif op == "get":
+            response = await client.get(f"/api/v1/tasks/{task_id}")
+        elif op == "list":
+            response = await client.get("/api/v1/tasks", params={"status": self.random.choice(["new", "assigned"])})
+        elif op == "status":
+            response = await self.requests.status(client, task_id, NEXT_STATUS[self.statuses[task_id]])
+        elif op == "assign":
+            response = await self.requests.assign(client, task_id, f"worker_{self.random.randint(1, 20)}")
+        elif op == "history":
+            response = await client.get(f"/api/v1/tasks/{task_id}/history")
+        elif op == "stats":
+            response = await client.get("/api/v1/tasks/stats")
+        else:
+            response = await self.requests.rating(client, task_id, self.random.randint(1, 5))
+        elapsed = time.perf_counter() - started
+
+        self.samples[op].append(elapsed)
+        if response.status_code >= 400:
+            self.errors[op] += 1
+            return
+        if op == "create":
+            self.statuses[response.json()["id"]] = "new"
+        elif op == "status":
+            self.statuses[task_id] = NEXT_STATUS[self.statuses[task_id]]
+        elif op == "assign":
+            self.statuses[task_id] = "assigned"
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+def summarize(samples, errors, elapsed):
+    report = {}
+    for op in list(samples) + ["total"]:
+        values = sorted(v for vs in samples.values() for v in vs) if op == "total" else sorted(samples[op])
+        report[op] = {
+            "requests": len(values),
+            "errors": sum(errors.values()) if op == "total" else errors.get(op, 0),
+            "throughput_rps": len(values) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            "mean_ms": sum(values) / len(values) * 1000 if values else 0.0,
+        }
+    return report
+
+
+def compare(current, baseline, threshold):
+    """Ищет операции, где p95 вырос или пропускная способность упала больше чем на threshold"""
+    regressions = []
+    for op, stats in current["results"].items():
+        old = baseline.get("results", {}).get(op)
+        if not old or not old["requests"]:
+            continue
+        if old["p95_ms"] and stats["p95_ms"] > old["p95_ms"] * (1 + threshold):
+            regressions.append(f"{op}: p95 {old['p95_ms']:.2f}ms -> {stats['p95_ms']:.2f}ms")
+        if old["throughput_rps"] and stats["throughput_rps"] < old["throughput_rps"] * (1 - threshold):
+            regressions.append(
+                f"{op}: throughput {old['throughput_rps']:.0f} -> {stats['throughput_rps']:.0f} rps"
+            )
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        op, _, weight = part.partition("=")
+        if op not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation: {op}")
+        mix[op] = float(weight or 1)
+    return mix
+
+
+async def run(args):
+    app = load_app(args.target, args.backend)
+    scenario = Scenario(args.mix, Requests(args.target), args.seed)
+    transport = httpx.ASGITransport(app=app)
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for _ in range(args.seed_tasks):
+                response = await client.post("/api/v1/tasks", json=scenario.task_data())
+                response.raise_for_status()
+                scenario.statuses[response.json()["id"]] = "new"
+
+            remaining = args.requests
+
+            async def worker():
+                nonlocal remaining
+                while remaining > 0:
+                    remaining -= 1
+                    await scenario.run_one(client)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "target": args.target,
+            "backend": args.backend,
+            "mix": args.mix,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed_tasks": args.seed_tasks,
+            "elapsed_seconds": elapsed,
+        },
+        "results": summarize(scenario.samples, scenario.errors, elapsed),
+    }
+
+
+def print_report(report):
+    print(f"{'operation':<10} {'requests':>8} {'errors':>7} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for op, stats in report["results"].items():
+        print(
+            f"{op:<10} {stats['requests']:>8} {stats['errors']:>7} {stats['throughput_rps']:>9.0f} "
+            f"{stats['p50_ms']:>7.2f}ms {stats['p95_ms']:>7.2f}ms {stats['p99_ms']:>7.2f}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["layered", "legacy"], default="layered")
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="memory")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"веса операций, по умолчанию {DEFAULT_MIX}")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seed-tasks", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="сохранить результат в JSON")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое ухудшение (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
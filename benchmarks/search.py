@@ -0,0 +1,196 @@
+"""
+Бенчмарк: задержка GET /api/v1/tasks/search на уровне поискового индекса.
+
+Генерирует N синтетических заявок (по умолчанию 1 000 000) из шаблонов
+«проблема + объект + место» с хвостом редких слов по Zipf, строит
+InvertedIndex и меряет p50/p99 запросов нескольких видов:
+  rare      — редкий терм (номер комнаты, фамилия) + частые слова;
+  common    — только частые слова (десятки тысяч совпадений);
+  filtered  — текст + фильтры status / category / location_id;
+  partial   — слова из разных проблем: ни одна заявка не содержит все термы,
+              поиск повторяется без самого частого терма.
+Бюджет — несколько миллисекунд на запрос (--budget-ms, проверяется по p99
+второго прохода; первый показан отдельно).
+
+С --mongo-url те же запросы идут через MongoTextSearchIndex (коллекция
+заполняется, если в ней меньше N задач).
+
+Запуск из корня репозитория:
+    python -m benchmarks.search
+    python -m benchmarks.search --tasks 200000 --queries 500
+    python -m benchmarks.search --mongo-url mongodb://localhost:27017/search_bench
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from domain.models import Task, TaskFilter  # noqa: E402
+from infrastructure.search import InvertedIndex, MongoTextSearchIndex  # noqa: E402
+
+PROBLEMS = [
+    ("electrical", ["не работает свет", "мигает лампа", "нет электричества", "искрит розетка", "выбивает автомат"]),
+    ("plumbing", ["протечка воды", "засор раковины", "течет кран", "нет горячей воды", "капает с потолка"]),
+    ("repair", ["сломана дверь", "не закрывается окно", "треснуло стекло", "сломан замок", "отклеились обои"]),
+    ("hvac", ["не работает кондиционер", "холодные батареи", "шумит вентиляция", "душно в помещении"]),
+]
+PLACES = ["комнате", "кабинете", "коридоре", "аудитории", "лаборатории", "туалете", "столовой", "холле"]
+DETAILS = [
+    "срочно", "уже второй день", "после ремонта", "с утра", "жалуются сотрудники", "нужна замена",
+    "нужна проверка проводки", "просьба прислать мастера", "повторная заявка", "на втором этаже",
+]
+SURNAMES = [f"фамилия{i}" for i in range(5000)]
+STATUSES = ["new", "assigned", "in_progress", "completed", "closed"]
+PRIORITIES = ["low", "medium", "high", "critical"]
+
+
+def generate(count: int, seed: int = 7) -> Iterator[Task]:
+    rng = random.Random(seed)
+    now = datetime(2024, 9, 1, 12, 0)
+    for i in range(count):
+        category, problems = rng.choice(PROBLEMS)
+        problem = rng.choice(problems)
+        place = rng.choice(PLACES)
+        room = rng.randint(1, 2000)
+        # Хвост по Zipf: несколько популярных фамилий и много редких
+        surname = SURNAMES[min(int(rng.paretovariate(1.1)) - 1, len(SURNAMES) - 1)]
+        description = (
+            f"{problem.capitalize()} в {place} {room}, {rng.choice(DETAILS)}. "
+            f"Обращается {surname}, {rng.choice(DETAILS)}."
+        )
+        yield Task.model_construct(
+            id=f"T-20240901-{i:08X}",
+            title=f"{problem.capitalize()} в {place} {room}",
+            description=description,
+            category=category,
+            location_id=f"room_{room}",
+            priority=rng.choice(PRIORITIES),
+            status=rng.choice(STATUSES),
+            created_by=f"user_{i % 1000}",
+            assigned_to=f"worker_{i % 50}",
+            created_at=now - timedelta(minutes=i),
+            due_date=now + timedelta(hours=4),
+        )
+
+
+def make_queries(count: int, seed: int = 11) -> List[Tuple[str, str, TaskFilter]]:
+    rng = random.Random(seed)
+    queries = []
+    for i in range(count):
+        category, problems = rng.choice(PROBLEMS)
+        problem = rng.choice(problems)
+        room = rng.randint(1, 2000)
+        kind = ("rare", "common", "filtered", "partial")[i % 4]
+        if kind == "rare":
+            text = f"{problem} {rng.choice(PLACES)} {room}"
+            filters = TaskFilter()
+        elif kind == "common":
+            text = problem
+            filters = TaskFilter()
+        elif kind == "filtered":
+            text = problem
+            filters = TaskFilter(status="new", category=category, location_id=f"room_{room}")
+        else:
+            _, other_problems = rng.choice([entry for entry in PROBLEMS if entry[0] != category])
+            text = f"{problem} {rng.choice(other_problems)}"
+            filters = TaskFilter(status="new")
+        queries.append((kind, text, filters))
+    return queries
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run_queries(index, queries, limit: int) -> dict:
+    timings = {}
+    for kind, text, filters in queries:
+        started = time.perf_counter()
+        await index.search(text, filters, limit)
+        timings.setdefault(kind, []).append((time.perf_counter() - started) * 1000)
+    return {
+        kind: {
+            "p50_ms": statistics.median(values),
+            "p99_ms": percentile(values, 0.99),
+            "max_ms": max(values),
+        }
+        for kind, values in timings.items()
+    }
+
+
+async def build_mongo(url: str, count: int) -> MongoTextSearchIndex:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from infrastructure.indexes import INDEXES
+
+    collection = AsyncIOMotorClient(url).get_default_database()["tasks"]
+    if await collection.estimated_document_count() < count:
+        await collection.delete_many({})
+        batch = []
+        for task in generate(count):
+            batch.append(task.model_dump())
+            if len(batch) == 10000:
+                await collection.insert_many(batch, ordered=False)
+                batch = []
+        if batch:
+            await collection.insert_many(batch, ordered=False)
+    await collection.create_indexes(INDEXES["tasks"])
+    return MongoTextSearchIndex(collection)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=51, help="limit + 1, как запрашивает TaskService")
+    parser.add_argument("--budget-ms", type=float, default=5.0)
+    parser.add_argument("--mongo-url", help="мерить MongoTextSearchIndex вместо индекса в памяти")
+    parser.add_argument("--output", help="сохранить результат в JSON")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.mongo_url:
+        index = asyncio.run(build_mongo(args.mongo_url, args.tasks))
+        backend = "mongo"
+    else:
+        index = InvertedIndex()
+        index.add_many(generate(args.tasks))
+        index.optimize()
+        gc.freeze()  # как в AppContainer: индекс не участвует в полных сборках мусора
+        backend = "index"
+    build_seconds = time.perf_counter() - started
+    print(f"{backend}: {args.tasks} задач, построение {build_seconds:.1f} с")
+
+    # cold — первый проход по запросам, warm — повторный
+    queries = make_queries(args.queries)
+    report = {
+        "cold": asyncio.run(run_queries(index, queries, args.limit)),
+        "warm": asyncio.run(run_queries(index, queries, args.limit)),
+    }
+
+    print(f"{'pass':>5} {'query':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for phase, rows in report.items():
+        for kind, row in rows.items():
+            print(f"{phase:>5} {kind:>9} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['max_ms']:>8.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"backend": backend, "tasks": args.tasks, "build_seconds": build_seconds, "queries": report}, f, indent=2)
+
+    worst = max(row["p99_ms"] for row in report["warm"].values())
+    if worst > args.budget_ms:
+        raise SystemExit(f"p99 {worst:.2f} ms exceeds budget {args.budget_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
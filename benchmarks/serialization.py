@@ -0,0 +1,160 @@
+"""
+Бенчмарк: стоимость отдачи списка задач в пересчете на одну задачу.
+
+Сравнивает пути от документов MongoDB до тела ответа:
+  validated — документ с _id -> Task(**doc), затем FastAPI валидирует список
+              еще раз по response_model=List[Task] и сериализует в JSONResponse;
+  fast      — документ без _id (projection) -> одна валидация списка
+              (load_tasks), ModelJSONResponse без повторной валидации;
+  raw       — документы без моделей сразу в ModelJSONResponse (orjson),
+              нижняя граница для путей, которым модели не нужны;
+  slim      — как fast, но с fields=id,title,status,due_date: проекция
+              MongoDB и частичная модель (partial_task_model).
+Для каждого пути отдельно меряются загрузка (документ -> модель) и ответ
+(модели -> байты). Тела ответов всех путей сверяются.
+
+Запуск из корня репозитория:
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --sizes 100 1000 10000 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from bson import ObjectId
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import APIRoute, serialize_response  # noqa: E402
+
+from domain.models import Task, parse_task_fields, partial_task_model  # noqa: E402
+from infrastructure.repositories import load_tasks, projection  # noqa: E402
+from presentation.responses import ModelJSONResponse  # noqa: E402
+
+# Поле ответа так же, как его строит FastAPI для response_model=List[Task]
+RESPONSE_FIELD = APIRoute("/tasks", lambda: None, response_model=List[Task]).response_field
+
+# Список в боте: только то, что он показывает
+SLIM_VIEW = partial_task_model(parse_task_fields("id,title,status,due_date"))
+
+
+def make_documents(count: int, with_id: bool) -> List[dict]:
+    now = datetime(2024, 9, 1, 12, 0, 0, 123456)
+    documents = []
+    for i in range(count):
+        document = {
+            "id": f"T-20240901-{i:08X}",
+            "title": f"Заявка {i}",
+            "description": "В комнате не работает свет, нужна замена ламп и проверка проводки",
+            "category": ("electrical", "plumbing", "repair")[i % 3],
+            "location_id": f"room_{i % 500}",
+            "priority": ("low", "medium", "high", "critical")[i % 4],
+            "status": ("new", "assigned", "in_progress", "completed")[i % 4],
+            "created_by": f"user_{i % 100}",
+            "assigned_to": f"worker_{i % 20}" if i % 4 else None,
+            "created_at": now - timedelta(minutes=i),
+            "due_date": now + timedelta(hours=4),
+            "attachments": [],
+            "rating": None,
+            "rating_comment": None,
+            "sla_level": 0,
+        }
+        if with_id:
+            document["_id"] = ObjectId()
+        documents.append(document)
+    return documents
+
+
+def load_validated(documents):
+    return [Task(**dict(document)) for document in documents]
+
+
+def load_fast(documents):
+    return load_tasks(documents)
+
+
+def load_raw(documents):
+    return documents
+
+
+def load_slim(documents):
+    return load_tasks(documents, SLIM_VIEW)
+
+
+def render_validated(tasks) -> bytes:
+    content = asyncio.run(serialize_response(field=RESPONSE_FIELD, response_content=tasks, is_coroutine=True))
+    return JSONResponse(content).body
+
+
+def render_fast(tasks) -> bytes:
+    return ModelJSONResponse(tasks).body
+
+
+def best_of(repeat: int, fn, *args) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def measure(size: int, repeat: int) -> dict:
+    with_id = make_documents(size, with_id=True)
+    projected = make_documents(size, with_id=False)
+    # То, что вернет MongoDB по projection(SLIM_VIEW)
+    slim = [{name: document[name] for name in projection(SLIM_VIEW) if name in document} for document in projected]
+
+    expected = json.loads(render_validated(load_validated(with_id)))
+    if json.loads(render_fast(load_fast(projected))) != expected or json.loads(render_fast(projected)) != expected:
+        raise SystemExit(f"response bodies differ for {size} tasks")
+
+    result = {}
+    for name, load, render, documents in (
+        ("validated", load_validated, render_validated, with_id),
+        ("fast", load_fast, render_fast, projected),
+        ("raw", load_raw, render_fast, projected),
+        ("slim", load_slim, render_fast, slim),
+    ):
+        tasks = load(documents)
+        load_seconds = best_of(repeat, load, documents)
+        render_seconds = best_of(repeat, render, tasks)
+        result[name] = {
+            "load_us": load_seconds / size * 1e6,
+            "render_us": render_seconds / size * 1e6,
+            "total_us": (load_seconds + render_seconds) / size * 1e6,
+            "bytes": len(render(tasks)) / size,
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="сохранить результат в JSON")
+    args = parser.parse_args()
+
+    report = {}
+    print(f"{'tasks':>7} {'path':>10} {'load µs':>9} {'render µs':>10} {'total µs':>9} {'bytes':>6}  (на задачу, лучший из {args.repeat})")
+    for size in args.sizes:
+        result = measure(size, args.repeat)
+        report[str(size)] = result
+        for name, row in result.items():
+            print(f"{size:>7} {name:>10} {row['load_us']:>9.2f} {row['render_us']:>10.2f} {row['total_us']:>9.2f} {row['bytes']:>6.0f}")
+        speedup = result["validated"]["total_us"] / result["fast"]["total_us"]
+        print(f"{size:>7} {'fast/valid':>10} {speedup:>30.1f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
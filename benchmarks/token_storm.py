@@ -0,0 +1,203 @@
+"""
+Бенчмарк: задержка «посторонних» эндпоинтов во время шторма новых токенов.
+
+Поднимает минимальное приложение с двумя эндпоинтами — /ping (без авторизации)
+и /protected (verify_token) — и локальную заглушку JWKS. Для каждого режима
+JWT_VERIFY_EXECUTOR измеряет p50/p99 /ping сначала в тишине, затем пока
+параллельно идут запросы с тысячами ещё не виденных токенов.
+
+Запуск из корня репозитория:
+    python -m benchmarks.token_storm --tokens 3000 --concurrency 200
+    python -m benchmarks.token_storm --tokens 3000 --rate 600
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import Depends, FastAPI
+from jose import jwk, jwt
+
+import auth
+
+
+def start_jwks_server(public_jwk):
+    body = json.dumps({"keys": [public_jwk]}).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/certs"
+
+
+def make_keys():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    public_jwk = jwk.construct(public_pem, auth.ALGORITHM).to_dict()
+    public_jwk.update({"kid": "bench", "use": "sig"})
+    return private_pem, public_jwk
+
+
+def make_tokens(private_pem, count):
+    exp = int(time.time()) + 3600
+    return [
+        jwt.encode(
+            {"sub": str(uuid.uuid4()), "aud": auth.AUDIENCE, "iss": auth.ISSUER, "exp": exp},
+            private_pem,
+            algorithm=auth.ALGORITHM,
+            headers={"kid": "bench"},
+        )
+        for _ in range(count)
+    ]
+
+
+def build_app():
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/protected")
+    async def protected(payload: dict = Depends(auth.verify_token)):
+        return {"sub": payload["sub"]}
+
+    return app
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def measure_ping(client, stop, interval):
+    """
+    Шлёт /ping по расписанию, не дожидаясь предыдущего ответа, и считает задержку
+    от запланированного момента — так остановка event loop не прячется
+    (coordinated omission).
+    """
+    samples = []
+
+    async def ping(scheduled):
+        await client.get("/ping")
+        samples.append((time.perf_counter() - scheduled) * 1000)
+
+    pending = []
+    next_at = time.perf_counter()
+    while not stop.is_set():
+        pending.append(asyncio.ensure_future(ping(next_at)))
+        next_at += interval
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+    await asyncio.gather(*pending)
+    return samples
+
+
+async def storm(client, tokens, concurrency, rate=0.0):
+    """Запросы с новыми токенами: все сразу (rate=0) или с заданной частотой в секунду"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(token):
+        async with semaphore:
+            response = await client.get("/protected", headers={"Authorization": f"Bearer {token}"})
+            response.raise_for_status()
+
+    calls = []
+    started = time.perf_counter()
+    for i, token in enumerate(tokens):
+        calls.append(asyncio.ensure_future(call(token)))
+        if rate:
+            await asyncio.sleep(max(0.0, started + (i + 1) / rate - time.perf_counter()))
+    await asyncio.gather(*calls)
+
+
+async def run_mode(mode, jwks_url, tokens, args):
+    auth.jwks_cache = auth.JWKSCache(jwks_url)
+    auth.token_cache = auth.TokenCache()
+    auth.token_verifier = auth.TokenVerifier(mode=mode, workers=args.workers)
+
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Прогрев: JWKS и пул исполнителей
+        await storm(client, tokens[:10], 10)
+
+        stop = asyncio.Event()
+        pinger = asyncio.ensure_future(measure_ping(client, stop, args.ping_interval))
+        await asyncio.sleep(args.idle_seconds)
+        stop.set()
+        idle = await pinger
+
+        stop = asyncio.Event()
+        pinger = asyncio.ensure_future(measure_ping(client, stop, args.ping_interval))
+        started = time.perf_counter()
+        await storm(client, tokens[10:], args.concurrency, args.rate)
+        storm_seconds = time.perf_counter() - started
+        stop.set()
+        loaded = await pinger
+
+    auth.token_verifier.shutdown()
+    return {
+        "mode": mode,
+        "idle_p50_ms": statistics.median(idle),
+        "idle_p99_ms": percentile(idle, 0.99),
+        "storm_p50_ms": statistics.median(loaded),
+        "storm_p99_ms": percentile(loaded, 0.99),
+        "storm_samples": len(loaded),
+        "tokens_per_second": (len(tokens) - 10) / storm_seconds,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=0.0, help="новых токенов в секунду (0 — все сразу)")
+    parser.add_argument("--workers", type=int, default=auth.JWT_VERIFY_WORKERS)
+    parser.add_argument("--modes", default="inline,thread,process")
+    parser.add_argument("--idle-seconds", type=float, default=1.0)
+    parser.add_argument("--ping-interval", type=float, default=0.01)
+    args = parser.parse_args()
+
+    private_pem, public_jwk = make_keys()
+    server, jwks_url = start_jwks_server(public_jwk)
+    tokens = make_tokens(private_pem, args.tokens + 10)
+
+    try:
+        print(f"{'mode':<8} {'idle p50':>9} {'idle p99':>9} {'storm p50':>10} {'storm p99':>10} {'tokens/s':>9} {'samples':>8}")
+        for mode in args.modes.split(","):
+            result = await run_mode(mode, jwks_url, tokens, args)
+            print(
+                f"{result['mode']:<8} {result['idle_p50_ms']:>8.2f}ms {result['idle_p99_ms']:>8.2f}ms "
+                f"{result['storm_p50_ms']:>9.2f}ms {result['storm_p99_ms']:>9.2f}ms "
+                f"{result['tokens_per_second']:>9.0f} {result['storm_samples']:>8}"
+            )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
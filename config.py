@@ -6,4 +6,35 @@ load_dotenv()
 
 KEYCLOAK_SERVER_URL = os.getenv("KEYCLOAK_SERVER_URL", "http://localhost:8080")
 KEYCLOAK_REALM = os.getenv("KEYCLOAK_REALM", "smart-helpdesk")
-KEYCLOAK_CLIENT_SECRET = os.getenv("KEYCLOAK_CLIENT_SECRET")
\ No newline at end of file
+KEYCLOAK_CLIENT_SECRET = os.getenv("KEYCLOAK_CLIENT_SECRET")
+
+# Кэш JWKS (секунды)
+JWKS_CACHE_TTL = int(os.getenv("JWKS_CACHE_TTL", "3600"))
+JWKS_REFRESH_AHEAD = int(os.getenv("JWKS_REFRESH_AHEAD", "300"))  # обновляем заранее, до истечения TTL
+JWKS_MIN_REFETCH_INTERVAL = int(os.getenv("JWKS_MIN_REFETCH_INTERVAL", "30"))  # не чаще, чем раз в N секунд
+JWKS_HTTP_TIMEOUT = float(os.getenv("JWKS_HTTP_TIMEOUT", "5"))
+
+# Кэш проверенных токенов (claims), чтобы не проверять RSA-подпись на каждый запрос
+TOKEN_CACHE_ENABLED = os.getenv("TOKEN_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+
+# Где проверять подпись JWT: inline (в event loop), thread или process (пул исполнителей)
+JWT_VERIFY_EXECUTOR = os.getenv("JWT_VERIFY_EXECUTOR", "inline")
+JWT_VERIFY_WORKERS = int(os.getenv("JWT_VERIFY_WORKERS", str(os.cpu_count() or 2)))
+JWT_VERIFY_BATCH_SIZE = int(os.getenv("JWT_VERIFY_BATCH_SIZE", "32"))
+JWT_VERIFY_BATCH_WINDOW_MS = float(os.getenv("JWT_VERIFY_BATCH_WINDOW_MS", "2"))
+
+# Пул соединений MongoDB (те же переменные, что у Settings слоистого приложения)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "10"))  # прогреваются при старте
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zlib")  # "" — без сжатия
+MONGO_ZLIB_COMPRESSION_LEVEL = int(os.getenv("MONGO_ZLIB_COMPRESSION_LEVEL", "1"))
+
+# Трассировка запросов: off | memory (последние TRACING_MEMORY_SIZE трасс) | stdout (JSON-строка на запрос)
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "off")
+TRACING_MEMORY_SIZE = int(os.getenv("TRACING_MEMORY_SIZE", "1000"))
@@ -1,20 +1,40 @@
+import asyncio
+import base64
+import binascii
+import json
 import os
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from typing import List, Optional
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Response
+from fastapi.responses import JSONResponse
 from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic import BaseModel
+from pymongo import ASCENDING, DESCENDING
 
 # Импорт модуля авторизации
 from auth import verify_token
+from config import (
+    MONGO_COMPRESSORS, MONGO_CONNECT_TIMEOUT_MS, MONGO_MAX_IDLE_TIME_MS, MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE, MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS, MONGO_ZLIB_COMPRESSION_LEVEL
+)
 
-app = FastAPI(title="Task Service", version="0.1.0")
-
-# Подключение к MongoDB
+# Подключение к MongoDB: один клиент на процесс, пул и сжатие из config
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/helpdesk")
-client = AsyncIOMotorClient(MONGO_URL)
+client = AsyncIOMotorClient(
+    MONGO_URL,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+    **({"compressors": MONGO_COMPRESSORS, "zlibCompressionLevel": MONGO_ZLIB_COMPRESSION_LEVEL} if MONGO_COMPRESSORS else {})
+)
 database = client.get_database()
 tasks_collection = database["tasks"]
 history_collection = database["task_history"]  # Коллекция для истории изменений
@@ -46,6 +66,76 @@ VALID_TRANSITIONS = {
     "rejected": []
 }
 
+# Пагинация списка заявок
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+SORT_PATTERN = r"^-?(created_at|due_date)$"
+
+# Индексы под фильтры списка: (фильтр, ключ сортировки, id)
+LIST_INDEX_FIELDS = [None, "status", "category", "priority", "location_id", "assigned_to", "created_by"]
+
+
+async def create_indexes():
+    for field in LIST_INDEX_FIELDS:
+        keys = [(field, ASCENDING)] if field else []
+        await tasks_collection.create_index(keys + [("created_at", DESCENDING), ("id", DESCENDING)])
+    await tasks_collection.create_index([("due_date", DESCENDING), ("id", DESCENDING)])
+
+
+async def warm_up_pool():
+    """Открываем MONGO_MIN_POOL_SIZE соединений до первого запроса"""
+    await asyncio.gather(*(database.command("ping") for _ in range(MONGO_MIN_POOL_SIZE)))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global ready
+    await create_indexes()
+    await warm_up_pool()
+    ready = True
+    yield
+    ready = False
+    client.close()
+
+
+ready = False
+app = FastAPI(title="Task Service", version="0.1.0", lifespan=lifespan)
+
+
+@app.get("/health", include_in_schema=False)
+async def health():
+    """Liveness: процесс жив"""
+    return {"status": "ok"}
+
+
+@app.get("/ready", include_in_schema=False)
+async def readiness():
+    """Readiness: индексы созданы, пул прогрет, MongoDB отвечает"""
+    try:
+        if ready:
+            await database.command("ping")
+            return {"status": "ready"}
+    except Exception:
+        pass
+    return JSONResponse({"status": "starting"}, status_code=503)
+
+
+def encode_cursor(task: Task, sort: str) -> str:
+    value = getattr(task, sort.lstrip("-"))
+    raw = json.dumps({"s": sort, "v": value.isoformat() if value else None, "id": task.id})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str):
+    try:
+        data = json.loads(base64.urlsafe_b64decode((cursor + "=" * (-len(cursor) % 4)).encode()))
+        if data["s"] != sort:
+            raise ValueError("Cursor was issued for a different sort order")
+        return datetime.fromisoformat(data["v"]), str(data["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @app.post("/api/v1/tasks", response_model=Task)
 async def create_task(
     task: TaskCreate,
@@ -98,16 +188,50 @@ async def get_task(
 
 @app.get("/api/v1/tasks", response_model=List[Task])
 async def list_tasks(
+    response: Response,
     status: Optional[str] = None,
+    category: Optional[str] = None,
+    priority: Optional[str] = None,
+    location_id: Optional[str] = None,
+    assigned_to: Optional[str] = None,
+    created_by: Optional[str] = None,
+    due_from: Optional[datetime] = None,
+    due_to: Optional[datetime] = None,
+    sort: str = Query("-created_at", pattern=SORT_PATTERN),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     payload: dict = Depends(verify_token)  # Защищаем эндпоинт
 ):
-    """Список заявок с фильтрацией по статусу"""
+    """Список заявок с фильтрами и keyset-пагинацией (курсор — в заголовке X-Next-Cursor)"""
     query = {}
-    if status:
-        query["status"] = status
-    cursor = tasks_collection.find(query)
-    tasks = await cursor.to_list(length=100)
-    return [Task(**task) for task in tasks]
+    for field, value in [
+        ("status", status), ("category", category), ("priority", priority),
+        ("location_id", location_id), ("assigned_to", assigned_to), ("created_by", created_by)
+    ]:
+        if value:
+            query[field] = value
+    due_range = {}
+    if due_from:
+        due_range["$gte"] = due_from
+    if due_to:
+        due_range["$lt"] = due_to
+    if due_range:
+        query["due_date"] = due_range
+
+    field = sort.lstrip("-")
+    direction = DESCENDING if sort.startswith("-") else ASCENDING
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        op = "$lt" if direction == DESCENDING else "$gt"
+        keyset = {"$or": [{field: {op: value}}, {field: value, "id": {op: last_id}}]}
+        query = {"$and": [query, keyset]} if query else keyset
+
+    cursor = tasks_collection.find(query).sort([(field, direction), ("id", direction)]).limit(limit + 1)
+    tasks = [Task(**task) for task in await cursor.to_list(length=limit + 1)]
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(tasks[-1], sort)
+    return tasks
 
 @app.patch("/api/v1/tasks/{task_id}/status", response_model=Task)
 async def update_task_status(
@@ -0,0 +1,65 @@
+import os
+import sys
+
+# Слоистое приложение (app/) импортирует модули как core.*, domain.* и т.д.
+# Добавляем app/ в конец sys.path, чтобы корневой main.py оставался первым.
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+if APP_DIR not in sys.path:
+    sys.path.append(APP_DIR)
+
+# Импорты приложения — только после настройки sys.path
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from auth import verify_token
+from core.config import settings
+from infrastructure import memory
+from infrastructure.cache import task_cache
+from presentation.container import AppContainer
+from presentation.routers import router
+
+
+@pytest.fixture
+def task_payload():
+    """Тело POST /api/v1/tasks"""
+    return {
+        "title": "Нет света", "description": "В комнате 101 не работает свет",
+        "category": "electrical", "location_id": "room_101", "priority": "high",
+    }
+
+
+@pytest.fixture
+def memory_app(monkeypatch):
+    """Приложение на чистом in-memory хранилище: все синглтоны memory пересоздаются"""
+    monkeypatch.setattr(settings, "storage_backend", "memory")
+    task_repository = memory.InMemoryTaskRepository()
+    history_repository = memory.InMemoryTaskHistoryRepository()
+    monkeypatch.setattr(memory, "task_repository", task_repository)
+    monkeypatch.setattr(memory, "history_repository", history_repository)
+    monkeypatch.setattr(
+        memory, "stats_repository", memory.InMemoryTaskStatsRepository(task_repository, history_repository)
+    )
+    monkeypatch.setattr(memory, "notification_outbox", memory.InMemoryNotificationOutboxRepository())
+    monkeypatch.setattr(memory, "idempotency_repository", memory.InMemoryIdempotencyRepository())
+    task_cache.local.clear()
+
+    @asynccontextmanager
+    async def lifespan(app):
+        app.state.container = AppContainer()
+        await app.state.container.start()
+        yield
+        await app.state.container.close()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(router)
+    app.dependency_overrides[verify_token] = lambda: {"sub": "user_123"}
+    return app
+
+
+@pytest.fixture
+def memory_app_client(memory_app):
+    with TestClient(memory_app) as client:
+        yield client
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from core.admission import AdaptiveConcurrencyLimit
+from infrastructure.breaker import CooldownBreaker
+from infrastructure.rate_limit import LocalTokenBuckets, RateLimiter, RedisTokenBuckets
+from presentation.middleware import AdmissionMiddleware
+
+
+class BrokenBuckets:
+    async def take(self, key):
+        raise ConnectionError("redis is down")
+
+
+def test_token_bucket_allows_burst_then_refills():
+    buckets = LocalTokenBuckets(rate=2, burst=3)
+
+    assert [buckets.take("user_1", now=0) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("user_1", now=0) == pytest.approx(0.5)
+    assert buckets.take("user_2", now=0) == 0
+    assert buckets.take("user_1", now=0.5) == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_falls_back_to_local_buckets():
+    limiter = RateLimiter(LocalTokenBuckets(rate=1, burst=1), BrokenBuckets())
+
+    assert await limiter.take("user_1") == 0
+    assert await limiter.take("user_1") > 0
+    assert limiter.stats == {"allowed": 1, "limited": 1, "shared_errors": 1, "shared_skipped": 1}
+
+
+@pytest.mark.asyncio
+async def test_broken_redis_is_skipped_during_cooldown(caplog):
+    now = [0.0]
+    breaker = CooldownBreaker("Shared rate limit", cooldown=5, clock=lambda: now[0])
+    limiter = RateLimiter(LocalTokenBuckets(rate=100, burst=100), BrokenBuckets(), breaker)
+
+    for _ in range(3):
+        await limiter.take("user_1")
+    now[0] = 5
+    for _ in range(3):
+        await limiter.take("user_1")
+
+    assert limiter.stats["shared_errors"] == 2 and limiter.stats["shared_skipped"] == 4
+    assert len([r for r in caplog.records if "Shared rate limit failed" in r.message]) == 2
+
+    redis_buckets = RedisTokenBuckets("redis://localhost:6379", rate=1, burst=1)
+    assert redis_buckets.client.connection_pool.connection_kwargs["socket_timeout"] == 0.1
+    await redis_buckets.close()
+
+
+def test_concurrency_limit_follows_mongo_latency():
+    limit = AdaptiveConcurrencyLimit(initial=20, min_limit=5, max_limit=100)
+    limit.in_flight = 20
+    for _ in range(50):
+        limit.observe(0.002)
+    grown = limit.limit
+    assert grown > 20
+
+    # База замедлилась в 10 раз — предел падает до минимума, а не копит очередь
+    for _ in range(50):
+        limit.observe(0.02)
+    assert limit.limit < grown // 3
+
+    idle = AdaptiveConcurrencyLimit(initial=20)
+    for _ in range(50):
+        idle.observe(0.002)
+    assert idle.limit == 20
+
+
+def make_app(rate_limiter=None, concurrency_limit=None, user_id="user_1"):
+    app = FastAPI()
+
+    @app.get("/api/v1/slow")
+    async def slow():
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    async def identify(scope):
+        return user_id
+
+    app.add_middleware(
+        AdmissionMiddleware, identify=identify, rate_limiter=rate_limiter, concurrency_limit=concurrency_limit
+    )
+    return app
+
+
+@pytest.mark.asyncio
+async def test_middleware_limits_rate_per_user():
+    app = make_app(rate_limiter=RateLimiter(LocalTokenBuckets(rate=1, burst=2)))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        statuses = [(await client.get("/api/v1/slow")).status_code for _ in range(3)]
+        limited = await client.get("/api/v1/slow")
+        health = await client.get("/health")
+
+    assert statuses == [200, 200, 429]
+    assert limited.headers["Retry-After"] == "1" and health.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_requests_without_user_are_limited_by_client_address():
+    limiter = RateLimiter(LocalTokenBuckets(rate=1, burst=1))
+    app = make_app(rate_limiter=limiter, user_id=None)
+
+    async with AsyncClient(transport=ASGITransport(app=app, client=("10.0.0.1", 1234)), base_url="http://test") as client:
+        statuses = [(await client.get("/api/v1/slow")).status_code for _ in range(2)]
+
+    assert statuses == [200, 429] and "rate:addr:10.0.0.1" in limiter.local._buckets
+
+
+@pytest.mark.asyncio
+async def test_middleware_sheds_load_over_concurrency_limit():
+    limit = AdaptiveConcurrencyLimit(initial=2, min_limit=1, max_limit=2)
+    app = make_app(concurrency_limit=limit)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        responses = await asyncio.gather(*(client.get("/api/v1/slow") for _ in range(5)))
+        after = await client.get("/api/v1/slow")
+
+    assert sorted(response.status_code for response in responses) == [200, 200, 503, 503, 503]
+    assert responses[-1].headers["Retry-After"] == "1"
+    assert after.status_code == 200 and limit.in_flight == 0
@@ -0,0 +1,287 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwk, jwt, JWTError
+
+import auth
+
+
+def make_signing_key(kid):
+    """Генерирует RSA-ключ и возвращает (PEM приватного ключа, публичный JWK)"""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    public_jwk = jwk.construct(public_pem, auth.ALGORITHM).to_dict()
+    public_jwk.update({"kid": kid, "use": "sig"})
+    return private_pem, public_jwk
+
+
+def make_token(private_pem, kid, **claims):
+    payload = {
+        "sub": "user_123",
+        "aud": auth.AUDIENCE,
+        "iss": auth.ISSUER,
+        "exp": int(time.time()) + 300,
+    }
+    payload.update(claims)
+    return jwt.encode(payload, private_pem, algorithm=auth.ALGORITHM, headers={"kid": kid})
+
+
+class StubJWKSServer:
+    """Локальная заглушка Keycloak, отдающая JWKS"""
+
+    def __init__(self, keys, delay=0.0):
+        self.keys = keys
+        self.delay = delay
+        self.fail = False
+        self.hits = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.hits += 1
+                time.sleep(stub.delay)
+                if stub.fail:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                body = json.dumps({"keys": stub.keys}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/certs"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture(scope="module")
+def signing_key():
+    return make_signing_key("key-1")
+
+
+@pytest.fixture
+def jwks_server(signing_key):
+    server = StubJWKSServer([signing_key[1]])
+    yield server
+    server.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_single_fetch(jwks_server):
+    jwks_server.delay = 0.2
+    cache = auth.JWKSCache(jwks_server.url)
+
+    keys = await asyncio.gather(*(cache.get_key("key-1") for _ in range(50)))
+
+    assert jwks_server.hits == 1 and all(key is keys[0] for key in keys)
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_refetch_is_rate_limited(jwks_server):
+    cache = auth.JWKSCache(jwks_server.url, min_refetch_interval=60)
+    await cache.get_key("key-1")
+
+    for _ in range(5):
+        with pytest.raises(JWTError):
+            await cache.get_key("unknown")
+
+    assert jwks_server.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_picks_up_rotated_key(jwks_server):
+    cache = auth.JWKSCache(jwks_server.url, min_refetch_interval=0)
+    await cache.get_key("key-1")
+    _, rotated_jwk = make_signing_key("key-2")
+    jwks_server.keys = [rotated_jwk]
+
+    key = await cache.get_key("key-2")
+
+    assert key is not None and jwks_server.hits == 2
+
+
+@pytest.mark.asyncio
+async def test_refreshes_in_background_before_expiry(jwks_server):
+    cache = auth.JWKSCache(jwks_server.url, ttl=60, refresh_ahead=60, min_refetch_interval=0)
+    await cache.get_key("key-1")
+    jwks_server.delay = 0.2
+
+    started = time.monotonic()
+    await cache.get_key("key-1")
+    elapsed = time.monotonic() - started
+    await cache._inflight
+
+    assert elapsed < 0.1 and jwks_server.hits == 2
+
+
+@pytest.mark.asyncio
+async def test_serves_last_good_keys_when_keycloak_is_down(jwks_server):
+    cache = auth.JWKSCache(jwks_server.url, ttl=0, refresh_ahead=0, min_refetch_interval=0)
+    expected = await cache.get_key("key-1")
+    jwks_server.fail = True
+
+    await cache.refresh()
+    key = await cache.get_key("key-1")
+
+    assert key is expected and cache.stats["fetch_errors"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_verify_token_with_stub_jwks(jwks_server, signing_key, monkeypatch):
+    monkeypatch.setattr(auth, "jwks_cache", auth.JWKSCache(jwks_server.url))
+    monkeypatch.setattr(auth, "token_cache", auth.TokenCache())
+    token = make_token(signing_key[0], "key-1")
+
+    payload = await auth.verify_token(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+
+    assert payload["sub"] == "user_123"
+
+
+@pytest.mark.asyncio
+async def test_verify_token_returns_503_without_any_keys(jwks_server, signing_key, monkeypatch):
+    jwks_server.fail = True
+    monkeypatch.setattr(auth, "jwks_cache", auth.JWKSCache(jwks_server.url))
+    monkeypatch.setattr(auth, "token_cache", auth.TokenCache())
+    token = make_token(signing_key[0], "key-1")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await auth.verify_token(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+
+    assert exc_info.value.status_code == 503
+
+
+def test_token_cache_hits_until_exp():
+    cache = auth.TokenCache(max_size=10)
+    cache.put("token-a", {"sub": "user_123", "exp": time.time() + 60})
+    cache.put("token-b", {"sub": "user_456", "exp": time.time() - 1})
+
+    assert cache.get("token-a")["sub"] == "user_123"
+    assert cache.get("token-b") is None
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = auth.TokenCache(max_size=2)
+    exp = time.time() + 60
+    cache.put("token-a", {"exp": exp})
+    cache.put("token-b", {"exp": exp})
+    cache.get("token-a")
+
+    cache.put("token-c", {"exp": exp})
+
+    assert cache.get("token-b") is None and cache.get("token-a") is not None
+    assert len(cache) == 2 and cache.stats["evictions"] == 1
+
+
+def test_token_cache_drops_entry_at_exp(monkeypatch):
+    cache = auth.TokenCache()
+    now = time.time()
+    cache.put("token-a", {"exp": now + 10})
+
+    monkeypatch.setattr(auth.time, "time", lambda: now + 10)
+
+    assert cache.get("token-a") is None and len(cache) == 0
+
+
+def test_token_cache_can_be_disabled():
+    cache = auth.TokenCache(enabled=False)
+    cache.put("token-a", {"exp": time.time() + 60})
+
+    assert cache.get("token-a") is None and len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_verify_token_skips_signature_check_for_cached_token(jwks_server, signing_key, monkeypatch):
+    monkeypatch.setattr(auth, "jwks_cache", auth.JWKSCache(jwks_server.url))
+    monkeypatch.setattr(auth, "token_cache", auth.TokenCache())
+    credentials = HTTPAuthorizationCredentials(
+        scheme="Bearer", credentials=make_token(signing_key[0], "key-1")
+    )
+    await auth.verify_token(credentials)
+
+    def fail_decode(*args, **kwargs):
+        raise AssertionError("signature must not be verified again")
+
+    monkeypatch.setattr(auth.jwt, "decode", fail_decode)
+    payload = await auth.verify_token(credentials)
+
+    assert payload["sub"] == "user_123" and auth.token_cache.stats["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_middleware_check_is_reused_by_handler_without_token_cache(jwks_server, signing_key, monkeypatch):
+    from presentation.dependencies import request_user
+
+    monkeypatch.setattr(auth, "jwks_cache", auth.JWKSCache(jwks_server.url))
+    monkeypatch.setattr(auth, "token_cache", auth.TokenCache(enabled=False))
+    token = make_token(signing_key[0], "key-1")
+    scope = {"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]}
+    bad_scope = {"type": "http", "headers": [(b"authorization", b"Bearer not-a-jwt")]}
+
+    assert await request_user(scope) == "user_123"
+    assert await request_user(bad_scope) is None
+
+    def fail_decode(*args, **kwargs):
+        raise AssertionError("signature must not be verified again")
+
+    monkeypatch.setattr(auth.jwt, "decode", fail_decode)
+    monkeypatch.setattr(auth.jwt, "get_unverified_header", fail_decode)
+    payload = await auth.verify_token(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), Request(scope))
+    with pytest.raises(HTTPException) as exc_info:
+        await auth.verify_token(HTTPAuthorizationCredentials(scheme="Bearer", credentials="not-a-jwt"), Request(bad_scope))
+
+    assert payload["sub"] == "user_123" and exc_info.value.status_code == 401
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["thread", "process"])
+async def test_token_verifier_batches_new_tokens_in_executor(mode, signing_key):
+    verifier = auth.TokenVerifier(mode=mode, workers=2, batch_size=8, batch_window=0.01)
+    key = jwk.construct(signing_key[1], auth.ALGORITHM)
+    tokens = [make_token(signing_key[0], "key-1", sub=f"user_{i}") for i in range(20)]
+
+    try:
+        payloads = await asyncio.gather(*(verifier.decode(token, key) for token in tokens))
+    finally:
+        verifier.shutdown()
+
+    assert [p["sub"] for p in payloads] == [f"user_{i}" for i in range(20)]
+    assert verifier.stats["batches"] == 3
+
+
+@pytest.mark.asyncio
+async def test_token_verifier_reports_invalid_token(signing_key):
+    verifier = auth.TokenVerifier(mode="thread", workers=1)
+    key = jwk.construct(signing_key[1], auth.ALGORITHM)
+    expired = make_token(signing_key[0], "key-1", exp=int(time.time()) - 10)
+
+    try:
+        with pytest.raises(JWTError):
+            await verifier.decode(expired, key)
+    finally:
+        verifier.shutdown()
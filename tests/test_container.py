@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from fastapi import Depends
+from fastapi.testclient import TestClient
+
+from core.config import settings
+from core.database import client_options, warm_up_pool
+from presentation.container import AppContainer
+from presentation.dependencies import get_container, get_task_service
+
+
+class FakeDatabase:
+    """База-заглушка: считает одновременные ping"""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+
+    async def command(self, name):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return {"ok": 1}
+
+
+def test_service_is_built_once_per_application(memory_app):
+    services = []
+
+    def recording_service(container: AppContainer = Depends(get_container)):
+        services.append(get_task_service(container))
+        return services[-1]
+
+    memory_app.dependency_overrides[get_task_service] = recording_service
+
+    with TestClient(memory_app) as client:
+        container = memory_app.state.container
+        assert container.ready and container.task_service is not None
+        for _ in range(3):
+            assert client.get("/api/v1/tasks").status_code == 200
+
+    assert len(services) == 3 and all(service is services[0] for service in services)
+    assert not container.ready
+
+
+def test_requests_use_container_repositories(memory_app, memory_app_client, task_payload):
+    task_id = memory_app_client.post("/api/v1/tasks", json=task_payload).json()["id"]
+
+    assert memory_app.state.container.task_repo is memory_app.state.container.task_service.task_repo
+    assert memory_app_client.get(f"/api/v1/tasks/{task_id}").json()["created_by"] == "user_123"
+
+
+def test_client_options_come_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, "mongo_max_pool_size", 50)
+    monkeypatch.setattr(settings, "mongo_min_pool_size", 5)
+    monkeypatch.setattr(settings, "mongo_compressors", "zstd,zlib")
+
+    options = client_options()
+
+    assert options["maxPoolSize"] == 50 and options["minPoolSize"] == 5
+    assert options["compressors"] == "zstd,zlib"
+
+    monkeypatch.setattr(settings, "mongo_compressors", "")
+    assert "compressors" not in client_options()
+
+
+@pytest.mark.asyncio
+async def test_pool_warm_up_opens_connections_concurrently():
+    database = FakeDatabase()
+
+    await warm_up_pool(database, 8)
+
+    assert database.max_active == 8
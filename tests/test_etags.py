@@ -0,0 +1,50 @@
+
+
+from infrastructure.repositories import version_condition
+
+
+def create_task(client, payload):
+    return client.post("/api/v1/tasks", json=payload).json()["id"]
+
+
+def test_conditional_get_returns_304_until_task_changes(memory_app_client, task_payload):
+    task_id = create_task(memory_app_client, task_payload)
+
+    first = memory_app_client.get(f"/api/v1/tasks/{task_id}")
+    cached = memory_app_client.get(f"/api/v1/tasks/{task_id}", headers={"If-None-Match": first.headers["ETag"]})
+    assert first.headers["ETag"] == '"0"' and first.json()["version"] == 0
+    assert cached.status_code == 304 and cached.content == b"" and cached.headers["ETag"] == '"0"'
+
+    memory_app_client.patch(f"/api/v1/tasks/{task_id}/assign", json={"assigned_to": "worker_1"})
+    fresh = memory_app_client.get(f"/api/v1/tasks/{task_id}", params={"fields": "status"}, headers={"If-None-Match": 'W/"0"'})
+    assert fresh.status_code == 200 and fresh.headers["ETag"] == '"1"'
+    assert fresh.json() == {"id": task_id, "status": "assigned"}
+
+
+def test_stale_if_match_is_rejected_with_412(memory_app_client, task_payload):
+    task_id = create_task(memory_app_client, task_payload)
+
+    updated = memory_app_client.patch(f"/api/v1/tasks/{task_id}/status", json={"status": "assigned"}, headers={"If-Match": '"0"'})
+    assert updated.status_code == 200 and updated.headers["ETag"] == '"1"'
+
+    # Второй клиент читал задачу до первого изменения
+    stale = memory_app_client.patch(f"/api/v1/tasks/{task_id}/status", json={"status": "in_progress"}, headers={"If-Match": '"0"'})
+    weak = memory_app_client.patch(f"/api/v1/tasks/{task_id}/status", json={"status": "in_progress"}, headers={"If-Match": 'W/"1"'})
+    assert stale.status_code == weak.status_code == 412
+    assert memory_app_client.get(f"/api/v1/tasks/{task_id}").json()["status"] == "assigned"
+
+    # Версия совпала, но переход недопустим — прежний 400
+    invalid = memory_app_client.patch(f"/api/v1/tasks/{task_id}/status", json={"status": "closed"}, headers={"If-Match": '"1"'})
+    assert invalid.status_code == 400
+
+    for status in ("in_progress", "completed"):
+        memory_app_client.patch(f"/api/v1/tasks/{task_id}/status", json={"status": status})
+    rated = memory_app_client.post(f"/api/v1/tasks/{task_id}/rating", json={"rating": 5}, headers={"If-Match": '"3"'})
+    assert rated.status_code == 200 and rated.headers["ETag"] == '"4"'
+    assert memory_app_client.post(f"/api/v1/tasks/{task_id}/rating", json={"rating": 4}, headers={"If-Match": '"3"'}).status_code == 412
+
+
+def test_version_condition_matches_documents_without_version():
+    assert version_condition(None) == {}
+    assert version_condition(0) == {"version": {"$in": [0, None]}}
+    assert version_condition(7) == {"version": 7}
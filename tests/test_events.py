@@ -0,0 +1,155 @@
+import asyncio
+import json
+
+import pytest
+
+from domain.events import EventBus, SubscriberLimitError, event_stream
+from domain.models import TaskCreate
+from domain.services import TaskService
+from infrastructure.change_stream import ChangeStreamSource, classify_change
+from infrastructure.memory import InMemoryTaskHistoryRepository, InMemoryTaskRepository
+from presentation.responses import ClosingStreamingResponse
+
+
+def make_task_data(**overrides):
+    data = {
+        "title": "Нет света",
+        "description": "В комнате 101 не работает свет",
+        "category": "electrical",
+        "location_id": "room_101",
+        "priority": "high",
+    }
+    data.update(overrides)
+    return TaskCreate(**data)
+
+
+def drain(subscription):
+    frames = []
+    while not subscription.queue.empty():
+        frames.append(subscription.queue.get_nowait())
+    return frames
+
+
+def parse(frame):
+    lines = dict(line.split(": ", 1) for line in frame.decode().strip().split("\n"))
+    return lines["event"], json.loads(lines["data"])
+
+
+@pytest.fixture
+def bus():
+    return EventBus(buffer=8, max_subscribers=100, replay_size=10, heartbeat=0.01)
+
+
+@pytest.fixture
+def service(bus):
+    return TaskService(InMemoryTaskRepository(), InMemoryTaskHistoryRepository(), events=bus)
+
+
+@pytest.mark.asyncio
+async def test_service_events_reach_matching_subscribers_only(bus, service):
+    everything = bus.subscribe({})
+    plumbing = bus.subscribe({"category": "plumbing"})
+    assignments = bus.subscribe({}, types=["task_assigned"])
+
+    task = await service.create_task(make_task_data(), "user_123")
+    await service.assign_task(task.id, "worker_1", "dispatcher")
+    await service.update_task_status(task.id, "in_progress", "worker_1")
+
+    assert [parse(f)[0] for f in drain(everything)] == ["task_created", "task_assigned", "task_status_changed"]
+    assert drain(plumbing) == []
+    event_type, payload = parse(drain(assignments)[0])
+    assert event_type == "task_assigned" and payload["task"]["assigned_to"] == "worker_1"
+
+
+@pytest.mark.asyncio
+async def test_subscribers_with_same_filter_share_one_frame(bus, service):
+    first, second = bus.subscribe({"status": "new"}), bus.subscribe({"status": "new"})
+
+    await service.create_task(make_task_data(), "user_123")
+
+    assert drain(first)[0] is drain(second)[0]
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_cut_off_without_affecting_others(bus, service):
+    slow = bus.subscribe({})
+    fast = bus.subscribe({})
+
+    for _ in range(10):
+        await service.create_task(make_task_data(), "user_123")
+        drain(fast)
+
+    assert drain(slow) == [None]
+    assert bus.stats["overflows"] == 1
+
+
+@pytest.mark.asyncio
+async def test_reconnect_replays_missed_events(bus, service):
+    for _ in range(3):
+        await service.create_task(make_task_data(), "user_123")
+
+    resumed = bus.subscribe({}, last_event_id=1)
+
+    assert [parse(f)[1]["id"] for f in drain(resumed)] == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_frames_heartbeats_and_unsubscribes(bus, service):
+    bus.start()
+    subscription = bus.subscribe({})
+    stream = event_stream(bus, subscription)
+
+    assert (await stream.__anext__()).startswith(b"retry:")
+    await service.create_task(make_task_data(), "user_123")
+    assert parse(await stream.__anext__())[0] == "task_created"
+    assert await asyncio.wait_for(stream.__anext__(), 1) == b": ping\n\n"
+
+    await bus.close()
+    assert (await stream.__anext__()).startswith(b"event: overflow")
+    with pytest.raises(StopAsyncIteration):
+        await stream.__anext__()
+    assert bus.subscribers == 0
+
+
+@pytest.mark.asyncio
+async def test_subscription_is_released_when_response_fails_before_body(bus):
+    subscription = bus.subscribe({})
+    response = ClosingStreamingResponse(
+        event_stream(bus, subscription), on_close=lambda: bus.unsubscribe(subscription),
+        media_type="text/event-stream",
+    )
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("client went away")
+
+    with pytest.raises(Exception):  # OSError внутри ExceptionGroup (task group Starlette)
+        await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+    assert bus.subscribers == 0
+
+
+def test_subscriber_limit():
+    bus = EventBus(max_subscribers=1)
+    bus.subscribe({})
+
+    with pytest.raises(SubscriberLimitError):
+        bus.subscribe({})
+
+
+@pytest.mark.asyncio
+async def test_change_stream_documents_become_bus_events(bus, service):
+    task = await service.create_task(make_task_data(), "user_123")
+    subscription = bus.subscribe({}, types=["task_status_changed"])
+    source = ChangeStreamSource(collection=None, bus=bus)
+
+    source.handle({
+        "operationType": "update",
+        "updateDescription": {"updatedFields": {"status": "rejected"}},
+        "fullDocument": {"_id": "x", **task.model_dump(), "status": "rejected"},
+    })
+
+    assert parse(drain(subscription)[0])[1]["task"]["status"] == "rejected"
+    assert classify_change({"operationType": "delete"}) is None
+    assert classify_change({"operationType": "insert"}) == ("task_created", {})
@@ -0,0 +1,37 @@
+
+import pytest
+
+from domain.models import parse_task_fields, partial_task_model
+from infrastructure.repositories import projection
+
+
+def test_fields_map_to_partial_model_and_projection():
+    fields = parse_task_fields("title, status,due_date")
+    view = partial_task_model(fields, hidden=("created_at",))
+
+    assert fields == ("due_date", "id", "status", "title")
+    assert projection(view) == {"_id": False, "due_date": True, "id": True, "status": True, "title": True, "created_at": True}
+    assert partial_task_model(fields, hidden=("created_at",)) is view
+    with pytest.raises(ValueError):
+        parse_task_fields("title,password")
+
+
+def test_sparse_fieldsets_on_get_list_and_cursor(memory_app_client, task_payload):
+    ids = [
+        memory_app_client.post("/api/v1/tasks", json={**task_payload, "title": f"Нет света {i}"}).json()["id"]
+        for i in range(5)
+    ]
+
+    task = memory_app_client.get(f"/api/v1/tasks/{ids[0]}", params={"fields": "title,status"}).json()
+    assert task == {"id": ids[0], "status": "new", "title": "Нет света 0"}
+
+    # created_at нужен курсору, но в ответ не попадает
+    first = memory_app_client.get("/api/v1/tasks", params={"fields": "id,title,status,due_date", "limit": 3})
+    second = memory_app_client.get("/api/v1/tasks", params={
+        "fields": "id,title,status,due_date", "limit": 3, "cursor": first.headers["X-Next-Cursor"],
+    })
+    items = first.json() + second.json()
+    assert all(item.keys() == {"id", "title", "status", "due_date"} for item in items)
+    assert sorted(item["id"] for item in items) == sorted(ids)
+
+    assert memory_app_client.get("/api/v1/tasks", params={"fields": "title,secret"}).status_code == 400
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from infrastructure.history_writer import HistoryWriter
+
+
+class FakeCollection:
+    """Коллекция-заглушка: запоминает пачки insert_many"""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.batches = []
+        self.delay = delay
+        self.fail = fail
+
+    async def insert_many(self, documents, ordered=True):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("mongo is down")
+        self.batches.append(list(documents))
+
+
+def record(i):
+    return {"task_id": f"T-{i}", "action": "created"}
+
+
+@pytest.mark.asyncio
+async def test_async_mode_flushes_by_batch_size():
+    collection = FakeCollection()
+    writer = HistoryWriter(collection, batch_size=10, flush_interval=10, durability="async")
+    writer.start()
+
+    for i in range(25):
+        await writer.write(record(i))
+    await writer.close()
+
+    assert [len(batch) for batch in collection.batches] == [10, 10, 5]
+
+
+@pytest.mark.asyncio
+async def test_async_mode_flushes_by_interval():
+    collection = FakeCollection()
+    writer = HistoryWriter(collection, batch_size=100, flush_interval=0.05, durability="async")
+    writer.start()
+
+    await writer.write(record(1))
+    await asyncio.sleep(0.1)
+
+    assert collection.batches == [[record(1)]]
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_sync_mode_waits_and_groups_concurrent_writes():
+    collection = FakeCollection(delay=0.05)
+    writer = HistoryWriter(collection, batch_size=100, durability="sync")
+    writer.start()
+
+    await writer.write(record(0))
+    assert collection.batches == [[record(0)]]
+
+    await asyncio.gather(*(writer.write(record(i)) for i in range(1, 21)))
+    await writer.close()
+
+    assert sum(len(batch) for batch in collection.batches) == 21
+    assert len(collection.batches) <= 3
+
+
+@pytest.mark.asyncio
+async def test_sync_mode_propagates_write_failure():
+    writer = HistoryWriter(FakeCollection(fail=True), durability="sync")
+    writer.start()
+
+    with pytest.raises(RuntimeError):
+        await writer.write(record(1))
+    await writer.close()
+
+    assert writer.stats["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_full_queue_applies_backpressure():
+    collection = FakeCollection(delay=0.2)
+    writer = HistoryWriter(collection, batch_size=1, max_queue=2, durability="async")
+    writer.start()
+
+    for i in range(3):
+        await writer.write(record(i))
+    blocked = asyncio.ensure_future(writer.write(record(3)))
+    await asyncio.sleep(0.05)
+
+    assert not blocked.done() and writer.queue_depth == 2
+    await blocked
+    await writer.close()
+    assert sum(len(batch) for batch in collection.batches) == 4
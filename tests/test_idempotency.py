@@ -0,0 +1,135 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from domain.models import IdempotencyRecord
+from infrastructure import memory
+from infrastructure.idempotency import IdempotencyError, IdempotencyStore
+
+
+class CountingAction:
+    """Действие-заглушка: считает выполнения, каждое длится delay секунд"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return 200, b'{"id": "T-1"}', {"etag": '"0"'}
+
+
+@pytest.mark.asyncio
+async def test_racing_retries_execute_once():
+    store = IdempotencyStore(memory.InMemoryIdempotencyRepository())
+    action = CountingAction(delay=0.05)
+
+    records = await asyncio.gather(*(store.execute("user_123:key-1", "f", action) for _ in range(5)))
+    replay = await store.execute("user_123:key-1", "f", action)
+
+    assert action.calls == 1 and store.stats["executed"] == 1
+    assert all(record.body == b'{"id": "T-1"}' for record in records + [replay])
+    with pytest.raises(IdempotencyError) as exc_info:
+        await store.execute("user_123:key-1", "other", action)
+    assert exc_info.value.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_other_pod_waits_for_stored_response():
+    shared = memory.InMemoryIdempotencyRepository()
+    first = IdempotencyStore(shared)
+    second = IdempotencyStore(shared, wait=1)
+    impatient = IdempotencyStore(shared, wait=0.01)
+    action = CountingAction(delay=0.1)
+
+    running = asyncio.create_task(first.execute("user_123:key-1", "f", action))
+    await asyncio.sleep(0.01)
+    with pytest.raises(IdempotencyError) as exc_info:
+        await impatient.execute("user_123:key-1", "f", action)
+    record = await second.execute("user_123:key-1", "f", action)
+
+    assert exc_info.value.status_code == 409
+    assert (await running).body == record.body and action.calls == 1
+    assert second.stats["stored_replays"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_or_failed_request_releases_key():
+    store = IdempotencyStore(memory.InMemoryIdempotencyRepository())
+    action = CountingAction(delay=0.1)
+
+    first = asyncio.create_task(store.execute("user_123:key-1", "f", action))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+    async def failing():
+        raise ConnectionError("mongo is down")
+
+    with pytest.raises(ConnectionError):
+        await store.execute("user_123:key-1", "f", failing)
+
+    record = await store.execute("user_123:key-1", "f", CountingAction())
+    assert record.status_code == 200 and store.stats["released"] == 2
+
+
+@pytest.mark.asyncio
+async def test_abandoned_reservation_is_taken_over():
+    repository = memory.InMemoryIdempotencyRepository()
+    now = datetime.now()
+    # Резерв пода, который умер, не сняв его
+    await repository.reserve(IdempotencyRecord(
+        key="user_123:key-1", fingerprint="f", created_at=now, expires_at=now + timedelta(days=1),
+        locked_until=now - timedelta(seconds=1),
+    ))
+    action = CountingAction()
+
+    record = await IdempotencyStore(repository).execute("user_123:key-1", "f", action)
+
+    assert record.status == "done" and action.calls == 1
+    assert (await repository.get("user_123:key-1")).status == "done"
+
+
+def test_retried_create_and_status_change_write_once(memory_app_client, task_payload):
+    headers = {"Idempotency-Key": "bot-update-42"}
+
+    first = memory_app_client.post("/api/v1/tasks", json=task_payload, headers=headers)
+    retry = memory_app_client.post("/api/v1/tasks", json=task_payload, headers=headers)
+    assert first.status_code == retry.status_code == 200 and first.json() == retry.json()
+    assert len(memory_app_client.get("/api/v1/tasks").json()) == 1
+
+    changed = memory_app_client.post("/api/v1/tasks", json={**task_payload, "priority": "low"}, headers=headers)
+    assert changed.status_code == 422
+
+    task_id = first.json()["id"]
+    url = f"/api/v1/tasks/{task_id}/status"
+    updated = memory_app_client.patch(url, json={"status": "assigned"}, headers={"Idempotency-Key": "status-1"})
+    replayed = memory_app_client.patch(url, json={"status": "assigned"}, headers={"Idempotency-Key": "status-1"})
+    assert replayed.status_code == 200 and replayed.headers["ETag"] == updated.headers["ETag"] == '"1"'
+
+    # Ошибка тоже сохраняется: повтор не выполняет запрос снова
+    rejected = memory_app_client.patch(url, json={"status": "closed"}, headers={"Idempotency-Key": "status-2"})
+    memory_app_client.patch(url, json={"status": "in_progress"})
+    assert memory_app_client.patch(url, json={"status": "closed"}, headers={"Idempotency-Key": "status-2"}).json() == rejected.json()
+
+    actions = [record["action"] for record in memory_app_client.get(f"/api/v1/tasks/{task_id}/history").json()["history"]]
+    assert actions == ["status_changed", "status_changed", "created"]
+
+
+def test_unexpected_error_is_not_stored(memory_app_client, task_payload, monkeypatch):
+    headers = {"Idempotency-Key": "bot-update-43"}
+    create = memory.task_repository.create
+
+    async def failing_create(task):
+        raise ConnectionError("mongo is down")
+
+    monkeypatch.setattr(memory.task_repository, "create", failing_create)
+    with pytest.raises(ConnectionError):
+        memory_app_client.post("/api/v1/tasks", json=task_payload, headers=headers)
+
+    monkeypatch.setattr(memory.task_repository, "create", create)
+    retry = memory_app_client.post("/api/v1/tasks", json=task_payload, headers=headers)
+    assert retry.status_code == 200 and len(memory_app_client.get("/api/v1/tasks").json()) == 1
@@ -0,0 +1,75 @@
+import pytest
+
+from domain.models import TaskFilter
+from domain.pagination import SORT_FIELDS
+from infrastructure.indexes import INDEXES, HOT_QUERIES, check_hot_queries, has_collscan
+
+
+IXSCAN_PLAN = {
+    "stage": "FETCH",
+    "inputStage": {"stage": "IXSCAN", "indexName": "id_unique"},
+}
+COLLSCAN_PLAN = {
+    "stage": "SORT",
+    "inputStage": {"stage": "COLLSCAN", "direction": "forward"},
+}
+# Формат SBE (MongoDB 7): план вложен в queryPlan
+SBE_COLLSCAN_PLAN = {"queryPlan": {"stage": "COLLSCAN"}, "slotBasedPlan": {"stages": "..."}}
+
+
+class FakeCursor:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def sort(self, *args):
+        return self
+
+    async def explain(self):
+        return {"queryPlanner": {"winningPlan": self.plan}}
+
+
+class FakeDatabase:
+    def __init__(self, plans):
+        self.plans = plans
+
+    def __getitem__(self, name):
+        plan = self.plans.get(name, IXSCAN_PLAN)
+        return type("FakeCollection", (), {"find": lambda _, query: FakeCursor(plan)})()
+
+
+@pytest.mark.parametrize(
+    "plan, expected",
+    [(IXSCAN_PLAN, False), (COLLSCAN_PLAN, True), (SBE_COLLSCAN_PLAN, True)],
+)
+def test_has_collscan(plan, expected):
+    assert has_collscan(plan) is expected
+
+
+def test_every_hot_query_collection_has_indexes():
+    assert {collection for collection, _, _ in HOT_QUERIES} <= set(INDEXES)
+
+
+def test_every_list_filter_has_index_for_each_sort():
+    names = {index.document["name"] for index in INDEXES["tasks"]}
+    filters = set(TaskFilter.model_fields) - {"due_from", "due_to"}
+
+    for sort_field in SORT_FIELDS:
+        assert f"{sort_field}_id" in names
+        assert {f"{field}_{sort_field}_id" for field in filters} <= names
+
+
+@pytest.mark.asyncio
+async def test_check_hot_queries_fails_on_collscan():
+    database = FakeDatabase({"task_history": COLLSCAN_PLAN})
+
+    with pytest.raises(RuntimeError, match="task_history"):
+        await check_hot_queries(database, mode="fail")
+
+
+@pytest.mark.asyncio
+async def test_check_hot_queries_warns_on_collscan(caplog):
+    database = FakeDatabase({"tasks": COLLSCAN_PLAN})
+
+    await check_hot_queries(database, mode="warn")
+
+    assert "COLLSCAN" in caplog.text
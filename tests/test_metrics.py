@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from core.metrics import MongoCommandListener, register_stats
+from presentation.routing import InstrumentedRoute
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def make_client():
+    router = APIRouter(route_class=InstrumentedRoute)
+
+    @router.get("/items/{item_id}")
+    async def get_item(item_id: str, limit: int = 10):
+        if item_id == "missing":
+            raise HTTPException(status_code=404, detail="not found")
+        return {"id": item_id}
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_route_latency_is_labeled_by_path_template():
+    client = make_client()
+    route = "/items/{item_id}"
+    before = sample("task_service_request_duration_seconds_count", method="GET", route=route)
+    before_404 = sample("task_service_requests_total", method="GET", route=route, status="404")
+    before_422 = sample("task_service_requests_total", method="GET", route=route, status="422")
+
+    assert client.get("/items/a").status_code == 200
+    assert client.get("/items/b").status_code == 200
+    assert client.get("/items/missing").status_code == 404
+    assert client.get("/items/a", params={"limit": "many"}).status_code == 422
+
+    assert sample("task_service_request_duration_seconds_count", method="GET", route=route) == before + 4
+    assert sample("task_service_requests_total", method="GET", route=route, status="404") == before_404 + 1
+    assert sample("task_service_requests_total", method="GET", route=route, status="422") == before_422 + 1
+    assert sample("task_service_requests_in_flight", method="GET", route=route) == 0
+
+
+def test_mongo_listener_records_command_and_collection():
+    listener = MongoCommandListener()
+    labels = {"command": "find", "collection": "tasks"}
+    before = sample("task_service_mongo_command_duration_seconds_count", **labels)
+    before_failures = sample("task_service_mongo_command_failures_total", **labels)
+
+    for request_id, outcome in ((1, "succeeded"), (2, "failed")):
+        started = SimpleNamespace(
+            connection_id=("localhost", 27017), request_id=request_id,
+            command_name="find", command={"find": "tasks", "filter": {}},
+        )
+        listener.started(started)
+        getattr(listener, outcome)(SimpleNamespace(
+            connection_id=("localhost", 27017), request_id=request_id,
+            command_name="find", duration_micros=1500,
+        ))
+
+    assert sample("task_service_mongo_command_duration_seconds_count", **labels) == before + 2
+    assert sample("task_service_mongo_command_failures_total", **labels) == before_failures + 1
+    assert listener._pending == {}
+
+
+def test_component_stats_are_read_at_scrape_time():
+    stats = {"hits": 1}
+    register_stats("test_component", lambda: stats, gauges=["size"])
+    stats["hits"] = 5
+    stats["size"] = 3
+
+    assert sample("task_service_test_component_hits_total") == 5
+    assert sample("task_service_test_component_size") == 3
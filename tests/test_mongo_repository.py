@@ -0,0 +1,191 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from pymongo.errors import BulkWriteError
+
+from domain.models import Task, TaskFilter
+from domain.services import TaskService
+from infrastructure.memory import InMemoryTaskHistoryRepository
+from infrastructure.repositories import MongoTaskRepository
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, limit):
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+    async def __aiter__(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    """Заглушка коллекции tasks: записывает вызовы, отвечает заготовленными документами"""
+
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.calls = []
+        self.projections = []
+
+    def find(self, query, projection=None):
+        self.calls.append(("find", query))
+        self.projections.append(projection)
+        return FakeCursor(self.docs)
+
+    async def insert_many(self, docs, ordered=True):
+        self.calls.append(("insert_many", docs))
+        failed = [i for i, doc in enumerate(docs) if doc["id"] in {d["id"] for d in self.docs}]
+        if failed:
+            raise BulkWriteError({
+                "writeErrors": [
+                    {"index": i, "code": 11000, "errmsg": f"E11000 duplicate key error dup key: {{ id: \"{docs[i]['id']}\" }}"}
+                    for i in failed
+                ],
+                "nInserted": len(docs) - len(failed),
+            })
+
+    async def find_one(self, query, projection=None):
+        self.calls.append(("find_one", query))
+        return dict(self.docs[0]) if self.docs else None
+
+    async def bulk_write(self, operations, ordered=True):
+        # Применяет UpdateOne, фильтр которых совпал (равенство и $in), как MongoDB
+        self.calls.append(("bulk_write", operations))
+        matched = 0
+        for operation in operations:
+            query, update = operation._filter, operation._doc
+            for doc in self.docs:
+                if all(
+                    doc.get(field) in condition["$in"] if isinstance(condition, dict) else doc.get(field) == condition
+                    for field, condition in query.items()
+                ):
+                    matched += 1
+                    doc.update(update["$set"])
+                    doc["version"] += update["$inc"]["version"]
+                    doc.setdefault("bulk_marks", []).extend(update["$push"]["bulk_marks"]["$each"])
+                    break
+        return SimpleNamespace(matched_count=matched)
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        # Условие (статус, версия) не совпало: как в MongoDB, документ не найден
+        self.calls.append(("find_one_and_update", query, update))
+        return None
+
+
+def make_doc(**overrides):
+    data = {
+        "id": "T-20250101-ABCDEF12",
+        "title": "Test",
+        "description": "Desc",
+        "category": "electrical",
+        "location_id": "room_101",
+        "priority": "high",
+        "created_by": "user_123",
+        "created_at": datetime(2025, 1, 1, 12, 0),
+        "due_date": datetime(2025, 1, 1, 16, 0),
+    }
+    data.update(overrides)
+    return Task(**data).model_dump()
+
+
+@pytest.mark.asyncio
+async def test_due_date_sort_skips_tasks_without_due_date():
+    collection = FakeCollection([make_doc()])
+    repo = MongoTaskRepository(collection)
+
+    await repo.get_all(TaskFilter(status="new"), 10, sort="due_date")
+    await repo.get_all(TaskFilter(), 10, after=(datetime(2025, 1, 1), "T-1"), sort="-due_date")
+    await repo.get_all(TaskFilter(), 10, sort="-created_at")
+
+    first, second, third = (query for _, query in collection.calls)
+    assert first == {"status": "new", "due_date": {"$ne": None}}
+    assert second["$and"][0] == {"due_date": {"$ne": None}}
+    assert "due_date" not in third
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("docs, status_code", [([], 404), ([make_doc(status="completed")], 400)])
+async def test_rejected_guarded_update_is_explained_by_one_read(docs, status_code):
+    collection = FakeCollection(docs)
+    service = TaskService(MongoTaskRepository(collection), InMemoryTaskHistoryRepository())
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.update_task_status("T-20250101-ABCDEF12", "assigned", "dispatcher")
+
+    assert exc_info.value.status_code == status_code
+    (_, query, update), (name, _) = collection.calls
+    assert query["status"] == {"$in": ["new"]} and update["$set"] == {"status": "assigned"}
+    assert name == "find_one"
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_attributes_partial_match_by_marks():
+    collection = FakeCollection([make_doc(id="T-1"), make_doc(id="T-2")])
+    repo = MongoTaskRepository(collection)
+    bulk_write = collection.bulk_write
+
+    async def concurrent_bulk_write(operations, ordered=True):
+        # Между чтением и записью T-2 назначили тому же исполнителю:
+        # поля совпадут с изменением пачки, но версия уже другая
+        collection.docs[1].update(status="assigned", assigned_to="worker_1", version=1)
+        return await bulk_write(operations, ordered)
+
+    collection.bulk_write = concurrent_bulk_write
+    changes = {"status": "assigned", "assigned_to": "worker_1"}
+    results = await repo.bulk_update([("T-1", changes, ["new"]), ("T-2", changes, ["new"])])
+
+    (before_1, after_1), (before_2, after_2) = results
+    assert after_1.version == 1 and after_1.assigned_to == "worker_1"
+    assert after_2 is None and before_2.version == 1
+    _, operations = collection.calls[1]
+    assert operations[0]._filter == {"id": "T-1", "status": "new", "version": {"$in": [0, None]}}
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_skips_reread_when_all_matched():
+    collection = FakeCollection([make_doc(id="T-1")])
+    repo = MongoTaskRepository(collection)
+
+    [(_, after)] = await repo.bulk_update([("T-1", {"priority": "low"}, ["new"])])
+
+    assert after.priority == "low" and after.version == 1
+    assert [call[0] for call in collection.calls] == ["find", "bulk_write"]
+    # Метки bulk_update нужны только при разборе частичного bulk_write
+    assert collection.projections == [{"_id": False, "bulk_marks": False}]
+    await repo.get_all(TaskFilter(), 10)
+    assert collection.projections[-1] == {"_id": False, "bulk_marks": False}
+
+
+@pytest.mark.asyncio
+async def test_open_deadlines_exclude_escalated_tasks():
+    collection = FakeCollection([make_doc(sla_level=1)])
+    repo = MongoTaskRepository(collection)
+
+    deadlines = await repo.get_open_deadlines(["new"], datetime(2025, 1, 2), 2)
+
+    assert deadlines == [("T-20250101-ABCDEF12", datetime(2025, 1, 1, 16, 0), 1)]
+    (_, query), = collection.calls
+    assert query["sla_level"] == {"$not": {"$gte": 2}}
+
+
+@pytest.mark.asyncio
+async def test_create_many_maps_write_errors_to_items():
+    collection = FakeCollection([make_doc(id="T-2")])
+    repo = MongoTaskRepository(collection)
+    tasks = [Task(**make_doc(id=f"T-{i}")) for i in range(1, 4)]
+
+    errors = await repo.create_many(tasks)
+
+    assert errors[0] is None and errors[2] is None
+    assert "duplicate key" in errors[1]
+    assert await repo.create_many([]) == [] and len(collection.calls) == 1
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from domain.models import Notification, TaskCreate
+from domain.services import TaskService
+from infrastructure.memory import (
+    InMemoryNotificationOutboxRepository, InMemoryTaskHistoryRepository, InMemoryTaskRepository
+)
+from infrastructure.notifications import NotificationDispatcher
+
+
+class StubNotificationService:
+    """Локальный HTTP-сервер вместо Notification Service: отвечает по сценарию и запоминает пачки"""
+
+    def __init__(self, responses=()):
+        self.responses = list(responses)
+        self.batches = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                status, headers = stub.responses.pop(0) if stub.responses else (200, {})
+                if status < 300:
+                    stub.batches.append(body["notifications"])
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/v1/notifications/send"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubNotificationService()
+    yield server
+    server.close()
+
+
+def notification(i, now):
+    return Notification(
+        event_type="task_status_changed", task_id=f"T-{i}", recipient_id="user_123",
+        message=f"Ваша заявка T-{i} взята в работу", channel="telegram",
+        created_at=now, next_attempt_at=now,
+    )
+
+
+@pytest.mark.asyncio
+async def test_service_writes_outbox_and_dispatcher_delivers_in_batches(stub):
+    outbox = InMemoryNotificationOutboxRepository()
+    service = TaskService(InMemoryTaskRepository(), InMemoryTaskHistoryRepository(), outbox=outbox)
+    task = await service.create_task(TaskCreate(
+        title="Нет света", description="Не работает свет", category="electrical",
+        location_id="room_101", priority="high",
+    ), "user_123")
+    await service.assign_task(task.id, "worker_1", "dispatcher")
+    await service.update_task_status(task.id, "in_progress", "worker_1")
+    assert len(outbox) == 3
+
+    dispatcher = NotificationDispatcher(outbox, stub.url, batch_size=2)
+    assert await dispatcher.dispatch_once() == 2
+    assert await dispatcher.dispatch_once() == 1
+    await dispatcher.close()
+
+    assert [len(batch) for batch in stub.batches] == [2, 1]
+    delivered = [item for batch in stub.batches for item in batch]
+    assert {(item["recipient_id"], item["message"]) for item in delivered} == {
+        ("worker_1", f"Вам назначена заявка {task.id}: Нет света"),
+        ("user_123", f"Ваша заявка {task.id} назначена исполнителю"),
+        ("user_123", f"Ваша заявка {task.id} взята в работу"),
+    }
+    assert len(outbox) == 0
+    assert dispatcher.stats["sent"] == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_with_backoff_and_retry_after(stub):
+    now = datetime(2024, 1, 1, 12, 0)
+    clock = [now]
+    outbox = InMemoryNotificationOutboxRepository()
+    await outbox.add([notification(i, now) for i in range(3)])
+    stub.responses = [(503, {"Retry-After": "7"})]
+    dispatcher = NotificationDispatcher(outbox, stub.url, backoff_base=1, clock=lambda: clock[0])
+
+    assert await dispatcher.dispatch_once() == 3
+    assert stub.batches == []
+    assert dispatcher._pause == 7
+    pending = list(outbox._notifications.values())
+    assert all(n.attempts == 1 and n.last_error == "HTTP 503" for n in pending)
+    assert all(n.next_attempt_at >= now + timedelta(seconds=7) for n in pending)
+
+    # До срока повтора пачку не забирают
+    assert await dispatcher.dispatch_once() == 0
+    clock[0] = now + timedelta(seconds=10)
+    assert await dispatcher.dispatch_once() == 3
+    await dispatcher.close()
+
+    assert len(stub.batches) == 1 and len(outbox) == 0
+    assert dispatcher.stats["lag_seconds"] == 10
+    assert dispatcher.stats["retried"] == 3
+
+
+@pytest.mark.asyncio
+async def test_rejected_or_exhausted_notifications_are_marked_failed(stub):
+    now = datetime.now()
+    outbox = InMemoryNotificationOutboxRepository()
+    await outbox.add([notification(1, now)])
+    stub.responses = [(400, {})]
+    dispatcher = NotificationDispatcher(outbox, stub.url)
+
+    await dispatcher.dispatch_once()
+    assert [n.status for n in outbox._notifications.values()] == ["failed"]
+    assert dispatcher._pause == 0
+
+    dispatcher.url = "http://127.0.0.1:1/unreachable"
+    dispatcher.max_attempts = 1
+    await outbox.add([notification(2, now)])
+    await dispatcher.dispatch_once()
+    await dispatcher.close()
+
+    assert [n.status for n in outbox._notifications.values()] == ["failed", "failed"]
+    assert dispatcher.stats["failed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_background_loop_picks_up_new_notifications(stub):
+    outbox = InMemoryNotificationOutboxRepository()
+    dispatcher = NotificationDispatcher(outbox, stub.url, poll_interval=10)
+    dispatcher.start()
+    await asyncio.sleep(0.05)
+
+    await outbox.add([notification(1, datetime.now())])
+    dispatcher.wake()
+    for _ in range(100):
+        if stub.batches:
+            break
+        await asyncio.sleep(0.02)
+    await dispatcher.close()
+
+    assert len(stub.batches) == 1
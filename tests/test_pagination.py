@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import pytest
+
+from domain.models import Task, TaskFilter
+from domain.pagination import InvalidCursorError, decode_cursor, encode_cursor, parse_sort
+from infrastructure.repositories import build_task_query
+
+
+def make_task(**overrides):
+    data = {
+        "id": "T-20250101-ABCDEF12",
+        "title": "Test",
+        "description": "Desc",
+        "category": "electrical",
+        "location_id": "room_101",
+        "priority": "high",
+        "created_by": "user_123",
+        "created_at": datetime(2025, 1, 1, 12, 30, 15, 123000),
+        "due_date": datetime(2025, 1, 1, 16, 30),
+    }
+    data.update(overrides)
+    return Task(**data)
+
+
+@pytest.mark.parametrize("sort", ["-created_at", "created_at", "-due_date", "due_date"])
+def test_cursor_round_trip(sort):
+    task = make_task()
+
+    value, task_id = decode_cursor(encode_cursor(task, sort), sort)
+
+    assert value == getattr(task, sort.lstrip("-")) and task_id == task.id
+
+
+def test_cursor_rejects_other_sort_order():
+    cursor = encode_cursor(make_task(), "-created_at")
+
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, "due_date")
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", "e30"])
+def test_cursor_rejects_garbage(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, "-created_at")
+
+
+def test_parse_sort_rejects_unknown_field():
+    with pytest.raises(ValueError):
+        parse_sort("-title")
+
+
+def test_build_task_query_combines_filters_and_due_range():
+    filters = TaskFilter(
+        status="new",
+        assigned_to="worker_1",
+        due_from=datetime(2025, 1, 1),
+        due_to=datetime(2025, 1, 2),
+    )
+
+    assert build_task_query(filters) == {
+        "status": "new",
+        "assigned_to": "worker_1",
+        "due_date": {"$gte": datetime(2025, 1, 1), "$lt": datetime(2025, 1, 2)},
+    }
+
+
+def test_cursor_needs_sort_value():
+    with pytest.raises(ValueError):
+        encode_cursor(make_task(due_date=None), "due_date")
@@ -0,0 +1,68 @@
+import json
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from domain.models import Task
+from infrastructure.repositories import load_tasks
+from presentation.responses import ModelJSONResponse
+
+
+def task_document(i):
+    return {
+        "id": f"T-{i}",
+        "title": "Нет света",
+        "description": "В комнате 101 не работает свет",
+        "category": "electrical",
+        "location_id": "room_101",
+        "priority": "high",
+        "status": "new",
+        "created_by": "user_123",
+        "created_at": datetime(2024, 9, 1, 12, 0, 0, 123456) - timedelta(minutes=i),
+        "due_date": datetime(2024, 9, 1, 16, 0),
+    }
+
+
+@pytest.fixture
+def client():
+    tasks = load_tasks([task_document(i) for i in range(3)])
+    app = FastAPI(default_response_class=ModelJSONResponse)
+
+    @app.get("/validated", response_model=List[Task])
+    async def validated():
+        return tasks
+
+    @app.get("/fast", response_model=List[Task])
+    async def fast():
+        return ModelJSONResponse(tasks, headers={"X-Next-Cursor": "abc"})
+
+    @app.get("/raw")
+    async def raw():
+        return ModelJSONResponse([{"task_id": "T-1", "timestamp": datetime(2024, 9, 1, 12, 0)}])
+
+    return TestClient(app)
+
+
+def test_fast_path_matches_response_model_output(client):
+    validated = client.get("/validated")
+    fast = client.get("/fast")
+
+    assert fast.json() == validated.json()
+    assert fast.json()[0]["created_at"] == "2024-09-01T12:00:00.123456"
+    assert fast.headers["X-Next-Cursor"] == "abc"
+    assert fast.headers["content-type"] == "application/json"
+
+
+def test_raw_documents_are_serialized_without_models(client):
+    assert client.get("/raw").json() == [{"task_id": "T-1", "timestamp": "2024-09-01T12:00:00"}]
+
+
+def test_nested_models_in_dicts_are_dumped():
+    task = load_tasks([task_document(1)])[0]
+
+    body = json.loads(ModelJSONResponse({"items": [task], "next_cursor": None}).body)
+
+    assert body["items"][0]["id"] == "T-1" and body["items"][0]["sla_level"] == 0
@@ -0,0 +1,121 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from domain.models import Task, TaskFilter
+from infrastructure.search import InvertedIndex, tokenize
+
+WORDS = ["свет", "лампа", "кран", "протечка", "дверь", "замок", "окно", "батарея", "розетка", "вентиляция"]
+
+
+def make_task(i, title, description="", **fields):
+    return Task(
+        id=f"T-{i:04d}",
+        title=title,
+        description=description,
+        category=fields.pop("category", "electrical"),
+        location_id=fields.pop("location_id", "room_101"),
+        priority="high",
+        status=fields.pop("status", "new"),
+        created_by="user_123",
+        created_at=datetime(2024, 9, 1, 12, 0) + timedelta(minutes=i),
+        due_date=datetime(2024, 9, 1, 16, 0),
+        **fields,
+    )
+
+
+def random_tasks(count, seed=3):
+    rng = random.Random(seed)
+    return [
+        make_task(
+            i,
+            " ".join(rng.choices(WORDS[:4], k=2)),
+            " ".join(rng.choices(WORDS, k=rng.randint(0, 6))),
+            status=rng.choice(["new", "assigned"]),
+            location_id=rng.choice(["room_101", "room_102"]),
+        )
+        for i in range(count)
+    ]
+
+
+def test_tokenize_normalizes_case_endings_and_stop_words():
+    assert tokenize("Не работает СВЕТ в комнате 101") == ["работ", "свет", "комнат", "101"]
+    assert tokenize("нет света в комнате") == ["нет", "свет", "комнат"]
+
+
+def test_title_match_outranks_description_match_and_filters_apply():
+    index = InvertedIndex()
+    index.add_many([
+        make_task(1, "Протечка в туалете", "Рядом не работает свет"),
+        make_task(2, "Нет света в комнате 101", "Совсем"),
+        make_task(3, "Нет света", "Комната 102", location_id="room_102"),
+    ])
+
+    assert [task_id for task_id, _ in index.search_ranked("свет", TaskFilter(), 10)] == ["T-0003", "T-0002", "T-0001"]
+    assert [task_id for task_id, _ in index.search_ranked("свет 101", TaskFilter(), 10)] == ["T-0002"]
+    assert [task_id for task_id, _ in index.search_ranked("свет", TaskFilter(location_id="room_102"), 10)] == ["T-0003"]
+
+    assert [task_id for task_id, _ in index.search_ranked("свет в туалете", TaskFilter(), 10)] == ["T-0001"]
+    # Ни одна задача не содержит всех слов — ищем без самого частого
+    assert [task_id for task_id, _ in index.search_ranked("протечка 101", TaskFilter(), 10)] == ["T-0001"]
+
+
+def test_update_moves_task_between_filters():
+    index = InvertedIndex()
+    task = make_task(1, "Нет света")
+    index.add(task)
+
+    index.update(task.model_copy(update={"status": "assigned", "assigned_to": "worker_1"}))
+
+    assert index.search_ranked("свет", TaskFilter(status="new"), 10) == []
+    assert index.search_ranked("свет", TaskFilter(status="assigned", assigned_to="worker_1"), 10)[0][0] == "T-0001"
+
+
+@pytest.mark.parametrize("budget", [1, 5])
+def test_early_termination_and_bitmaps_match_full_scoring(budget):
+    tasks = random_tasks(400)
+    exact = InvertedIndex(score_budget=10 ** 9)
+    fast = InvertedIndex(score_budget=budget)
+    exact.add_many(tasks[:300])
+    fast.add_many(tasks[:300])
+    fast.optimize()
+    # Задачи после optimize попадают в уже построенные маски и списки
+    exact.add_many(tasks[300:])
+    fast.add_many(tasks[300:])
+    for task in tasks[::7]:
+        exact.update(task.model_copy(update={"status": "completed"}))
+        fast.update(task.model_copy(update={"status": "completed"}))
+
+    rng = random.Random(5)
+    for _ in range(100):
+        query = " ".join(rng.sample(WORDS, rng.randint(1, 3)))
+        filters = rng.choice([TaskFilter(), TaskFilter(status="new"), TaskFilter(status="completed", location_id="room_102")])
+        k = rng.choice([1, 10, 60])
+        assert fast.search_ranked(query, filters, k) == exact.search_ranked(query, filters, k)
+
+
+def test_search_endpoint_ranks_and_paginates(memory_app_client):
+    for i in range(5):
+        memory_app_client.post("/api/v1/tasks", json={
+            "title": f"Нет света в комнате {100 + i}", "description": "Не работает свет",
+            "category": "electrical", "location_id": f"room_{100 + i}", "priority": "high",
+        })
+    created = memory_app_client.post("/api/v1/tasks", json={
+        "title": "Течет кран", "description": "В комнате 101 течет кран",
+        "category": "plumbing", "location_id": "room_101", "priority": "medium",
+    }).json()
+    memory_app_client.patch(f"/api/v1/tasks/{created['id']}/status", json={"status": "assigned"})
+
+    duplicates = memory_app_client.get("/api/v1/tasks/search", params={"q": "свет комната 101"}).json()
+    assert [task["title"] for task in duplicates] == ["Нет света в комнате 101"]
+
+    assert memory_app_client.get("/api/v1/tasks/search", params={"q": "кран", "status": "assigned"}).json()[0]["id"] == created["id"]
+
+    first = memory_app_client.get("/api/v1/tasks/search", params={"q": "свет", "limit": 3})
+    second = memory_app_client.get("/api/v1/tasks/search", params={"q": "свет", "limit": 3, "cursor": first.headers["X-Next-Cursor"]})
+    ids = [task["id"] for task in first.json() + second.json()]
+    assert len(ids) == len(set(ids)) == 5 and "X-Next-Cursor" not in second.headers
+
+    other = memory_app_client.get("/api/v1/tasks/search", params={"q": "кран", "cursor": first.headers["X-Next-Cursor"]})
+    assert other.status_code == 400
@@ -0,0 +1,230 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from domain.models import TaskBulkAssignItem, TaskBulkStatusItem, TaskCreate, TaskFilter
+from domain.services import TaskService
+from infrastructure.memory import (
+    InMemoryTaskHistoryRepository, InMemoryTaskRepository, InMemoryTaskStatsRepository
+)
+from infrastructure.repositories import _escape_key, _unescape_key
+
+
+def make_task_data(**overrides):
+    data = {
+        "title": "Нет света",
+        "description": "В комнате 101 не работает свет",
+        "category": "electrical",
+        "location_id": "room_101",
+        "priority": "high",
+    }
+    data.update(overrides)
+    return TaskCreate(**data)
+
+
+@pytest.fixture
+def service():
+    return TaskService(InMemoryTaskRepository(), InMemoryTaskHistoryRepository())
+
+
+@pytest.mark.asyncio
+async def test_create_and_get_task(service):
+    created = await service.create_task(make_task_data(), "user_123")
+
+    task = await service.get_task(created.id)
+
+    assert task.status == "new" and task.created_by == "user_123"
+
+
+@pytest.mark.asyncio
+async def test_list_tasks_pages_through_every_task(service):
+    created = [await service.create_task(make_task_data(), "user_123") for _ in range(7)]
+
+    seen, cursor = [], None
+    while True:
+        page = await service.list_tasks(TaskFilter(), limit=3, cursor=cursor)
+        seen += [task.id for task in page.items]
+        cursor = page.next_cursor
+        if not cursor:
+            break
+
+    assert sorted(seen) == sorted(task.id for task in created) and len(seen) == 7
+
+
+@pytest.mark.asyncio
+async def test_list_tasks_filters_by_index_and_due_range(service):
+    await service.create_task(make_task_data(priority="low"), "user_123")
+    urgent = await service.create_task(make_task_data(priority="critical"), "user_456")
+
+    by_creator = await service.list_tasks(TaskFilter(created_by="user_456"))
+    due_soon = await service.list_tasks(TaskFilter(due_to=datetime.now() + timedelta(hours=2)), sort="due_date")
+
+    assert [task.id for task in by_creator.items] == [urgent.id]
+    assert [task.id for task in due_soon.items] == [urgent.id]
+
+
+@pytest.mark.asyncio
+async def test_list_tasks_rejects_cursor_for_other_sort(service):
+    for _ in range(3):
+        await service.create_task(make_task_data(), "user_123")
+    page = await service.list_tasks(TaskFilter(), limit=1)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.list_tasks(TaskFilter(), limit=1, cursor=page.next_cursor, sort="due_date")
+
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_status_transition_is_validated(service):
+    task = await service.create_task(make_task_data(), "user_123")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.update_task_status(task.id, "completed", "operator_1")
+
+    assert exc_info.value.status_code == 400
+    assert "from 'new' to 'completed'" in exc_info.value.detail
+
+
+@pytest.mark.asyncio
+async def test_status_change_of_missing_task_returns_404(service):
+    with pytest.raises(HTTPException) as exc_info:
+        await service.update_task_status("T-MISSING", "assigned", "operator_1")
+
+    assert exc_info.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_assign_then_complete_and_rate(service):
+    task = await service.create_task(make_task_data(), "user_123")
+
+    assigned = await service.assign_task(task.id, "worker_1", "operator_1")
+    await service.update_task_status(task.id, "in_progress", "worker_1")
+    await service.update_task_status(task.id, "completed", "worker_1")
+    rating = await service.rate_task(task.id, 5, "Быстро", "user_123")
+    history = await service.get_task_history(task.id)
+
+    assert assigned.assigned_to == "worker_1" and rating["rating"] == 5
+    assert [record["action"] for record in history["history"]] == [
+        "rated", "status_changed", "status_changed", "assigned", "created"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_rating_unfinished_task_is_rejected(service):
+    task = await service.create_task(make_task_data(), "user_123")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.rate_task(task.id, 5, None, "user_123")
+
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_reports_every_item(service):
+    result = await service.create_tasks([make_task_data(), make_task_data(priority="low")], "bot")
+
+    assert result.succeeded == 2 and result.failed == 0
+    assert all(item.ok and item.id for item in result.items)
+
+
+@pytest.mark.asyncio
+async def test_bulk_status_applies_valid_items_only(service):
+    first = await service.create_task(make_task_data(), "user_123")
+    second = await service.create_task(make_task_data(), "user_123")
+
+    result = await service.bulk_update_status([
+        TaskBulkStatusItem(id=first.id, status="rejected"),
+        TaskBulkStatusItem(id=second.id, status="completed"),
+        TaskBulkStatusItem(id="T-MISSING", status="rejected"),
+        TaskBulkStatusItem(id=first.id, status="assigned"),
+    ], "dispatcher")
+
+    assert [item.ok for item in result.items] == [True, False, False, False]
+    assert [item.error for item in result.items[1:]] == [
+        "Invalid status transition from 'new' to 'completed'",
+        "Task not found",
+        "Duplicate task id in request",
+    ]
+    assert (await service.get_task(first.id)).status == "rejected"
+
+
+@pytest.mark.asyncio
+async def test_bulk_assign_writes_history_for_each_task(service):
+    tasks = [await service.create_task(make_task_data(), "user_123") for _ in range(3)]
+
+    result = await service.bulk_assign(
+        [TaskBulkAssignItem(id=task.id, assigned_to="worker_2") for task in tasks], "dispatcher"
+    )
+    history = await service.get_task_history(tasks[0].id)
+
+    assert result.succeeded == 3
+    assert history["history"][0]["new_assignee"] == "worker_2"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_transitions_out_of_new_have_single_winner(service):
+    task = await service.create_task(make_task_data(), "user_123")
+
+    results = await asyncio.gather(
+        service.update_task_status(task.id, "assigned", "operator_1"),
+        service.update_task_status(task.id, "assigned", "operator_2"),
+        return_exceptions=True,
+    )
+
+    assert sum(not isinstance(result, Exception) for result in results) == 1
+
+
+@pytest.fixture
+def stats_service():
+    tasks, history = InMemoryTaskRepository(), InMemoryTaskHistoryRepository()
+    return TaskService(tasks, history, stats_repo=InMemoryTaskStatsRepository(tasks, history))
+
+
+@pytest.mark.asyncio
+async def test_stats_counters_follow_every_change(stats_service):
+    service = stats_service
+    first = await service.create_task(make_task_data(priority="high"), "user_123")
+    second = await service.create_task(make_task_data(category="plumbing", priority="low"), "user_123")
+    await service.create_tasks([make_task_data(priority="low")], "user_123")
+    await service.assign_task(first.id, "worker_1", "dispatcher")
+    await service.update_task_status(first.id, "in_progress", "worker_1")
+    await service.update_task_status(first.id, "completed", "worker_1")
+    await service.rate_task(first.id, 4, None, "user_123")
+    await service.rate_task(first.id, 2, None, "user_123")  # переоценка
+    await service.bulk_update_status([TaskBulkStatusItem(id=second.id, status="rejected")], "dispatcher")
+
+    stats = await service.get_stats()
+
+    assert stats.total == 3
+    assert stats.by_status == {"new": 1, "completed": 1, "rejected": 1}
+    assert stats.by_category == {"electrical": 2, "plumbing": 1}
+    assert stats.by_priority == {"high": 1, "low": 2}
+    assert stats.rated == 1 and stats.average_rating == 2
+    assert stats.completed == 1 and stats.average_completion_hours is not None
+
+
+@pytest.mark.asyncio
+async def test_stats_rebuild_matches_incremental_counters(stats_service):
+    service = stats_service
+    tasks = [await service.create_task(make_task_data(), "user_123") for _ in range(4)]
+    for status in ("assigned", "in_progress", "completed"):
+        await service.update_task_status(tasks[0].id, status, "worker_1")
+    await service.rate_task(tasks[0].id, 5, None, "user_123")
+    await service.update_task_status(tasks[1].id, "rejected", "dispatcher")
+
+    incremental = await service.get_stats()
+    rebuilt = await service.rebuild_stats()
+
+    assert rebuilt.model_dump(exclude={"average_completion_hours"}) == \
+        incremental.model_dump(exclude={"average_completion_hours"})
+    assert rebuilt.completed == 1
+
+
+def test_stats_keys_are_safe_mongo_field_names():
+    key = "a.b$c%2E"
+
+    assert "." not in _escape_key(key) and "$" not in _escape_key(key)
+    assert _unescape_key(_escape_key(key)) == key
@@ -0,0 +1,175 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from domain.models import TaskCreate
+from domain.services import TaskService
+from domain.sla import SLA_BREACHED, SLA_ESCALATED, SLAMonitor
+from infrastructure.memory import InMemoryTaskHistoryRepository, InMemoryTaskRepository
+
+
+class Clock:
+    def __init__(self):
+        self.now = datetime.now()
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, **delta):
+        self.now += timedelta(**delta)
+
+
+def make_task_data(priority="critical"):
+    return TaskCreate(
+        title="Нет света",
+        description="В комнате 101 не работает свет",
+        category="electrical",
+        location_id="room_101",
+        priority=priority,
+    )
+
+
+@pytest.fixture
+def env():
+    task_repo = InMemoryTaskRepository()
+    history_repo = InMemoryTaskHistoryRepository()
+    clock = Clock()
+    monitor = SLAMonitor(task_repo, history_repo, escalation=timedelta(minutes=30),
+                         horizon=timedelta(hours=24), clock=clock)
+    events = []
+
+    async def listener(event):
+        events.append(event)
+
+    monitor.add_listener(listener)
+    return TaskService(task_repo, history_repo, monitor), monitor, clock, events
+
+
+async def actions(service, task_id):
+    history = await service.get_task_history(task_id)
+    return [record["action"] for record in history["history"]]
+
+
+@pytest.mark.asyncio
+async def test_breach_then_escalation_with_history_and_events(env):
+    service, monitor, clock, events = env
+    await monitor.load()
+    task = await service.create_task(make_task_data(), "user_123")  # срок — через 1 час
+
+    clock.advance(minutes=59)
+    await monitor.fire_due()
+    assert events == []
+
+    clock.advance(minutes=2)
+    await monitor.fire_due()
+    clock.advance(minutes=30)
+    await monitor.fire_due()
+
+    assert [e["type"] for e in events] == ["sla_breached", "sla_escalated"]
+    assert (await service.get_task(task.id)).sla_level == SLA_ESCALATED
+    assert (await actions(service, task.id))[:2] == ["sla_escalated", "sla_breached"]
+    assert monitor.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_completed_task_is_not_breached(env):
+    service, monitor, clock, events = env
+    task = await service.create_task(make_task_data(), "user_123")
+    for status in ("assigned", "in_progress", "completed"):
+        await service.update_task_status(task.id, status, "worker")
+
+    clock.advance(hours=2)
+    await monitor.fire_due()
+
+    assert events == [] and monitor.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_load_picks_up_overdue_and_upcoming_deadlines_only(env):
+    service, _, clock, _ = env
+    overdue = await service.create_task(make_task_data("critical"), "user_123")
+    await service.create_task(make_task_data("low"), "user_123")  # срок через 72 часа — вне окна
+
+    # Новый экземпляр монитора (рестарт пода) видит только то, что в базе
+    restarted = SLAMonitor(service.task_repo, service.history_repo, clock=clock,
+                           horizon=timedelta(hours=24))
+    clock.advance(hours=2)
+    await restarted.load()
+    assert restarted.pending == 1
+
+    await restarted.fire_due()
+    assert (await service.get_task(overdue.id)).sla_level == SLA_BREACHED
+
+
+@pytest.mark.asyncio
+async def test_level_is_raised_once_across_monitors(env):
+    service, monitor, clock, events = env
+    task = await service.create_task(make_task_data(), "user_123")
+    other = SLAMonitor(service.task_repo, service.history_repo, clock=clock)
+    other.track(task)
+
+    clock.advance(hours=1, minutes=1)
+    await asyncio.gather(monitor.fire_due(), other.fire_due())
+
+    assert len(events) == 1
+    assert (await actions(service, task.id)).count("sla_breached") == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_level_update_is_retried_with_backoff(env):
+    service, monitor, clock, events = env
+    task = await service.create_task(make_task_data(), "user_123")
+    set_sla_level = service.task_repo.set_sla_level
+    failures = [ConnectionError("mongo is down")] * 2
+
+    async def flaky_set_sla_level(*args):
+        if failures:
+            raise failures.pop()
+        return await set_sla_level(*args)
+
+    service.task_repo.set_sla_level = flaky_set_sla_level
+    clock.advance(hours=1, minutes=1)
+    await monitor.fire_due()
+    assert events == [] and monitor.pending == 1 and monitor.stats["errors"] == 1
+
+    clock.advance(seconds=5)
+    await monitor.fire_due()
+    clock.advance(seconds=5)
+    await monitor.fire_due()  # вторая пауза — 10 секунд
+    assert events == [] and monitor.stats["errors"] == 2
+
+    clock.advance(seconds=5)
+    await monitor.fire_due()
+    assert [e["type"] for e in events] == ["sla_breached"]
+    assert (await service.get_task(task.id)).sla_level == SLA_BREACHED
+
+
+@pytest.mark.asyncio
+async def test_background_loop_wakes_up_for_new_earlier_deadline(env):
+    service, monitor, _, events = env
+    monitor.clock = datetime.now
+    await monitor.start()
+    try:
+        task = await service.create_task(make_task_data(), "user_123")
+        # Срок уже наступил: перепланируем таймер на «сейчас»
+        monitor.track(task.model_copy(update={"due_date": datetime.now()}))
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.close()
+
+    assert [e["task_id"] for e in events] == [task.id]
+
+
+@pytest.mark.asyncio
+async def test_load_skips_escalated_tasks(env):
+    service, monitor, clock, _ = env
+    task = await service.create_task(make_task_data(), "user_123")
+    clock.advance(hours=2)
+    await monitor.fire_due()
+    await monitor.fire_due()
+    assert (await service.get_task(task.id)).sla_level == SLA_ESCALATED
+
+    deadlines = await service.task_repo.get_open_deadlines(["new"], clock.now, SLA_ESCALATED)
+
+    assert deadlines == []
@@ -0,0 +1,215 @@
+from datetime import datetime
+
+import pytest
+
+from domain.models import Task, partial_task_model
+from infrastructure.breaker import CooldownBreaker
+from infrastructure.cache import CachedTaskRepository, LocalCacheTier, RedisCacheTier, TaskCache
+
+
+class DictCacheTier:
+    """Локальная замена Redis для общего уровня кэша"""
+
+    def __init__(self):
+        self.data = {}
+        self.fences = set()
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ttl):
+        self.data[key] = value
+        self.fences.add(key)
+
+    async def fill(self, key, value, ttl):
+        if key not in self.fences:
+            self.data[key] = value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+        self.fences.add(key)
+
+
+class BrokenCacheTier(DictCacheTier):
+    async def get(self, key):
+        raise ConnectionError("redis is down")
+
+
+class CountingRepository:
+    """Внутренний репозиторий: считает обращения к «базе»"""
+
+    def __init__(self, task):
+        self.task = task
+        self.reads = 0
+        self.during_read = None
+
+    async def get_by_id(self, task_id):
+        self.reads += 1
+        task = self.task
+        if self.during_read is not None:
+            # Запись, которая успела между чтением из базы и заполнением кэша
+            await self.during_read()
+        return task if task_id == task.id else None
+
+    async def update_status(self, task_id, status, from_statuses, version=None):
+        if self.task.status not in from_statuses:
+            return None
+        previous, self.task = self.task, self.task.model_copy(update={"status": status})
+        return previous, self.task
+
+    async def rate_task(self, task_id, rating, comment, from_statuses, version=None):
+        self.task = self.task.model_copy(update={"rating": rating})
+        return True
+
+
+def make_task(**overrides):
+    data = {
+        "id": "T-20250101-ABCDEF12",
+        "title": "Test",
+        "description": "Desc",
+        "category": "electrical",
+        "location_id": "room_101",
+        "priority": "high",
+        "created_by": "user_123",
+        "created_at": datetime(2025, 1, 1, 12, 0),
+    }
+    data.update(overrides)
+    return Task(**data)
+
+
+def make_repository(task, shared=None, ttl=60, breaker=None, fence=2):
+    cache = TaskCache(LocalCacheTier(max_size=100, ttl=ttl), shared, fence=fence, breaker=breaker)
+    inner = CountingRepository(task)
+    return CachedTaskRepository(inner, cache), inner, cache
+
+
+@pytest.mark.asyncio
+async def test_repeated_reads_are_served_from_cache():
+    repo, inner, cache = make_repository(make_task())
+
+    for _ in range(5):
+        task = await repo.get_by_id("T-20250101-ABCDEF12")
+
+    assert task.title == "Test" and inner.reads == 1
+    assert cache.stats["local_hits"] == 4 and cache.hit_ratio == 0.8
+
+
+@pytest.mark.asyncio
+async def test_cached_task_is_projected_to_requested_fields():
+    repo, inner, _ = make_repository(make_task())
+    await repo.get_by_id("T-20250101-ABCDEF12")
+
+    task = await repo.get_by_id("T-20250101-ABCDEF12", partial_task_model(("id", "status")))
+
+    assert task.model_dump() == {"id": "T-20250101-ABCDEF12", "status": "new"} and inner.reads == 1
+
+
+@pytest.mark.asyncio
+async def test_shared_tier_serves_other_instances():
+    shared = DictCacheTier()
+    first, _, _ = make_repository(make_task(), shared)
+    await first.get_by_id("T-20250101-ABCDEF12")
+
+    second, inner, cache = make_repository(make_task(), shared)
+    task = await second.get_by_id("T-20250101-ABCDEF12")
+
+    assert task.id == "T-20250101-ABCDEF12" and inner.reads == 0
+    assert cache.stats["shared_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_status_update_refreshes_cached_task():
+    shared = DictCacheTier()
+    repo, inner, _ = make_repository(make_task(), shared)
+    await repo.get_by_id("T-20250101-ABCDEF12")
+
+    await repo.update_status("T-20250101-ABCDEF12", "assigned", ["new"])
+    task = await repo.get_by_id("T-20250101-ABCDEF12")
+
+    assert task.status == "assigned" and inner.reads == 1
+    assert '"status":"assigned"' in shared.data["task:T-20250101-ABCDEF12"]
+
+
+@pytest.mark.asyncio
+async def test_rating_invalidates_cached_task():
+    repo, inner, _ = make_repository(make_task(status="completed"), DictCacheTier())
+    await repo.get_by_id("T-20250101-ABCDEF12")
+
+    await repo.rate_task("T-20250101-ABCDEF12", 5, None, ["completed"])
+    task = await repo.get_by_id("T-20250101-ABCDEF12")
+
+    assert task.rating == 5 and inner.reads == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("write", ["update", "rating"])
+async def test_read_started_before_write_does_not_refill_cache(write):
+    shared = DictCacheTier()
+    repo, inner, cache = make_repository(make_task(status="completed" if write == "rating" else "new"), shared)
+
+    async def concurrent_write():
+        inner.during_read = None
+        if write == "update":
+            await repo.update_status("T-20250101-ABCDEF12", "assigned", ["new"])
+        else:
+            await repo.rate_task("T-20250101-ABCDEF12", 5, None, ["completed"])
+
+    inner.during_read = concurrent_write
+    stale = await repo.get_by_id("T-20250101-ABCDEF12")
+    task = await repo.get_by_id("T-20250101-ABCDEF12")
+
+    assert stale.status in ("new", "completed") and stale.rating is None
+    assert (task.status, task.rating) == (("assigned", None) if write == "update" else ("completed", 5))
+    assert cache.stats["skipped_fills"] == 1
+    assert shared.data.get("task:T-20250101-ABCDEF12") in (None, task.model_dump_json())
+
+
+@pytest.mark.asyncio
+async def test_zero_fence_disables_fencing_without_breaking_writes():
+    repo, inner, cache = make_repository(make_task(), DictCacheTier(), fence=0)
+
+    await repo.update_status("T-20250101-ABCDEF12", "assigned", ["new"])
+    await repo.rate_task("T-20250101-ABCDEF12", 5, None, ["assigned"])
+    for _ in range(2):
+        task = await repo.get_by_id("T-20250101-ABCDEF12")
+
+    assert task.rating == 5 and inner.reads == 1
+    assert len(cache._fences) == 0 and cache.stats["skipped_fills"] == 0
+
+
+@pytest.mark.asyncio
+async def test_local_entries_expire():
+    repo, inner, _ = make_repository(make_task(), ttl=0)
+
+    await repo.get_by_id("T-20250101-ABCDEF12")
+    await repo.get_by_id("T-20250101-ABCDEF12")
+
+    assert inner.reads == 2
+
+
+@pytest.mark.asyncio
+async def test_shared_tier_errors_fall_back_to_repository():
+    repo, inner, cache = make_repository(make_task(), BrokenCacheTier())
+
+    task = await repo.get_by_id("T-20250101-ABCDEF12")
+
+    assert task is not None and inner.reads == 1 and cache.stats["shared_errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_broken_shared_tier_is_skipped_during_cooldown():
+    now = [0.0]
+    breaker = CooldownBreaker("Shared task cache", cooldown=5, clock=lambda: now[0])
+    repo, inner, cache = make_repository(make_task(), BrokenCacheTier(), ttl=0, breaker=breaker)
+
+    for _ in range(3):
+        await repo.get_by_id("T-20250101-ABCDEF12")
+    now[0] = 5
+    await repo.get_by_id("T-20250101-ABCDEF12")
+
+    assert inner.reads == 4
+    assert cache.stats["shared_errors"] == 2 and cache.stats["shared_skipped"] == 6
+
+    redis_tier = RedisCacheTier("redis://localhost:6379")
+    assert redis_tier.client.connection_pool.connection_kwargs["socket_connect_timeout"] == 0.1
+    await redis_tier.close()
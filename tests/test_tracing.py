@@ -0,0 +1,102 @@
+import io
+import json
+import time
+
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from tracing import InMemoryExporter, StdoutExporter, Tracer, span, traced
+
+from core.profiling import SamplingProfiler
+from presentation.middleware import ProfilingMiddleware, TracingMiddleware
+from presentation.routing import InstrumentedRoute
+
+
+class Repository:
+    async def get_by_id(self, task_id):
+        return {"id": task_id}
+
+
+def get_repository():
+    with span("get_repository"):
+        return traced(Repository(), "repository")
+
+
+def make_app(tracer, profiler=None):
+    router = APIRouter(route_class=InstrumentedRoute)
+
+    @router.get("/items/{item_id}")
+    async def get_item(item_id: str, repository=Depends(get_repository)):
+        return await repository.get_by_id(item_id)
+
+    @router.get("/slow")
+    async def slow():
+        time.sleep(0.2)  # блокирует event loop — профайлер должен это увидеть
+        return {}
+
+    app = FastAPI()
+    app.include_router(router)
+    if profiler is not None:
+        app.add_middleware(ProfilingMiddleware, profiler=profiler, slow_ms=100)
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+    return app
+
+
+def test_trace_breaks_request_into_spans():
+    exporter = InMemoryExporter()
+    client = TestClient(make_app(Tracer(exporter)))
+
+    response = client.get("/items/42")
+
+    trace = exporter.get(response.headers["X-Trace-Id"])
+    names = [s["name"] for s in trace["spans"]]
+    assert names[0] == "GET /items/{item_id}"
+    assert {"resolve_dependencies", "get_repository", "endpoint",
+            "repository.get_by_id", "serialize_response"} <= set(names)
+
+    by_name = {s["name"]: s for s in trace["spans"]}
+    assert by_name["repository.get_by_id"]["parent_id"] == by_name["endpoint"]["span_id"]
+    assert by_name["get_repository"]["parent_id"] == by_name["resolve_dependencies"]["span_id"]
+
+
+def test_incoming_trace_id_is_kept_and_errors_get_header():
+    exporter = InMemoryExporter()
+    client = TestClient(make_app(Tracer(exporter)))
+
+    response = client.get("/items/1", headers={"X-Trace-Id": "abc-123"})
+    missing = client.get("/nope")
+
+    assert response.headers["X-Trace-Id"] == "abc-123"
+    assert missing.status_code == 404 and "X-Trace-Id" in missing.headers
+    assert exporter.get("abc-123") is not None
+
+
+def test_stdout_exporter_writes_json_line_per_request():
+    stream = io.StringIO()
+    client = TestClient(make_app(Tracer(StdoutExporter(stream))))
+
+    client.get("/items/1")
+
+    assert json.loads(stream.getvalue())["spans"][0]["name"] == "GET /items/{item_id}"
+
+
+def test_disabled_tracer_adds_nothing():
+    client = TestClient(make_app(Tracer()))
+
+    response = client.get("/items/1")
+
+    assert response.json() == {"id": "1"} and "X-Trace-Id" not in response.headers
+
+
+def test_profiler_captures_slow_request():
+    profiler = SamplingProfiler(interval=0.002)
+    client = TestClient(make_app(Tracer(InMemoryExporter()), profiler))
+
+    client.get("/items/1")
+    client.get("/slow")
+    profiler.stop()
+
+    assert len(profiler.profiles) == 1
+    profile = profiler.profiles[0]
+    assert profile["path"] == "/slow" and profile["reason"] == "slow" and profile["trace_id"]
+    assert any("slow (test_tracing.py" in stack for stack in profile["stacks"])
@@ -0,0 +1,219 @@
+# tracing.py
+"""
+Минимальная трассировка запросов без внешних зависимостей.
+
+Трасса запроса и текущий спан живут в contextvars, поэтому span() можно
+вызывать из любого места обработки запроса (auth, зависимости, репозитории).
+Вне трассы span() ничего не делает и почти ничего не стоит.
+"""
+import json
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from config import TRACING_EXPORTER, TRACING_MEMORY_SIZE
+
+TRACE_HEADER = "X-Trace-Id"
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "attributes")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Optional[dict] = None):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attributes = attributes or {}
+
+    def finish(self) -> None:
+        if self.end is None:
+            self.end = time.perf_counter()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+
+class Trace:
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.spans: List[Span] = []
+
+    def to_dict(self) -> dict:
+        origin = self.spans[0].start if self.spans else 0.0
+        return {
+            "trace_id": self.trace_id,
+            "spans": [
+                {
+                    "name": s.name,
+                    "span_id": s.span_id,
+                    "parent_id": s.parent_id,
+                    "start_ms": round((s.start - origin) * 1000, 3),
+                    "duration_ms": round(s.duration_ms, 3),
+                    **({"attributes": s.attributes} if s.attributes else {}),
+                }
+                for s in self.spans
+            ],
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _SpanContext:
+    __slots__ = ("trace", "name", "attributes", "span", "token")
+
+    def __init__(self, trace: Trace, name: str, attributes: dict):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self) -> Span:
+        return self.open()
+
+    def open(self) -> Span:
+        parent = _current_span.get()
+        self.span = Span(self.name, parent.span_id if parent else None, self.attributes)
+        self.trace.spans.append(self.span)
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.span.attributes["error"] = exc_type.__name__
+        self.span.finish()
+        _current_span.reset(self.token)
+        return False
+
+
+def span(name: str, **attributes):
+    """Контекстный менеджер спана внутри текущей трассы (вне трассы — no-op)"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP
+    return _SpanContext(trace, name, attributes)
+
+
+def start_span(name: str, **attributes) -> Optional[Span]:
+    """
+    Спан без контекстного менеджера — для интервалов, начало и конец которых
+    в разных местах кода. Не становится текущим; закрывается через finish().
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    parent = _current_span.get()
+    started = Span(name, parent.span_id if parent else None, attributes)
+    trace.spans.append(started)
+    return started
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def traced(obj, prefix: str):
+    """Обертка, которая кладет каждый async-вызов метода obj в спан prefix.method"""
+    return _TracedProxy(obj, prefix)
+
+
+class _TracedProxy:
+    def __init__(self, inner, prefix: str):
+        self._inner = inner
+        self._prefix = prefix
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._inner, name)
+        if not callable(attribute) or name.startswith("_"):
+            return attribute
+        span_name = f"{self._prefix}.{name}"
+
+        async def call(*args, **kwargs):
+            with span(span_name):
+                return await attribute(*args, **kwargs)
+
+        return call
+
+
+class InMemoryExporter:
+    """Хранит последние max_traces трасс (для тестов и отладки на поде)"""
+
+    def __init__(self, max_traces: int = TRACING_MEMORY_SIZE):
+        self.max_traces = max_traces
+        self.traces: "OrderedDict[str, dict]" = OrderedDict()
+
+    def export(self, trace: Trace) -> None:
+        self.traces[trace.trace_id] = trace.to_dict()
+        while len(self.traces) > self.max_traces:
+            self.traces.popitem(last=False)
+
+    def get(self, trace_id: str) -> Optional[dict]:
+        return self.traces.get(trace_id)
+
+
+class StdoutExporter:
+    """Одна JSON-строка на запрос — собирается обычным сборщиком логов"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def export(self, trace: Trace) -> None:
+        self.stream.write(json.dumps(trace.to_dict()) + "\n")
+
+
+EXPORTERS: Dict[str, type] = {"memory": InMemoryExporter, "stdout": StdoutExporter}
+
+
+class Tracer:
+    """Начинает и завершает трассы запросов; exporter=None — трассировка выключена"""
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+
+    @classmethod
+    def from_config(cls, name: str = TRACING_EXPORTER) -> "Tracer":
+        if name == "off":
+            return cls()
+        if name not in EXPORTERS:
+            raise ValueError(f"Unknown tracing exporter: {name}")
+        return cls(EXPORTERS[name]())
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_trace(self, name: str, trace_id: Optional[str] = None, **attributes):
+        """Открывает трассу и корневой спан; возвращает (trace, span_context)"""
+        trace = Trace(trace_id)
+        _current_trace.set(trace)
+        _current_span.set(None)
+        root = _SpanContext(trace, name, attributes)
+        root.open()
+        return trace, root
+
+    def finish_trace(self, trace: Trace, root: _SpanContext) -> None:
+        for s in trace.spans:
+            s.finish()
+        _current_span.reset(root.token)
+        _current_trace.set(None)
+        self.exporter.export(trace)
+
+
+tracer = Tracer.from_config()